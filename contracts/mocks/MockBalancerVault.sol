@@ -0,0 +1,52 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {IERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+
+interface IFlashLoanRecipient {
+    function receiveFlashLoan(
+        address[] memory tokens,
+        uint256[] memory amounts,
+        uint256[] memory feeAmounts,
+        bytes memory userData
+    ) external;
+}
+
+/**
+ * @title Mock Balancer Vault
+ * @notice Fee-free flash loans out of this contract's own balances, with the
+ *  same callback and error codes as Balancer's vault.
+ */
+contract MockBalancerVault {
+    function flashLoan(
+        address recipient,
+        address[] memory tokens,
+        uint256[] memory amounts,
+        bytes memory userData
+    ) external {
+        uint256[] memory feeAmounts = new uint256[](tokens.length);
+        uint256[] memory balancesBefore = new uint256[](tokens.length);
+        for (uint256 i; i < tokens.length; ++i) {
+            balancesBefore[i] = IERC20(tokens[i]).balanceOf(address(this));
+            if (balancesBefore[i] < amounts[i]) {
+                revert("BAL#528");
+            }
+            IERC20(tokens[i]).transfer(recipient, amounts[i]);
+        }
+
+        IFlashLoanRecipient(recipient).receiveFlashLoan(
+            tokens,
+            amounts,
+            feeAmounts,
+            userData
+        );
+
+        for (uint256 i; i < tokens.length; ++i) {
+            if (
+                IERC20(tokens[i]).balanceOf(address(this)) < balancesBefore[i]
+            ) {
+                revert("BAL#515");
+            }
+        }
+    }
+}
@@ -0,0 +1,26 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {ERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+
+/**
+ * @title Mock ERC20
+ * @notice Freely mintable token for local tests, standing in for WETH, wBLT and
+ *  underlying. Our mock router and oToken mint and burn it directly.
+ * @dev Name and symbol are lost when our code is copied to a hardcoded address,
+ *  which our helper never reads.
+ */
+contract MockERC20 is ERC20 {
+    constructor(
+        string memory _name,
+        string memory _symbol
+    ) ERC20(_name, _symbol) {}
+
+    function mint(address _to, uint256 _amount) external {
+        _mint(_to, _amount);
+    }
+
+    function burn(address _from, uint256 _amount) external {
+        _burn(_from, _amount);
+    }
+}
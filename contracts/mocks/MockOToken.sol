@@ -0,0 +1,177 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {ERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+import {IERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+
+interface IMockToken {
+    function mint(address to, uint256 amount) external;
+}
+
+interface IMockPair {
+    function token0() external view returns (address);
+
+    function getReserves() external view returns (uint256, uint256, uint256);
+
+    function mint(address to) external returns (uint256 liquidity);
+}
+
+/**
+ * @title Mock oToken
+ * @notice Option token paid for in wBLT, with the same pricing as oBMX: each
+ *  TWAP window is priced with the pair's fee-less swap math against that
+ *  window's reserves, then averaged.
+ * @dev TWAP windows are set directly with setTwapObservations(), so they can
+ *  differ from spot. Exercising mints underlying, and LP goes straight to our
+ *  recipient instead of being locked.
+ */
+contract MockOToken is ERC20 {
+    uint256 internal constant DISCOUNT_DENOMINATOR = 100;
+
+    address public immutable underlyingToken;
+    address public immutable paymentToken;
+    address public immutable pair;
+
+    /// @notice Percent of our TWAP price paid to exercise, out of 100
+    uint256 public discount;
+
+    uint256[] internal twapReserveUnderlying;
+    uint256[] internal twapReservePayment;
+
+    event SetDiscount(uint256 discount);
+
+    constructor(
+        address _underlyingToken,
+        address _paymentToken,
+        address _pair,
+        uint256 _discount
+    ) ERC20("Mock Option Token", "oMOCK") {
+        underlyingToken = _underlyingToken;
+        paymentToken = _paymentToken;
+        pair = _pair;
+        discount = _discount;
+    }
+
+    function mint(address _to, uint256 _amount) external {
+        _mint(_to, _amount);
+    }
+
+    function setDiscount(uint256 _discount) external {
+        discount = _discount;
+        emit SetDiscount(_discount);
+    }
+
+    /**
+     * @notice Set the time-weighted reserves of each TWAP window, oldest first.
+     * @param _reserveUnderlying Underlying reserve of each window.
+     * @param _reservePayment Payment token reserve of each window.
+     */
+    function setTwapObservations(
+        uint256[] memory _reserveUnderlying,
+        uint256[] memory _reservePayment
+    ) external {
+        if (
+            _reserveUnderlying.length == 0 ||
+            _reserveUnderlying.length != _reservePayment.length
+        ) {
+            revert("Mismatched observations");
+        }
+        twapReserveUnderlying = _reserveUnderlying;
+        twapReservePayment = _reservePayment;
+    }
+
+    function twapPoints() external view returns (uint256) {
+        return twapReserveUnderlying.length;
+    }
+
+    function getTimeWeightedAveragePrice(
+        uint256 _amount
+    ) public view returns (uint256) {
+        uint256 summed;
+        uint256 points = twapReserveUnderlying.length;
+        for (uint256 i; i < points; ++i) {
+            summed +=
+                (_amount * twapReservePayment[i]) /
+                (twapReserveUnderlying[i] + _amount);
+        }
+        return summed / points;
+    }
+
+    function getDiscountedPrice(uint256 _amount) public view returns (uint256) {
+        return
+            (getTimeWeightedAveragePrice(_amount) * discount) /
+            DISCOUNT_DENOMINATOR;
+    }
+
+    function getPaymentTokenAmountForExerciseLp(
+        uint256 _amount,
+        uint256 _discount
+    )
+        public
+        view
+        returns (uint256 paymentAmount, uint256 paymentAmountToAddLiquidity)
+    {
+        paymentAmount =
+            (getTimeWeightedAveragePrice(_amount) * _discount) /
+            DISCOUNT_DENOMINATOR;
+        (uint256 reserve0, uint256 reserve1, ) = IMockPair(pair).getReserves();
+        if (IMockPair(pair).token0() != underlyingToken) {
+            (reserve0, reserve1) = (reserve1, reserve0);
+        }
+        paymentAmountToAddLiquidity = (_amount * reserve1) / reserve0;
+    }
+
+    function exercise(
+        uint256 _amount,
+        uint256 _maxPaymentAmount,
+        address _recipient
+    ) external returns (uint256 paymentAmount) {
+        paymentAmount = getDiscountedPrice(_amount);
+        if (paymentAmount > _maxPaymentAmount) {
+            revert("Slippage too high");
+        }
+
+        _burn(msg.sender, _amount);
+        IERC20(paymentToken).transferFrom(
+            msg.sender,
+            address(this),
+            paymentAmount
+        );
+        IMockToken(underlyingToken).mint(_recipient, _amount);
+    }
+
+    function exerciseLp(
+        uint256 _amount,
+        uint256 _maxPaymentAmount,
+        address _recipient,
+        uint256 _discount,
+        uint256 _deadline
+    ) external returns (uint256 paymentAmount, uint256 lpAmount) {
+        if (_deadline < block.timestamp) {
+            revert("Deadline passed");
+        }
+        uint256 paymentAmountToAddLiquidity;
+        (
+            paymentAmount,
+            paymentAmountToAddLiquidity
+        ) = getPaymentTokenAmountForExerciseLp(_amount, _discount);
+        if (paymentAmount + paymentAmountToAddLiquidity > _maxPaymentAmount) {
+            revert("Slippage too high");
+        }
+
+        // pay for our underlying, then pair it with matching wBLT for LP
+        _burn(msg.sender, _amount);
+        IERC20(paymentToken).transferFrom(
+            msg.sender,
+            address(this),
+            paymentAmount
+        );
+        IERC20(paymentToken).transferFrom(
+            msg.sender,
+            pair,
+            paymentAmountToAddLiquidity
+        );
+        IMockToken(underlyingToken).mint(pair, _amount);
+        lpAmount = IMockPair(pair).mint(_recipient);
+    }
+}
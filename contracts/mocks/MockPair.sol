@@ -0,0 +1,168 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {ERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+import {IERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+import {Math} from "@openzeppelin/contracts@4.9.3/utils/math/Math.sol";
+
+interface IMockPairFactory {
+    function getFee(address pair) external view returns (uint256);
+}
+
+/**
+ * @title Mock Pair
+ * @notice Volatile (x * y = k) pair with the same swap and mint math as a BVM
+ *  pair, taking its swap fee from our factory.
+ * @dev Only current reserves are tracked, so oTokens using this pair keep their
+ *  own TWAP, see MockOToken.
+ */
+contract MockPair is ERC20 {
+    uint256 internal constant MINIMUM_LIQUIDITY = 10 ** 3;
+    uint256 internal constant MAX_BPS = 10_000;
+
+    address public immutable factory;
+    address public immutable token0;
+    address public immutable token1;
+
+    uint256 public reserve0;
+    uint256 public reserve1;
+    uint256 public blockTimestampLast;
+
+    constructor(
+        address _token0,
+        address _token1
+    ) ERC20("Mock Volatile AMM", "vAMM") {
+        factory = msg.sender;
+        token0 = _token0;
+        token1 = _token1;
+    }
+
+    function getReserves() external view returns (uint256, uint256, uint256) {
+        return (reserve0, reserve1, blockTimestampLast);
+    }
+
+    function metadata()
+        external
+        view
+        returns (
+            uint256 dec0,
+            uint256 dec1,
+            uint256 r0,
+            uint256 r1,
+            bool st,
+            address t0,
+            address t1
+        )
+    {
+        return (1e18, 1e18, reserve0, reserve1, false, token0, token1);
+    }
+
+    function getAmountOut(
+        uint256 _amountIn,
+        address _tokenIn
+    ) external view returns (uint256) {
+        (uint256 reserveIn, uint256 reserveOut) = _tokenIn == token0
+            ? (reserve0, reserve1)
+            : (reserve1, reserve0);
+        _amountIn -= (_amountIn * _fee()) / MAX_BPS;
+        return (_amountIn * reserveOut) / (reserveIn + _amountIn);
+    }
+
+    /**
+     * @notice Mint LP for whatever tokens were sent in since our last update.
+     * @param _to Recipient of our LP.
+     * @return liquidity Amount of LP minted.
+     */
+    function mint(address _to) external returns (uint256 liquidity) {
+        uint256 balance0 = IERC20(token0).balanceOf(address(this));
+        uint256 balance1 = IERC20(token1).balanceOf(address(this));
+        uint256 amount0 = balance0 - reserve0;
+        uint256 amount1 = balance1 - reserve1;
+
+        uint256 supply = totalSupply();
+        if (supply == 0) {
+            // burn our minimum liquidity, OZ won't mint to the zero address
+            liquidity = Math.sqrt(amount0 * amount1) - MINIMUM_LIQUIDITY;
+            _mint(address(0xdead), MINIMUM_LIQUIDITY);
+        } else {
+            liquidity = Math.min(
+                (amount0 * supply) / reserve0,
+                (amount1 * supply) / reserve1
+            );
+        }
+        if (liquidity == 0) {
+            revert("ILM");
+        }
+
+        _mint(_to, liquidity);
+        _update(balance0, balance1);
+    }
+
+    /**
+     * @notice Send out tokens, checking that what was sent in keeps our invariant
+     *  after fees.
+     * @param _amount0Out Amount of token0 to send.
+     * @param _amount1Out Amount of token1 to send.
+     * @param _to Recipient of our tokens.
+     */
+    function swap(
+        uint256 _amount0Out,
+        uint256 _amount1Out,
+        address _to
+    ) external {
+        if (_amount0Out == 0 && _amount1Out == 0) {
+            revert("IOA");
+        }
+        if (_amount0Out >= reserve0 || _amount1Out >= reserve1) {
+            revert("IL");
+        }
+
+        if (_amount0Out > 0) {
+            IERC20(token0).transfer(_to, _amount0Out);
+        }
+        if (_amount1Out > 0) {
+            IERC20(token1).transfer(_to, _amount1Out);
+        }
+
+        uint256 balance0 = IERC20(token0).balanceOf(address(this));
+        uint256 balance1 = IERC20(token1).balanceOf(address(this));
+        uint256 amount0In = balance0 > reserve0 - _amount0Out
+            ? balance0 - (reserve0 - _amount0Out)
+            : 0;
+        uint256 amount1In = balance1 > reserve1 - _amount1Out
+            ? balance1 - (reserve1 - _amount1Out)
+            : 0;
+        if (amount0In == 0 && amount1In == 0) {
+            revert("IIA");
+        }
+
+        uint256 pairFee = _fee();
+        if (
+            (balance0 - (amount0In * pairFee) / MAX_BPS) *
+                (balance1 - (amount1In * pairFee) / MAX_BPS) <
+            reserve0 * reserve1
+        ) {
+            revert("K");
+        }
+
+        _update(balance0, balance1);
+    }
+
+    /// @notice Match our reserves to our balances.
+    function sync() external {
+        _update(
+            IERC20(token0).balanceOf(address(this)),
+            IERC20(token1).balanceOf(address(this))
+        );
+    }
+
+    function _fee() internal view returns (uint256) {
+        return IMockPairFactory(factory).getFee(address(this));
+    }
+
+    function _update(uint256 _balance0, uint256 _balance1) internal {
+        reserve0 = _balance0;
+        reserve1 = _balance1;
+        blockTimestampLast = block.timestamp;
+    }
+}
@@ -0,0 +1,55 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {MockPair} from "./MockPair.sol";
+
+/**
+ * @title Mock Pair Factory
+ * @notice Creates volatile MockPairs and holds each pair's swap fee, out of
+ *  10,000. There are no stable pairs.
+ */
+contract MockPairFactory {
+    mapping(address => mapping(address => address)) internal pairs;
+    mapping(address => uint256) internal fees;
+
+    function createPair(
+        address _tokenA,
+        address _tokenB,
+        uint256 _fee
+    ) external returns (address pair) {
+        (address token0, address token1) = _sortTokens(_tokenA, _tokenB);
+        if (pairs[token0][token1] != address(0)) {
+            revert("Pair exists");
+        }
+        pair = address(new MockPair(token0, token1));
+        pairs[token0][token1] = pair;
+        fees[pair] = _fee;
+    }
+
+    function getPair(
+        address _tokenA,
+        address _tokenB,
+        bool _stable
+    ) external view returns (address) {
+        if (_stable) {
+            return address(0);
+        }
+        (address token0, address token1) = _sortTokens(_tokenA, _tokenB);
+        return pairs[token0][token1];
+    }
+
+    function getFee(address _pair) external view returns (uint256) {
+        return fees[_pair];
+    }
+
+    function setFee(address _pair, uint256 _fee) external {
+        fees[_pair] = _fee;
+    }
+
+    function _sortTokens(
+        address _tokenA,
+        address _tokenB
+    ) internal pure returns (address, address) {
+        return _tokenA < _tokenB ? (_tokenA, _tokenB) : (_tokenB, _tokenA);
+    }
+}
@@ -0,0 +1,264 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {IERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+import {Math} from "@openzeppelin/contracts@4.9.3/utils/math/Math.sol";
+
+interface IMockToken {
+    function mint(address to, uint256 amount) external;
+
+    function burn(address from, uint256 amount) external;
+}
+
+interface IMockPair {
+    function token0() external view returns (address);
+
+    function getReserves() external view returns (uint256, uint256, uint256);
+
+    function getAmountOut(
+        uint256 amountIn,
+        address tokenIn
+    ) external view returns (uint256);
+
+    function swap(uint256 amount0Out, uint256 amount1Out, address to) external;
+}
+
+interface IMockFactory {
+    function getPair(
+        address tokenA,
+        address tokenB,
+        bool stable
+    ) external view returns (address);
+}
+
+/**
+ * @title Mock Router
+ * @notice Stands in for both the BMX and BVM routers. Swaps between WETH and wBLT
+ *  mint and redeem BLT at fixed rates, scaled linearly with size like our offline
+ *  quotes assume, and every other swap goes through a MockPair.
+ * @dev Config lives in storage so our code can be copied to the routers'
+ *  hardcoded addresses, call initialize() afterwards.
+ */
+contract MockRouter {
+    struct Route {
+        address from;
+        address to;
+        bool stable;
+    }
+
+    uint256 internal constant PRECISION = 1e18;
+    uint256 internal constant MINIMUM_LIQUIDITY = 10 ** 3;
+
+    address public factory;
+    address public weth;
+    address public wBLT;
+
+    /// @notice WETH needed to mint 1e18 wBLT, see quoteMintAmountBLT()
+    uint256 public mintPrice;
+
+    /// @notice wBLT needed to redeem 1e18 WETH, see quoteRedeemAmountBLT()
+    uint256 public redeemPrice;
+
+    /// @notice wBLT received for 1e18 WETH
+    uint256 public wBLTPerWeth;
+
+    /// @notice WETH received for 1e18 wBLT
+    uint256 public wethPerWBLT;
+
+    function initialize(
+        address _factory,
+        address _weth,
+        address _wBLT
+    ) external {
+        factory = _factory;
+        weth = _weth;
+        wBLT = _wBLT;
+    }
+
+    function setBltRates(
+        uint256 _mintPrice,
+        uint256 _redeemPrice,
+        uint256 _wBLTPerWeth,
+        uint256 _wethPerWBLT
+    ) external {
+        mintPrice = _mintPrice;
+        redeemPrice = _redeemPrice;
+        wBLTPerWeth = _wBLTPerWeth;
+        wethPerWBLT = _wethPerWBLT;
+    }
+
+    function quoteMintAmountBLT(
+        address _underlyingToken,
+        uint256 _bltAmountNeeded
+    ) external view returns (uint256) {
+        _checkWeth(_underlyingToken);
+        return (_bltAmountNeeded * mintPrice) / PRECISION;
+    }
+
+    function quoteRedeemAmountBLT(
+        address _underlyingToken,
+        uint256 _amount
+    ) external view returns (uint256) {
+        _checkWeth(_underlyingToken);
+        return (_amount * redeemPrice) / PRECISION;
+    }
+
+    function getAmountOut(
+        uint256 _amountIn,
+        address _tokenIn,
+        address _tokenOut,
+        bool _stable
+    ) public view returns (uint256) {
+        if (_isBlt(_tokenIn, _tokenOut)) {
+            return
+                (_amountIn * (_tokenIn == weth ? wBLTPerWeth : wethPerWBLT)) /
+                PRECISION;
+        }
+        return
+            IMockPair(_pairFor(_tokenIn, _tokenOut, _stable)).getAmountOut(
+                _amountIn,
+                _tokenIn
+            );
+    }
+
+    function getAmountsOut(
+        uint256 _amountIn,
+        Route[] memory _routes
+    ) public view returns (uint256[] memory amounts) {
+        if (_routes.length == 0) {
+            revert("Router: INVALID_PATH");
+        }
+        amounts = new uint256[](_routes.length + 1);
+        amounts[0] = _amountIn;
+        for (uint256 i; i < _routes.length; ++i) {
+            amounts[i + 1] = getAmountOut(
+                amounts[i],
+                _routes[i].from,
+                _routes[i].to,
+                _routes[i].stable
+            );
+        }
+    }
+
+    function quoteAddLiquidity(
+        address _tokenA,
+        address _tokenB,
+        bool _stable,
+        uint256 _amountADesired,
+        uint256 _amountBDesired
+    )
+        external
+        view
+        returns (uint256 amountA, uint256 amountB, uint256 liquidity)
+    {
+        address pair = _pairFor(_tokenA, _tokenB, _stable);
+        (uint256 reserveA, uint256 reserveB, ) = IMockPair(pair).getReserves();
+        if (_tokenA != IMockPair(pair).token0()) {
+            (reserveA, reserveB) = (reserveB, reserveA);
+        }
+
+        if (reserveA == 0 && reserveB == 0) {
+            (amountA, amountB) = (_amountADesired, _amountBDesired);
+            liquidity = Math.sqrt(amountA * amountB) - MINIMUM_LIQUIDITY;
+            return (amountA, amountB, liquidity);
+        }
+
+        uint256 amountBOptimal = (_amountADesired * reserveB) / reserveA;
+        if (amountBOptimal <= _amountBDesired) {
+            (amountA, amountB) = (_amountADesired, amountBOptimal);
+        } else {
+            amountA = (_amountBDesired * reserveA) / reserveB;
+            amountB = _amountBDesired;
+        }
+        uint256 supply = IERC20(pair).totalSupply();
+        liquidity = Math.min(
+            (amountA * supply) / reserveA,
+            (amountB * supply) / reserveB
+        );
+    }
+
+    function swapExactTokensForTokens(
+        uint256 _amountIn,
+        uint256 _amountOutMin,
+        Route[] memory _routes,
+        address _to,
+        uint256 _deadline
+    ) public returns (uint256[] memory amounts) {
+        if (_deadline < block.timestamp) {
+            revert("Router: EXPIRED");
+        }
+        amounts = getAmountsOut(_amountIn, _routes);
+        if (amounts[amounts.length - 1] < _amountOutMin) {
+            revert("Router: INSUFFICIENT_OUTPUT_AMOUNT");
+        }
+
+        // hold each hop's output here, and send the last straight to _to
+        IERC20(_routes[0].from).transferFrom(
+            msg.sender,
+            address(this),
+            _amountIn
+        );
+        for (uint256 i; i < _routes.length; ++i) {
+            Route memory route = _routes[i];
+            address recipient = i == _routes.length - 1 ? _to : address(this);
+            if (_isBlt(route.from, route.to)) {
+                IMockToken(route.from).burn(address(this), amounts[i]);
+                IMockToken(route.to).mint(recipient, amounts[i + 1]);
+            } else {
+                address pair = _pairFor(route.from, route.to, route.stable);
+                IERC20(route.from).transfer(pair, amounts[i]);
+                if (route.from == IMockPair(pair).token0()) {
+                    IMockPair(pair).swap(0, amounts[i + 1], recipient);
+                } else {
+                    IMockPair(pair).swap(amounts[i + 1], 0, recipient);
+                }
+            }
+        }
+    }
+
+    function swapExactTokensForTokensSimple(
+        uint256 _amountIn,
+        uint256 _amountOutMin,
+        address _tokenFrom,
+        address _tokenTo,
+        bool _stable,
+        address _to,
+        uint256 _deadline
+    ) external returns (uint256[] memory amounts) {
+        Route[] memory routes = new Route[](1);
+        routes[0] = Route(_tokenFrom, _tokenTo, _stable);
+        amounts = swapExactTokensForTokens(
+            _amountIn,
+            _amountOutMin,
+            routes,
+            _to,
+            _deadline
+        );
+    }
+
+    function _isBlt(
+        address _tokenA,
+        address _tokenB
+    ) internal view returns (bool) {
+        return
+            (_tokenA == weth && _tokenB == wBLT) ||
+            (_tokenA == wBLT && _tokenB == weth);
+    }
+
+    function _checkWeth(address _token) internal view {
+        if (_token != weth) {
+            revert("Mock only prices BLT in WETH");
+        }
+    }
+
+    function _pairFor(
+        address _tokenA,
+        address _tokenB,
+        bool _stable
+    ) internal view returns (address pair) {
+        pair = IMockFactory(factory).getPair(_tokenA, _tokenB, _stable);
+        if (pair == address(0)) {
+            revert("Router: PAIR_DOES_NOT_EXIST");
+        }
+    }
+}
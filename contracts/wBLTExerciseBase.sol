@@ -0,0 +1,1552 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {Ownable2Step} from "@openzeppelin/contracts@4.9.3/access/Ownable2Step.sol";
+import {IERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+import {Math} from "@openzeppelin/contracts@4.9.3/utils/math/Math.sol";
+
+interface IoToken is IERC20 {
+    function exercise(
+        uint256 amount,
+        uint256 maxPaymentAmount,
+        address recipient
+    ) external returns (uint256);
+
+    function getDiscountedPrice(uint256 amount) external view returns (uint256);
+
+    function discount() external view returns (uint256);
+
+    function underlyingToken() external view returns (address);
+
+    function getPaymentTokenAmountForExerciseLp(
+        uint256 amount,
+        uint256 discount
+    )
+        external
+        view
+        returns (uint256 paymentAmount, uint256 paymentAmountToAddLiquidity);
+
+    function exerciseLp(
+        uint256 amount,
+        uint256 maxPaymentAmount,
+        address recipient,
+        uint256 discount,
+        uint256 deadline
+    ) external returns (uint256, uint256);
+}
+
+interface IBalancer {
+    function flashLoan(
+        address recipient,
+        address[] memory tokens,
+        uint256[] memory amounts,
+        bytes memory userData
+    ) external;
+}
+
+interface IPermit2 {
+    struct TokenPermissions {
+        address token;
+        uint256 amount;
+    }
+
+    struct PermitTransferFrom {
+        TokenPermissions permitted;
+        uint256 nonce;
+        uint256 deadline;
+    }
+
+    struct SignatureTransferDetails {
+        address to;
+        uint256 requestedAmount;
+    }
+
+    function permitTransferFrom(
+        PermitTransferFrom memory permit,
+        SignatureTransferDetails calldata transferDetails,
+        address owner,
+        bytes calldata signature
+    ) external;
+}
+
+interface IPairFactory {
+    function getFee(address pair) external view returns (uint256);
+
+    function getPair(
+        address tokenA,
+        address tokenB,
+        bool stable
+    ) external view returns (address);
+}
+
+interface IPair {
+    function getReserves()
+        external
+        view
+        returns (
+            uint256 reserve0,
+            uint256 reserve1,
+            uint256 blockTimestampLast
+        );
+
+    function metadata()
+        external
+        view
+        returns (
+            uint256 dec0,
+            uint256 dec1,
+            uint256 r0,
+            uint256 r1,
+            bool st,
+            address t0,
+            address t1
+        );
+}
+
+interface IRouter {
+    struct Route {
+        address from;
+        address to;
+        bool stable;
+    }
+
+    function getReserves(
+        address tokenA,
+        address tokenB,
+        bool stable
+    ) external view returns (uint256 reserve0, uint256 reserve1);
+
+    function getAmountOut(
+        uint256 amountIn,
+        address tokenIn,
+        address tokenOut,
+        bool stable
+    ) external view returns (uint256 amount);
+
+    function getAmountsOut(
+        uint256 amountIn,
+        Route[] memory routes
+    ) external view returns (uint256[] memory amounts);
+
+    function quoteAddLiquidity(
+        address tokenA,
+        address tokenB,
+        bool stable,
+        uint256 amountADesired,
+        uint256 amountBDesired
+    )
+        external
+        view
+        returns (uint256 amountA, uint256 amountB, uint256 liquidity);
+
+    function quoteMintAmountBLT(
+        address _underlyingToken,
+        uint256 _bltAmountNeeded
+    ) external view returns (uint256);
+
+    function quoteRedeemAmountBLT(
+        address _underlyingToken,
+        uint256 _amount
+    ) external view returns (uint256 wBLTAmount);
+
+    function swapExactTokensForTokens(
+        uint256 amountIn,
+        uint256 amountOutMin,
+        Route[] calldata routes,
+        address to,
+        uint256 deadline
+    ) external returns (uint256[] memory amounts);
+
+    function swapExactTokensForTokensSimple(
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address tokenFrom,
+        address tokenTo,
+        bool stable,
+        address to,
+        uint256 deadline
+    ) external returns (uint256[] memory amounts);
+}
+
+/**
+ * @title wBLT Exercise Base
+ * @notice Shared state, quotes, flash loan and swap logic for wBLTExerciseHelper and
+ *  wBLTExerciseFlows.
+ */
+
+abstract contract wBLTExerciseBase is Ownable2Step {
+    /// @notice WETH, payment token
+    IERC20 internal constant weth =
+        IERC20(0x4200000000000000000000000000000000000006);
+
+    /// @notice Wrapped BLT, our auto-compounding LP vault token
+    IERC20 internal constant wBLT =
+        IERC20(0x4E74D4Db6c0726ccded4656d0BCE448876BB4C7A);
+
+    /// @notice Flashloan from Balancer vault
+    IBalancer internal constant balancerVault =
+        IBalancer(0xBA12222222228d8Ba445958a75a0704d566BF2C8);
+
+    /// @notice BMX router for swaps
+    IRouter internal constant router =
+        IRouter(0xf5A008cA68870f223cd76E31248Cd04aF6cb9AF3);
+
+    /// @notice BVM standard router, used for a few functions missing from BMX router
+    IRouter internal constant bvmRouter =
+        IRouter(0xE11b93B61f6291d35c5a2beA0A9fF169080160cF);
+
+    /// @notice Pair factory, use this to check the current swap fee on a given pool
+    IPairFactory internal constant pairFactory =
+        IPairFactory(0xe21Aac7F113Bd5DC2389e4d8a8db854a87fD6951);
+
+    /// @notice Check whether we are in the middle of a flashloan (used for callback)
+    bool public flashEntered;
+
+    /// @notice Whether we emit GasCheckpoint events, see setGasTracing(). Packed with
+    ///  flashEntered and feeAddress, so checking it is cheap once we've borrowed.
+    bool public gasTracing;
+
+    /// @notice Used to track the deployed version of this contract.
+    string public constant apiVersion = "0.2.0";
+
+    /// @notice Where we send our 0.25% fee
+    address public feeAddress = 0x58761D6C6bF6c4bab96CaE125a2e5c8B1859b48a;
+
+    uint256 public fee = 25;
+
+    uint256 internal constant MAX_BPS = 10_000;
+    uint256 internal constant DISCOUNT_DENOMINATOR = 100;
+
+    /// @notice Outcome of exercising to WETH or underlying, see quoteExerciseProfit()
+    struct ExerciseQuote {
+        uint256 wethNeeded;
+        bool withinSlippageTolerance;
+        uint256 realProfit;
+        uint256 expectedProfit;
+        uint256 profitSlippage;
+    }
+
+    /// @notice Route for selling wBLT -> WETH
+    IRouter.Route[] internal wBltToWeth;
+
+    /// @notice Route for selling WETH -> wBLT
+    IRouter.Route[] internal wethToWblt;
+
+    /// @notice Setup for a given oToken, cached so exercising skips repeat lookups
+    struct OTokenConfig {
+        address underlying;
+        uint16 pairFee;
+        bool approved;
+        address pair;
+    }
+
+    /// @notice Cached config for each oToken we have exercised, see refreshOTokenConfig()
+    mapping(address => OTokenConfig) public oTokenConfigs;
+
+    /// @notice What an exercise pays out in, see Exercised
+    enum ExerciseMode {
+        Weth,
+        Underlying,
+        Lp,
+        Split
+    }
+
+    /**
+     * @notice Emitted for each oToken exercise.
+     * @param oToken The option token we exercised.
+     * @param mode Our output, see ExerciseMode.
+     * @param amount The amount of oToken exercised.
+     * @param wethNeeded WETH borrowed to exercise, including any flash loan fee. Zero
+     *  when our caller lends us wBLT instead.
+     * @param proceeds Our output before leftovers are swept: WETH for Weth and
+     *  Split, underlying kept for Underlying and Lp.
+     * @param fee WETH sent to feeAddress.
+     * @param profitSlippage Quoted profit slippage, 18 decimals.
+     */
+    event Exercised(
+        address indexed oToken,
+        ExerciseMode mode,
+        uint256 amount,
+        uint256 wethNeeded,
+        uint256 proceeds,
+        uint256 fee,
+        uint256 profitSlippage
+    );
+
+    /**
+     * @notice Emitted at the end of each phase of an exercise while gasTracing is on.
+     * @dev Gas used by a phase is the drop in gasLeft since the previous checkpoint,
+     *  which includes the previous checkpoint's own event. See exercise_helper.gas.
+     * @param phase Phase name, with parent phases separated by ";".
+     * @param gasLeft gasleft() at the end of the phase.
+     */
+    event GasCheckpoint(bytes32 phase, uint256 gasLeft);
+
+    /// @notice Info passed through our flash loan, including our pre-loan quote
+    struct FlashData {
+        address oToken;
+        uint256 oTokenAmount;
+        bool receiveUnderlying;
+        ExerciseMode mode;
+        uint256 profitSlippage;
+        uint256 profitSlippageAllowed;
+        uint256 slippageAllowed;
+        uint256 wBLTNeeded;
+        uint256 wethReceived;
+        uint256 underlyingToSell;
+        IRouter.Route[][] splitRoutes;
+        uint256[] splitAmounts;
+        uint256[] splitMinAmountsOut;
+    }
+
+    /// @notice Pair address and swap fee, cached to save factory calls
+    struct PairInfo {
+        address pair;
+        uint16 fee;
+    }
+
+    /// @notice Cached pairs for getAmountsIn, keyed by sorted tokens then stable
+    mapping(address => mapping(address => mapping(bool => PairInfo)))
+        public pairInfo;
+
+    /// @notice Leftover amounts at or below which we skip a swap, see
+    ///  setDustThresholds()
+    struct DustThresholds {
+        bool custom;
+        uint80 weth;
+        uint80 wBLT;
+        uint80 underlying;
+    }
+
+    /// @notice Dust thresholds set for an oToken. Others use gas-aware defaults.
+    mapping(address => DustThresholds) public dustThresholds;
+
+    /// @notice Rough gas for one leftover swap, BLT mint and redeem dominate this
+    uint256 internal constant DUST_SWAP_GAS = 300_000;
+
+    constructor() {
+        // setup our routes
+        wBltToWeth.push(IRouter.Route(address(wBLT), address(weth), false));
+        wethToWblt.push(IRouter.Route(address(weth), address(wBLT), false));
+
+        // do necessary approvals
+        weth.approve(address(router), type(uint256).max);
+        wBLT.approve(address(router), type(uint256).max);
+    }
+
+    /**
+     * @notice Pull the values every quote needs for a given oToken amount.
+     * @param _oToken The option token we are exercising.
+     * @param _underlying The oToken's underlying token.
+     * @param _optionTokenAmount The amount of oToken to exercise.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @return wethNeeded How much WETH is needed for given amount of oToken.
+     * @return wethReceived WETH received from selling the same amount of underlying.
+     * @return wBLTNeeded How much wBLT we pay to exercise given amount of oToken.
+     */
+    function _quoteInputs(
+        address _oToken,
+        address _underlying,
+        uint256 _optionTokenAmount,
+        uint256 _profitSlippageAllowed
+    )
+        internal
+        view
+        returns (uint256 wethNeeded, uint256 wethReceived, uint256 wBLTNeeded)
+    {
+        if (_optionTokenAmount == 0) {
+            revert("Can't exercise zero");
+        }
+        if (_profitSlippageAllowed > MAX_BPS) {
+            revert("Slippage must be less than 10,000");
+        }
+
+        // calculate how much WETH we need for our oToken amount
+        // we need this many wBLT for a given amount of oToken
+        wBLTNeeded = IoToken(_oToken).getDiscountedPrice(_optionTokenAmount);
+        // we need this much WETH to mint that much wBLT
+        wethNeeded = router.quoteMintAmountBLT(address(weth), wBLTNeeded);
+
+        IRouter.Route[] memory tokenToWeth = new IRouter.Route[](2);
+        tokenToWeth[0] = IRouter.Route(_underlying, address(wBLT), false);
+        tokenToWeth[1] = IRouter.Route(address(wBLT), address(weth), false);
+
+        // simulate swapping all of our underlying to WETH
+        uint256[] memory amounts = router.getAmountsOut(
+            _optionTokenAmount,
+            tokenToWeth
+        );
+        wethReceived = amounts[2];
+    }
+
+    /**
+     * @notice Math behind quoteExerciseProfit().
+     * @param _wethNeeded How much WETH is needed for given amount of oToken.
+     * @param _wethReceived WETH received from selling the same amount of underlying.
+     * @param _oTokenDiscount The oToken's exercise discount.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @return quote Same values as quoteExerciseProfit().
+     */
+    function _quoteExerciseProfit(
+        uint256 _wethNeeded,
+        uint256 _wethReceived,
+        uint256 _oTokenDiscount,
+        uint256 _profitSlippageAllowed
+    ) internal view returns (ExerciseQuote memory quote) {
+        quote.wethNeeded = _wethNeeded;
+        uint256 estimatedFee = (_wethReceived * fee) / MAX_BPS;
+
+        // make sure we don't spend more than we have
+        if (_wethNeeded > _wethReceived - estimatedFee) {
+            revert("Cost exceeds profit");
+        } else {
+            quote.realProfit = _wethReceived - _wethNeeded - estimatedFee;
+        }
+
+        // calculate our ideal profit using the discount and known wethNeeded
+        quote.expectedProfit =
+            ((_wethNeeded * (DISCOUNT_DENOMINATOR - _oTokenDiscount)) /
+                _oTokenDiscount) -
+            estimatedFee;
+
+        _checkProfitSlippage(quote, _profitSlippageAllowed);
+    }
+
+    /**
+     * @notice Math behind quoteExerciseToUnderlying().
+     * @param _config The oToken's cached config.
+     * @param _optionTokenAmount The amount of oToken to exercise to underlying.
+     * @param _wethNeeded How much WETH is needed for given amount of oToken.
+     * @param _wethReceived WETH received from selling the same amount of underlying.
+     * @param _oTokenDiscount The oToken's exercise discount.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @return quote Same values as quoteExerciseToUnderlying().
+     */
+    function _quoteExerciseToUnderlying(
+        OTokenConfig memory _config,
+        uint256 _optionTokenAmount,
+        uint256 _wethNeeded,
+        uint256 _wethReceived,
+        uint256 _oTokenDiscount,
+        uint256 _profitSlippageAllowed
+    ) internal view returns (ExerciseQuote memory quote) {
+        quote.wethNeeded = _wethNeeded;
+
+        // use our simulated swap of all to WETH to better estimate total WETH needed
+        uint256 minAmount = _wethNeeded + (_wethReceived * fee) / MAX_BPS;
+
+        // calculate how much underlying we need to get at least this much WETH
+        // first do our WETH -> wBLT step
+        minAmount = router.quoteRedeemAmountBLT(address(weth), minAmount);
+
+        // then do our wBLT -> underlying step
+        minAmount = _getUnderlyingAmountIn(_config, minAmount);
+
+        // make sure exercising is profitable
+        if (minAmount > _optionTokenAmount) {
+            revert("Cost exceeds profit");
+        } else {
+            quote.realProfit = _optionTokenAmount - minAmount;
+        }
+
+        // calculate our real and expected profit
+        quote.expectedProfit =
+            (_optionTokenAmount *
+                ((MAX_BPS * (DISCOUNT_DENOMINATOR - _oTokenDiscount)) /
+                    DISCOUNT_DENOMINATOR -
+                    fee)) /
+            MAX_BPS;
+
+        _checkProfitSlippage(quote, _profitSlippageAllowed);
+    }
+
+    /**
+     * @notice Fill in profitSlippage and withinSlippageTolerance for a quote, given
+     *  its realProfit and ideal expectedProfit.
+     * @param _quote Quote to update, expectedProfit is reduced by allowed slippage.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     */
+    function _checkProfitSlippage(
+        ExerciseQuote memory _quote,
+        uint256 _profitSlippageAllowed
+    ) internal pure {
+        // if profitSlippage returns zero, we have positive slippage (extra profit)
+        if (_quote.expectedProfit > _quote.realProfit) {
+            _quote.profitSlippage =
+                1e18 -
+                ((_quote.realProfit * 1e18) / _quote.expectedProfit);
+        }
+
+        // allow for our expected slippage as well
+        _quote.expectedProfit =
+            (_quote.expectedProfit * (MAX_BPS - _profitSlippageAllowed)) /
+            MAX_BPS;
+
+        // check if real profit is greater than expected when allowing for slippage
+        if (_quote.realProfit > _quote.expectedProfit) {
+            _quote.withinSlippageTolerance = true;
+        }
+    }
+
+    /**
+     * @notice Sell the part of our oTokens that isn't going to LP, leaving the wBLT
+     *  and underlying to exercise the rest to LP with _lockLp().
+     * @dev Our oTokens must already be in this contract.
+     * @param _oToken The option token we are exercising.
+     * @param _optionTokenAmount The amount of oToken to exercise to LP.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @param _swapSlippageAllowed Slippage we allow on minting wBLT, versus our quote.
+     * @param _percentToLp Out of 10,000. How much our oToken should we send to exercise
+     *  for LP?
+     * @param _convertLeftovers Whether to convert all significant leftover WETH and
+     *  underlying to wBLT.
+     * @param _selfFunded Whether to borrow our WETH from our caller, instead of a
+     *  flash loan.
+     * @return config Cached config for our oToken.
+     * @return oTokensToLp Amount of oToken left to exercise to LP.
+     */
+    function _sellForLp(
+        address _oToken,
+        uint256 _optionTokenAmount,
+        uint256 _profitSlippageAllowed,
+        uint256 _swapSlippageAllowed,
+        uint256 _percentToLp,
+        bool _convertLeftovers,
+        bool _selfFunded
+    ) internal returns (OTokenConfig memory config, uint256 oTokensToLp) {
+        // first person does the approvals for everyone else, what a nice person!
+        config = _registerOToken(_oToken);
+        _gasCheckpoint("register");
+
+        // correct our optionTokenAmount for our percent to LP
+        uint256 oTokensToSell = (_optionTokenAmount * (10_000 - _percentToLp)) /
+            10_000;
+        oTokensToLp = _optionTokenAmount - oTokensToSell;
+
+        // simulate exercising our oTokens to underlying, and check slippage. we
+        //  pass our simulated amounts through our flash loan to reuse them there
+        FlashData memory data;
+        uint256 wethNeeded;
+        (wethNeeded, data.wethReceived, data.wBLTNeeded) = _quoteInputs(
+            _oToken,
+            config.underlying,
+            oTokensToSell,
+            _profitSlippageAllowed
+        );
+        ExerciseQuote memory quote = _quoteExerciseToUnderlying(
+            config,
+            oTokensToSell,
+            wethNeeded,
+            data.wethReceived,
+            IoToken(_oToken).discount(),
+            _profitSlippageAllowed
+        );
+
+        // revert if slippage is too high
+        if (!quote.withinSlippageTolerance) {
+            revert("Profit slippage higher than allowed");
+        }
+
+        // convert tokens to underlying vs WETH as it should be lower fee overall
+        data.oToken = _oToken;
+        data.oTokenAmount = oTokensToSell;
+        data.receiveUnderlying = true;
+        data.mode = ExerciseMode.Lp;
+        data.profitSlippage = quote.profitSlippage;
+        data.slippageAllowed = _swapSlippageAllowed;
+        data.underlyingToSell = oTokensToSell - quote.realProfit;
+        _gasCheckpoint("quote");
+        _borrowPaymentToken(data, wethNeeded, _selfFunded);
+        _gasCheckpoint("borrow");
+
+        if (_convertLeftovers) {
+            // convert any significant leftover WETH or underlying to wBLT
+            _convertLpLeftovers(config.underlying, data, wethNeeded);
+        }
+    }
+
+    /**
+     * @notice Exercise our remaining oTokens to LP for msg.sender, and send them
+     *  anything left over.
+     * @param _oToken The option token we are exercising.
+     * @param _config The oToken's cached config.
+     * @param _oTokensToLp Amount of oToken we are exercising to LP.
+     * @param _discount Our discount percentage for LP. How long do we want to lock for?
+     */
+    function _lockLp(
+        address _oToken,
+        OTokenConfig memory _config,
+        uint256 _oTokensToLp,
+        uint256 _discount
+    ) internal {
+        _gasCheckpoint("sweep");
+        uint256 wethBalance = weth.balanceOf(address(this));
+        uint256 underlyingBalance = IERC20(_config.underlying).balanceOf(
+            address(this)
+        );
+
+        // exercise our remaining oTokens and lock LP with msg.sender as recipient
+        IoToken(_oToken).exerciseLp(
+            _oTokensToLp,
+            wBLT.balanceOf(address(this)),
+            msg.sender,
+            _discount,
+            block.timestamp
+        );
+        _gasCheckpoint("lp");
+
+        // update our wBLT balance after exercising
+        uint256 wBLTBalance = wBLT.balanceOf(address(this));
+
+        if (wBLTBalance > 0) {
+            _safeTransfer(address(wBLT), msg.sender, wBLTBalance);
+        }
+        if (wethBalance > 0) {
+            _safeTransfer(address(weth), msg.sender, wethBalance);
+        }
+        if (underlyingBalance > 0) {
+            _safeTransfer(_config.underlying, msg.sender, underlyingBalance);
+        }
+        _gasCheckpoint("payout");
+    }
+
+    /**
+     * @notice Quote an exercise and check profit slippage.
+     * @dev First person does the approvals for everyone else, what a nice person!
+     * @param _oToken The option token we are exercising.
+     * @param _amount The amount of oToken to exercise.
+     * @param _receiveUnderlying Whether the user wants to receive WETH or underlying.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @param _swapSlippageAllowed Slippage we allow on minting wBLT and on selling
+     *  underlying to WETH, versus our quote.
+     * @return data Info for our flash loan, with our simulated amounts to reuse there.
+     * @return wethNeeded How much WETH we need to borrow.
+     */
+    function _prepareExercise(
+        address _oToken,
+        uint256 _amount,
+        bool _receiveUnderlying,
+        uint256 _profitSlippageAllowed,
+        uint256 _swapSlippageAllowed
+    ) internal returns (FlashData memory data, uint256 wethNeeded) {
+        _registerOToken(_oToken);
+        _gasCheckpoint("register");
+
+        data.oToken = _oToken;
+        data.oTokenAmount = _amount;
+        data.receiveUnderlying = _receiveUnderlying;
+        data.profitSlippageAllowed = _profitSlippageAllowed;
+        data.slippageAllowed = _swapSlippageAllowed;
+        if (_receiveUnderlying) {
+            data.mode = ExerciseMode.Underlying;
+        }
+        wethNeeded = _quoteExercise(data);
+        _gasCheckpoint("quote");
+    }
+
+    /**
+     * @notice Quote an exercise at current prices and check our profit slippage.
+     * @dev Fills in the simulated amounts of _data from its oToken, amount, output and
+     *  slippage settings. Our oToken must already be registered.
+     * @param _data Info for our flash loan, see FlashData.
+     * @return wethNeeded How much WETH we need to borrow.
+     */
+    function _quoteExercise(
+        FlashData memory _data
+    ) internal view returns (uint256 wethNeeded) {
+        OTokenConfig memory config = oTokenConfigs[_data.oToken];
+        (wethNeeded, _data.wethReceived, _data.wBLTNeeded) = _quoteInputs(
+            _data.oToken,
+            config.underlying,
+            _data.oTokenAmount,
+            _data.profitSlippageAllowed
+        );
+        uint256 oTokenDiscount = IoToken(_data.oToken).discount();
+        ExerciseQuote memory quote = _quoteExerciseProfit(
+            wethNeeded,
+            _data.wethReceived,
+            oTokenDiscount,
+            _data.profitSlippageAllowed
+        );
+
+        // revert if too much slippage
+        if (!quote.withinSlippageTolerance) {
+            revert("Profit slippage higher than allowed");
+        }
+
+        // only sell enough underlying to repay our flash loan and fee
+        if (_data.receiveUnderlying) {
+            quote = _quoteExerciseToUnderlying(
+                config,
+                _data.oTokenAmount,
+                wethNeeded,
+                _data.wethReceived,
+                oTokenDiscount,
+                _data.profitSlippageAllowed
+            );
+            _data.underlyingToSell = _data.oTokenAmount - quote.realProfit;
+        }
+        _data.profitSlippage = quote.profitSlippage;
+    }
+
+    /**
+     * @notice Borrow WETH for a single exercise.
+     * @param _data Info for our flash loan callback, see FlashData.
+     * @param _wethNeeded The amount of WETH needed.
+     * @param _selfFunded Whether to borrow from our caller instead of a flash loan.
+     */
+    function _borrowPaymentToken(
+        FlashData memory _data,
+        uint256 _wethNeeded,
+        bool _selfFunded
+    ) internal {
+        FlashData[] memory data = new FlashData[](1);
+        data[0] = _data;
+        uint256[] memory wethNeeded = new uint256[](1);
+        wethNeeded[0] = _wethNeeded;
+        _borrowPaymentToken(data, wethNeeded, _wethNeeded, _selfFunded);
+    }
+
+    /**
+     * @notice Flash loan our WETH from Balancer, or borrow it from our caller when
+     *  they ask to fund their own exercise.
+     * @dev Borrowing from our caller skips the flash loan round trip, and they are
+     *  repaid in the same transaction.
+     * @param _data Info for each exercise in our flash loan callback, see FlashData.
+     * @param _wethNeeded The amount of WETH needed for each exercise.
+     * @param _totalWeth The total amount of WETH needed.
+     * @param _selfFunded Whether to borrow from our caller instead of a flash loan.
+     */
+    function _borrowPaymentToken(
+        FlashData[] memory _data,
+        uint256[] memory _wethNeeded,
+        uint256 _totalWeth,
+        bool _selfFunded
+    ) internal {
+        // self-funded, use our caller's WETH
+        if (_selfFunded) {
+            _safeTransferFrom(
+                address(weth),
+                msg.sender,
+                address(this),
+                _totalWeth
+            );
+            _exerciseAll(_data, _wethNeeded);
+            _safeTransfer(address(weth), msg.sender, _totalWeth);
+            return;
+        }
+
+        // change our state
+        flashEntered = true;
+
+        // create our input args
+        address[] memory tokens = new address[](1);
+        tokens[0] = address(weth);
+
+        uint256[] memory amounts = new uint256[](1);
+        amounts[0] = _totalWeth;
+
+        // call the flash loan
+        balancerVault.flashLoan(
+            address(this),
+            tokens,
+            amounts,
+            abi.encode(_data, _wethNeeded)
+        );
+    }
+
+    /**
+     * @notice Fallback function used during flash loans.
+     * @dev May only be called by balancer vault as part of
+     *  flash loan callback.
+     * @param _tokens The tokens we are swapping (in our case, only WETH).
+     * @param _amounts The amounts of said tokens.
+     * @param _feeAmounts The fee amounts for said tokens.
+     * @param _userData Useful data passed when calling our flash loan.
+     */
+    function receiveFlashLoan(
+        address[] memory _tokens,
+        uint256[] memory _amounts,
+        uint256[] memory _feeAmounts,
+        bytes memory _userData
+    ) external {
+        // only balancer vault may call this, during a flash loan
+        if (msg.sender != address(balancerVault)) {
+            revert("Only balancer vault can call");
+        }
+        if (!flashEntered) {
+            revert("Flashloan not in progress");
+        }
+
+        // pull out info from the userData
+        (FlashData[] memory data, uint256[] memory wethAmounts) = abi.decode(
+            _userData,
+            (FlashData[], uint256[])
+        );
+
+        // any flash loan fee is paid out of our first exercise
+        wethAmounts[0] += _feeAmounts[0];
+        _exerciseAll(data, wethAmounts);
+
+        // pass our total WETH amount to make sure we get enough back
+        uint256 payback = _amounts[0] + _feeAmounts[0];
+
+        // repay our flash loan
+        _safeTransfer(address(weth), address(balancerVault), payback);
+        flashEntered = false;
+    }
+
+    /**
+     * @notice Exercise each of our entries in order, see _exerciseAndSwap().
+     * @dev Each entry's swaps move prices for the next, so every entry after our first
+     *  is quoted again here, against the state earlier entries left. It may spend more
+     *  or less WETH than we borrowed for it, but must return what it spends, so our
+     *  total still covers our loan.
+     * @param _data Info for each exercise, see FlashData.
+     * @param _wethAmounts WETH for each exercise, our first includes any loan fee.
+     */
+    function _exerciseAll(
+        FlashData[] memory _data,
+        uint256[] memory _wethAmounts
+    ) internal {
+        for (uint256 i; i < _data.length; ++i) {
+            if (i > 0) {
+                _wethAmounts[i] = _quoteExercise(_data[i]);
+            }
+            _exerciseAndSwap(_data[i], _wethAmounts[i]);
+        }
+    }
+
+    /**
+     * @notice Exercise our oToken, then swap some (or all) underlying to WETH.
+     * @dev Reuses the amounts we quoted, see _exerciseAll(). Our first exercise was
+     *  quoted before borrowing, as nothing else touches our pair in between.
+     * @param _data Info from our flash loan, see FlashData.
+     * @param _wethAmount Max amount of WETH we allow to be spent exercising, and how much
+     *  we'll need back. Note this also includes any fees for flash loans.
+     */
+    function _exerciseAndSwap(
+        FlashData memory _data,
+        uint256 _wethAmount
+    ) internal {
+        _gasCheckpoint("borrow;loan");
+
+        // deposit our WETH to wBLT, we should get about what we quoted
+        uint256[] memory amounts = router.swapExactTokensForTokens(
+            _wethAmount,
+            (_data.wBLTNeeded * (MAX_BPS - _data.slippageAllowed)) / MAX_BPS,
+            wethToWblt,
+            address(this),
+            block.timestamp
+        );
+        _gasCheckpoint("borrow;mint");
+
+        IoToken(_data.oToken).exercise(
+            _data.oTokenAmount,
+            amounts[1],
+            address(this)
+        );
+        _gasCheckpoint("borrow;exercise");
+        IERC20 underlying = IERC20(oTokenConfigs[_data.oToken].underlying);
+
+        IRouter.Route[] memory underlyingToWeth = new IRouter.Route[](2);
+        underlyingToWeth[0] = IRouter.Route(
+            address(underlying),
+            address(wBLT),
+            false
+        );
+        underlyingToWeth[1] = IRouter.Route(
+            address(wBLT),
+            address(weth),
+            false
+        );
+
+        uint256 feeAmount;
+        uint256 proceeds;
+        if (_data.receiveUnderlying) {
+            // swap only the underlying we quoted to repay our flash loan and fee.
+            //  other batch entries may hold WETH here, so only count our swap
+            uint256 wethBefore = weth.balanceOf(address(this));
+            router.swapExactTokensForTokens(
+                _data.underlyingToSell,
+                0,
+                underlyingToWeth,
+                address(this),
+                block.timestamp
+            );
+
+            // easier to enforce the minAmountOut after the swap due to rounding issues
+            if (
+                weth.balanceOf(address(this)) - wethBefore <
+                _wethAmount + (_data.wethReceived * fee) / MAX_BPS
+            ) {
+                revert("Not enough WETH out");
+            }
+
+            // take fees based on our simulated swap of all underlying
+            _gasCheckpoint("borrow;sale");
+            feeAmount = _takeFees(_data.wethReceived);
+            proceeds = _data.oTokenAmount - _data.underlyingToSell;
+        } else if (_data.splitAmounts.length > 0) {
+            // sell along each path of our split, checking each vs our quote
+            uint256 totalWeth;
+            for (uint256 i; i < _data.splitAmounts.length; ++i) {
+                amounts = router.swapExactTokensForTokens(
+                    _data.splitAmounts[i],
+                    _data.splitMinAmountsOut[i],
+                    _data.splitRoutes[i],
+                    address(this),
+                    block.timestamp
+                );
+                totalWeth += amounts[amounts.length - 1];
+            }
+
+            // take fees normally since we're doing all to WETH
+            _gasCheckpoint("borrow;sale");
+            feeAmount = _takeFees(totalWeth);
+            proceeds = totalWeth;
+        } else {
+            // use our router to swap from underlying to WETH, checking vs our quote.
+            //  exercising gives us our oToken amount of underlying
+            amounts = router.swapExactTokensForTokens(
+                _data.oTokenAmount,
+                (_data.wethReceived * (MAX_BPS - _data.slippageAllowed)) /
+                    MAX_BPS,
+                underlyingToWeth,
+                address(this),
+                block.timestamp
+            );
+
+            // take fees normally since we're doing all to WETH
+            _gasCheckpoint("borrow;sale");
+            feeAmount = _takeFees(amounts[2]);
+            proceeds = amounts[2];
+        }
+
+        // in a batch, other entries may cover a shortfall, so don't underflow here
+        if (!_data.receiveUnderlying) {
+            proceeds = proceeds > _wethAmount + feeAmount
+                ? proceeds - _wethAmount - feeAmount
+                : 0;
+        }
+
+        emit Exercised(
+            _data.oToken,
+            _data.mode,
+            _data.oTokenAmount,
+            _wethAmount,
+            proceeds,
+            feeAmount,
+            _data.profitSlippage
+        );
+        _gasCheckpoint("borrow;fee");
+    }
+
+    /**
+     * @notice Convert significant leftover WETH and underlying to wBLT before
+     *  exercising to LP.
+     * @dev Don't worry about price impact for these swaps, as they should be small
+     *  enough for it to be negligible, and true slippage (🥪) protection isn't
+     *  possible without an external price oracle.
+     * @param _underlying Underlying token of the oToken we exercised.
+     * @param _data Info from our flash loan, see _dustThresholds().
+     * @param _wethNeeded How much WETH we borrowed for this exercise.
+     */
+    function _convertLpLeftovers(
+        address _underlying,
+        FlashData memory _data,
+        uint256 _wethNeeded
+    ) internal {
+        (uint256 wethMin, , uint256 underlyingMin) = _dustThresholds(
+            _data,
+            _wethNeeded
+        );
+
+        uint256 wethBalance = weth.balanceOf(address(this));
+        if (wethBalance > wethMin) {
+            // swap WETH for wBLT
+            router.swapExactTokensForTokens(
+                wethBalance,
+                0,
+                wethToWblt,
+                address(this),
+                block.timestamp
+            );
+        }
+
+        uint256 underlyingBalance = IERC20(_underlying).balanceOf(
+            address(this)
+        );
+        if (underlyingBalance > underlyingMin) {
+            // swap underlying to wBLT
+            bvmRouter.swapExactTokensForTokensSimple(
+                underlyingBalance,
+                0,
+                _underlying,
+                address(wBLT),
+                false,
+                address(this),
+                block.timestamp
+            );
+        }
+    }
+
+    /**
+     * @notice Leftover amounts at or below which a swap isn't worth it.
+     * @dev Uses the oToken's thresholds if set. Otherwise a swap must be worth more
+     *  than its gas at the current base fee, valuing wBLT and underlying at the rates
+     *  we quoted for this exercise, and never less than our original 1e12 WETH and
+     *  1e15 wBLT or underlying cutoffs.
+     * @param _data Info from our flash loan, with our quoted amounts.
+     * @param _wethNeeded How much WETH we borrowed for this exercise.
+     * @return wethMin WETH threshold.
+     * @return wBLTMin wBLT threshold.
+     * @return underlyingMin Underlying threshold.
+     */
+    function _dustThresholds(
+        FlashData memory _data,
+        uint256 _wethNeeded
+    )
+        internal
+        view
+        returns (uint256 wethMin, uint256 wBLTMin, uint256 underlyingMin)
+    {
+        DustThresholds memory thresholds = dustThresholds[_data.oToken];
+        if (thresholds.custom) {
+            return (thresholds.weth, thresholds.wBLT, thresholds.underlying);
+        }
+
+        uint256 gasCost = block.basefee * DUST_SWAP_GAS;
+        wethMin = Math.max(1e12, gasCost);
+        wBLTMin = 1e15;
+        underlyingMin = 1e15;
+        if (_wethNeeded > 0) {
+            wBLTMin = Math.max(
+                wBLTMin,
+                (gasCost * _data.wBLTNeeded) / _wethNeeded
+            );
+        }
+        if (_data.wethReceived > 0) {
+            underlyingMin = Math.max(
+                underlyingMin,
+                (gasCost * _data.oTokenAmount) / _data.wethReceived
+            );
+        }
+    }
+
+    /**
+     * @notice Convert significant leftovers after exercising to our output token.
+     * @dev Don't worry about price impact for these swaps, as they should be small
+     *  enough for it to be negligible, and true slippage (🥪) protection isn't
+     *  possible without an external price oracle.
+     * @param _underlying Underlying token of the oToken we exercised.
+     * @param _data Info from our flash loan, see _dustThresholds().
+     * @param _wethNeeded How much WETH we borrowed for this exercise.
+     * @return wethBalance WETH left to send out.
+     * @return wBLTBalance wBLT left to send out.
+     * @return underlyingBalance Underlying left to send out, zero if receiving WETH.
+     */
+    function _sweepLeftovers(
+        address _underlying,
+        FlashData memory _data,
+        uint256 _wethNeeded
+    )
+        internal
+        returns (
+            uint256 wethBalance,
+            uint256 wBLTBalance,
+            uint256 underlyingBalance
+        )
+    {
+        // anything remaining in the helper is pure profit
+        wethBalance = weth.balanceOf(address(this));
+        wBLTBalance = wBLT.balanceOf(address(this));
+        (uint256 wethMin, uint256 wBLTMin, ) = _dustThresholds(
+            _data,
+            _wethNeeded
+        );
+
+        if (_data.receiveUnderlying) {
+            // swap any leftover WETH to wBLT, unless dust, then send back as WETH
+            if (wethBalance > wethMin) {
+                // swap WETH to wBLT, then batch-swap all wBLT to underlying
+                router.swapExactTokensForTokens(
+                    wethBalance,
+                    0,
+                    wethToWblt,
+                    address(this),
+                    block.timestamp
+                );
+                wethBalance = weth.balanceOf(address(this));
+                wBLTBalance = wBLT.balanceOf(address(this));
+            }
+
+            // convert any significant remaining wBLT to underlying
+            if (wBLTBalance > wBLTMin) {
+                bvmRouter.swapExactTokensForTokensSimple(
+                    wBLTBalance,
+                    0,
+                    address(wBLT),
+                    _underlying,
+                    false,
+                    address(this),
+                    block.timestamp
+                );
+            }
+            underlyingBalance = IERC20(_underlying).balanceOf(address(this));
+        } else {
+            // convert any significant remaining wBLT to WETH. also, swapping too
+            //  small of an amount will revert here
+            if (wBLTBalance > wBLTMin) {
+                router.swapExactTokensForTokens(
+                    wBLTBalance,
+                    0,
+                    wBltToWeth,
+                    address(this),
+                    block.timestamp
+                );
+                wethBalance = weth.balanceOf(address(this));
+            }
+        }
+
+        wBLTBalance = wBLT.balanceOf(address(this));
+    }
+
+    /**
+     * @notice Emit a GasCheckpoint if gasTracing is on.
+     * @param _phase Name of the phase that just ended.
+     */
+    function _gasCheckpoint(bytes32 _phase) internal {
+        if (gasTracing) {
+            emit GasCheckpoint(_phase, gasleft());
+        }
+    }
+
+    /**
+     * @notice Apply fees to our after-swap total.
+     * @dev Default is 0.25% but this may be updated later.
+     * @param _amount Amount to apply our fee to.
+     * @return toSend Fee sent to feeAddress.
+     */
+    function _takeFees(uint256 _amount) internal returns (uint256 toSend) {
+        toSend = (_amount * fee) / MAX_BPS;
+        _safeTransfer(address(weth), feeAddress, toSend);
+    }
+
+    /**
+     * @notice Sweep out tokens accidentally sent here.
+     * @dev May only be called by owner.
+     * @param _tokenAddress Address of token to sweep.
+     * @param _tokenAmount Amount of tokens to sweep.
+     */
+    function recoverERC20(
+        address _tokenAddress,
+        uint256 _tokenAmount
+    ) external onlyOwner {
+        _safeTransfer(_tokenAddress, owner(), _tokenAmount);
+    }
+
+    /**
+     * @notice Update fee for oToken -> WETH conversion.
+     * @param _recipient Fee recipient address.
+     * @param _newFee New fee, out of 10,000.
+     */
+    function setFee(address _recipient, uint256 _newFee) external onlyOwner {
+        if (_newFee > DISCOUNT_DENOMINATOR) {
+            revert("setFee: Fee max is 1%");
+        }
+        fee = _newFee;
+        feeAddress = _recipient;
+    }
+
+    /**
+     * @notice Turn GasCheckpoint events on or off.
+     * @dev May only be called by owner. Meant for profiling on a local chain or fork,
+     *  each checkpoint costs about 2k gas while on.
+     * @param _enabled Whether to emit checkpoints.
+     */
+    function setGasTracing(bool _enabled) external onlyOwner {
+        gasTracing = _enabled;
+    }
+
+    /**
+     * @notice Set the leftover amounts below which we skip a swap for an oToken.
+     * @dev May only be called by owner. Set _custom to false to go back to our
+     *  gas-aware defaults, see _dustThresholds().
+     * @param _oToken Address of oToken to set thresholds for.
+     * @param _custom Whether to use these thresholds instead of our defaults.
+     * @param _weth WETH threshold.
+     * @param _wBLT wBLT threshold.
+     * @param _underlying Underlying threshold.
+     */
+    function setDustThresholds(
+        address _oToken,
+        bool _custom,
+        uint80 _weth,
+        uint80 _wBLT,
+        uint80 _underlying
+    ) external onlyOwner {
+        dustThresholds[_oToken] = DustThresholds(
+            _custom,
+            _weth,
+            _wBLT,
+            _underlying
+        );
+    }
+
+    /**
+     * @notice Re-read an oToken's underlying, pair and pair fee, and redo approvals.
+     * @dev May only be called by owner. Use this if the pair fee changes, as our
+     *  cached fee is used for both quoting and exercising.
+     * @param _oToken Address of oToken to refresh.
+     */
+    function refreshOTokenConfig(address _oToken) external onlyOwner {
+        _cacheOTokenConfig(_oToken);
+    }
+
+    /**
+     * @notice Re-read the pair address and swap fee used by getAmountsIn and
+     *  getAmountsInForRoutes.
+     * @dev May only be called by owner. Also use this to cache pairs ahead of time.
+     * @param _tokenA One token of our pair.
+     * @param _tokenB Other token of our pair.
+     * @param _stable Whether the pair is stable or volatile.
+     */
+    function refreshPairInfo(
+        address _tokenA,
+        address _tokenB,
+        bool _stable
+    ) external onlyOwner {
+        _cachePairInfo(_tokenA, _tokenB, _stable);
+    }
+
+    /* ========== HELPER FUNCTIONS ========== */
+
+    /**
+     * @notice Given an output amount of an asset and pair reserves, returns a required
+     *  input amount of the other asset.
+     * @param _pairFee Swap fee of the pair we are checking on, out of 10,000.
+     * @param _amountOut Minimum amount we need to receive of _reserveOut token.
+     * @param _reserveIn Pair reserve of our amountIn token.
+     * @param _reserveOut Pair reserve of our _amountOut token.
+     * @return amountIn Amount of _reserveIn to swap to receive _amountOut.
+     */
+    function _getAmountIn(
+        uint256 _pairFee,
+        uint256 _amountOut,
+        uint256 _reserveIn,
+        uint256 _reserveOut
+    ) internal pure returns (uint256 amountIn) {
+        if (_amountOut == 0) {
+            revert("_getAmountIn: _amountOut must be >0");
+        }
+        if (_reserveIn == 0 || _reserveOut == 0) {
+            revert("_getAmountIn: Reserves must be >0");
+        }
+        uint256 numerator = _reserveIn * _amountOut * 10_000;
+        uint256 denominator = (_reserveOut - _amountOut) *
+            (10_000 - _pairFee);
+        amountIn = (numerator / denominator) + 1;
+    }
+
+    /**
+     * @notice Same as _getAmountIn, but for stable (x3y + y3x) pairs.
+     * @dev Decimals are 10**decimals, as returned by pair.metadata().
+     * @param _pairFee Swap fee of the pair we are checking on, out of 10,000.
+     * @param _amountOut Minimum amount we need to receive of _reserveOut token.
+     * @param _reserveIn Pair reserve of our amountIn token.
+     * @param _reserveOut Pair reserve of our _amountOut token.
+     * @param _decimalsIn Decimals multiplier of our amountIn token.
+     * @param _decimalsOut Decimals multiplier of our _amountOut token.
+     * @return amountIn Amount of _reserveIn to swap to receive _amountOut.
+     */
+    function _getStableAmountIn(
+        uint256 _pairFee,
+        uint256 _amountOut,
+        uint256 _reserveIn,
+        uint256 _reserveOut,
+        uint256 _decimalsIn,
+        uint256 _decimalsOut
+    ) internal pure returns (uint256 amountIn) {
+        if (_amountOut == 0) {
+            revert("_getAmountIn: _amountOut must be >0");
+        }
+        if (_reserveIn == 0 || _reserveOut == 0) {
+            revert("_getAmountIn: Reserves must be >0");
+        }
+
+        // pair math is done with reserves normalized to 18 decimals
+        uint256 reserveIn = (_reserveIn * 1e18) / _decimalsIn;
+        uint256 reserveOut = (_reserveOut * 1e18) / _decimalsOut;
+        uint256 xy = _k(reserveIn, reserveOut);
+
+        // round our output up so we never come up short
+        reserveOut -= (_amountOut * 1e18 + _decimalsOut - 1) / _decimalsOut;
+
+        // our curve is symmetric, so solve for the new input reserve the same way
+        //  the pair solves for its output reserve
+        amountIn =
+            ((_getY(reserveOut, xy, reserveIn) - reserveIn) * _decimalsIn) /
+            1e18 +
+            1;
+        amountIn = (amountIn * 10_000) / (10_000 - _pairFee) + 1;
+    }
+
+    /**
+     * @notice Input amount needed for a single pair swap, either volatile or stable.
+     * @dev Exercises price their underlying swap through here too, see
+     *  _getUnderlyingAmountIn().
+     * @param _info Pair address and fee.
+     * @param _route Pair to swap through, see IRouter.Route.
+     * @param _amountOut Minimum amount we need to receive of _route.to.
+     * @return Amount of _route.from to swap to receive _amountOut.
+     */
+    function _getPairAmountIn(
+        PairInfo memory _info,
+        IRouter.Route memory _route,
+        uint256 _amountOut
+    ) internal view returns (uint256) {
+        if (!_route.stable) {
+            (uint256 reserveIn, uint256 reserveOut, ) = IPair(_info.pair)
+                .getReserves();
+
+            // pairs sort their tokens by address
+            if (_route.from > _route.to) {
+                (reserveIn, reserveOut) = (reserveOut, reserveIn);
+            }
+            return _getAmountIn(_info.fee, _amountOut, reserveIn, reserveOut);
+        }
+
+        (
+            uint256 dec0,
+            uint256 dec1,
+            uint256 r0,
+            uint256 r1,
+            ,
+            address t0,
+
+        ) = IPair(_info.pair).metadata();
+        if (_route.from != t0) {
+            (dec0, dec1, r0, r1) = (dec1, dec0, r1, r0);
+        }
+        return _getStableAmountIn(_info.fee, _amountOut, r0, r1, dec0, dec1);
+    }
+
+    /**
+     * @notice Read our cached pair address and fee, or look them up if not cached.
+     * @param _tokenA One token of our pair.
+     * @param _tokenB Other token of our pair.
+     * @param _stable Whether the pair is stable or volatile.
+     * @return info Pair address and fee.
+     */
+    function _getPairInfo(
+        address _tokenA,
+        address _tokenB,
+        bool _stable
+    ) internal view returns (PairInfo memory info) {
+        (address token0, address token1) = _tokenA < _tokenB
+            ? (_tokenA, _tokenB)
+            : (_tokenB, _tokenA);
+        info = pairInfo[token0][token1][_stable];
+        if (info.pair == address(0)) {
+            info.pair = pairFactory.getPair(_tokenA, _tokenB, _stable);
+            if (info.pair == address(0)) {
+                revert("getAmountsIn: Pair does not exist");
+            }
+            // pair fees are out of 10,000, so always fit
+            info.fee = uint16(pairFactory.getFee(info.pair));
+        }
+    }
+
+    /**
+     * @notice Look up a pair address and fee from our factory and cache them.
+     * @param _tokenA One token of our pair.
+     * @param _tokenB Other token of our pair.
+     * @param _stable Whether the pair is stable or volatile.
+     * @return info Pair address and fee.
+     */
+    function _cachePairInfo(
+        address _tokenA,
+        address _tokenB,
+        bool _stable
+    ) internal returns (PairInfo memory info) {
+        (address token0, address token1) = _tokenA < _tokenB
+            ? (_tokenA, _tokenB)
+            : (_tokenB, _tokenA);
+
+        // clear our cache first so we pull fresh values
+        delete pairInfo[token0][token1][_stable];
+        info = _getPairInfo(_tokenA, _tokenB, _stable);
+        pairInfo[token0][token1][_stable] = info;
+    }
+
+    /**
+     * @notice Stable pair invariant, x3y + y3x, with 18 decimal reserves.
+     */
+    function _k(uint256 _x, uint256 _y) internal pure returns (uint256) {
+        uint256 a = (_x * _y) / 1e18;
+        uint256 b = (_x * _x) / 1e18 + (_y * _y) / 1e18;
+        return (a * b) / 1e18;
+    }
+
+    /**
+     * @notice Solve x0 * y3 + x03 * y = xy for y with Newton's method, starting from y.
+     * @dev Same as the pair's _get_y().
+     */
+    function _getY(
+        uint256 _x0,
+        uint256 _xy,
+        uint256 _y
+    ) internal pure returns (uint256) {
+        for (uint256 i; i < 255; ++i) {
+            uint256 yPrev = _y;
+            uint256 k = (_x0 * ((((_y * _y) / 1e18) * _y) / 1e18)) /
+                1e18 +
+                (((((_x0 * _x0) / 1e18) * _x0) / 1e18) * _y) /
+                1e18;
+            uint256 d = (3 * _x0 * ((_y * _y) / 1e18)) /
+                1e18 +
+                ((((_x0 * _x0) / 1e18) * _x0) / 1e18);
+            if (k < _xy) {
+                _y += ((_xy - k) * 1e18) / d;
+            } else {
+                _y -= ((k - _xy) * 1e18) / d;
+            }
+            if (_y > yPrev) {
+                if (_y - yPrev <= 1) {
+                    return _y;
+                }
+            } else if (yPrev - _y <= 1) {
+                return _y;
+            }
+        }
+        return _y;
+    }
+
+    /**
+     * @notice Amount of underlying to swap through our oToken's pair for a given
+     *  amount of wBLT, same as getAmountsInForRoutes() but using our cached oToken
+     *  config.
+     * @param _config The oToken's cached config.
+     * @param _amountOut Minimum amount of wBLT we need to receive.
+     * @return Amount of underlying to swap.
+     */
+    function _getUnderlyingAmountIn(
+        OTokenConfig memory _config,
+        uint256 _amountOut
+    ) internal view returns (uint256) {
+        return
+            _getPairAmountIn(
+                PairInfo(_config.pair, _config.pairFee),
+                IRouter.Route(_config.underlying, address(wBLT), false),
+                _amountOut
+            );
+    }
+
+    /**
+     * @notice Helper to cache and approve new oTokens.
+     * @dev Will only lookup and approve on first call.
+     * @param _oToken Address of oToken to check for.
+     * @return config Cached config for our oToken.
+     */
+    function _registerOToken(
+        address _oToken
+    ) internal returns (OTokenConfig memory config) {
+        config = oTokenConfigs[_oToken];
+        if (!config.approved) {
+            config = _cacheOTokenConfig(_oToken);
+        }
+    }
+
+    /**
+     * @notice Look up an oToken's underlying, pair and pair fee, do approvals, and
+     *  cache the result.
+     * @param _oToken Address of oToken to cache.
+     * @return config Cached config for our oToken.
+     */
+    function _cacheOTokenConfig(
+        address _oToken
+    ) internal returns (OTokenConfig memory config) {
+        config.underlying = IoToken(_oToken).underlyingToken();
+        PairInfo memory info = _cachePairInfo(
+            config.underlying,
+            address(wBLT),
+            false
+        );
+        config.pair = info.pair;
+        config.pairFee = info.fee;
+
+        _approveOToken(_oToken, config.underlying);
+        config.approved = true;
+        oTokenConfigs[_oToken] = config;
+    }
+
+    /**
+     * @notice Approve an oToken to spend tokens from this contract.
+     * @param _oToken Address of oToken to approve.
+     * @param _underlying Underlying token of our oToken.
+     */
+    function _approveOToken(address _oToken, address _underlying) internal {
+        wBLT.approve(_oToken, type(uint256).max);
+        weth.approve(_oToken, type(uint256).max);
+
+        // approve router to spend underlying from this contract
+        IERC20 underlying = IERC20(_underlying);
+        underlying.approve(address(router), type(uint256).max);
+
+        // approve BVM router to spend underlying & wBLT
+        underlying.approve(address(bvmRouter), type(uint256).max);
+        wBLT.approve(address(bvmRouter), type(uint256).max);
+    }
+
+    /**
+     * @notice Internal safeTransfer function. Transfer tokens to another address.
+     * @param _token Address of token to transfer.
+     * @param _to Address to send token to.
+     * @param _value Amount of token to send.
+     */
+    function _safeTransfer(
+        address _token,
+        address _to,
+        uint256 _value
+    ) internal {
+        require(_token.code.length > 0);
+        (bool success, bytes memory data) = _token.call(
+            abi.encodeWithSelector(IERC20.transfer.selector, _to, _value)
+        );
+        require(success && (data.length == 0 || abi.decode(data, (bool))));
+    }
+
+    /**
+     * @notice Internal safeTransferFrom function. Transfer tokens from one address to
+     *  another.
+     * @dev From address must have approved sufficient allowance for this contract.
+     * @param _token Address of token to transfer.
+     * @param _from Address to send token from.
+     * @param _to Address to send token to.
+     * @param _value Amount of token to send.
+     */
+    function _safeTransferFrom(
+        address _token,
+        address _from,
+        address _to,
+        uint256 _value
+    ) internal {
+        require(_token.code.length > 0);
+        (bool success, bytes memory data) = _token.call(
+            abi.encodeWithSelector(
+                IERC20.transferFrom.selector,
+                _from,
+                _to,
+                _value
+            )
+        );
+        require(success && (data.length == 0 || abi.decode(data, (bool))));
+    }
+}
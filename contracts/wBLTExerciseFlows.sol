@@ -0,0 +1,620 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {IERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+import {Math} from "@openzeppelin/contracts@4.9.3/utils/math/Math.sol";
+import {
+    IoToken,
+    IPair,
+    IRouter,
+    wBLTExerciseBase
+} from "./wBLTExerciseBase.sol";
+
+/**
+ * @title wBLT Exercise Flows
+ * @notice Batches, split sales, LP zaps and operator exercises for oTokens paired
+ *  with wBLT, using the same flash loan and swap logic as wBLTExerciseHelper.
+ * @dev Deployed on its own, with its own owner, fee, caches and dust thresholds.
+ */
+
+contract wBLTExerciseFlows is wBLTExerciseBase {
+    /// @notice Part of an underlying -> WETH sale, see exerciseWithSplit()
+    struct SwapSplit {
+        IRouter.Route[] routes;
+        uint256 share;
+    }
+
+    /// @notice One entry of exerciseBatch(), same as the helper's exercise() arguments
+    struct ExerciseRequest {
+        address oToken;
+        uint256 amount;
+        bool receiveUnderlying;
+        uint256 profitSlippageAllowed;
+        uint256 swapSlippageAllowed;
+    }
+
+    /// @notice One owner's share of exerciseOnBehalf(), paid out to the owner's
+    ///  payout address, see setPayoutAddress()
+    struct OnBehalfEntry {
+        address owner;
+        uint256 amount;
+    }
+
+    /// @notice What an owner allows an operator to do with one of their oTokens.
+    ///  Slippage ceilings are out of 10,000, the same as exercise() arguments.
+    struct OperatorApproval {
+        bool approved;
+        uint16 maxProfitSlippage;
+        uint16 maxSwapSlippage;
+    }
+
+    /// @notice Operators each owner allows to exercise each of their oTokens, by
+    ///  owner, operator and oToken
+    mapping(address => mapping(address => mapping(address => OperatorApproval)))
+        public operators;
+
+    /// @notice Where each owner's exerciseOnBehalf() proceeds go, the owner if unset
+    mapping(address => address) public payoutAddresses;
+
+    /**
+     * @notice Exercise our oToken for LP, swapping exactly the underlying we need for
+     *  our LP payment to wBLT in a single swap.
+     * @dev Instead of converting all leftover WETH and underlying to wBLT, we solve
+     *  for the smallest underlying swap that covers our payment and the wBLT we need
+     *  to pair for LP after that swap. Extra underlying and WETH are sent to the user.
+     * @param _oToken The option token we are exercising.
+     * @param _optionTokenAmount The amount of oToken to exercise to LP.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @param _swapSlippageAllowed Slippage we allow on minting wBLT, versus our quote.
+     * @param _percentToLp Out of 10,000. How much our oToken should we send to exercise
+     *  for LP?
+     * @param _discount Our discount percentage for LP. How long do we want to lock for?
+     */
+    function exerciseToLpZap(
+        address _oToken,
+        uint256 _optionTokenAmount,
+        uint256 _profitSlippageAllowed,
+        uint256 _swapSlippageAllowed,
+        uint256 _percentToLp,
+        uint256 _discount
+    ) external {
+        // transfer option token to this contract
+        _gasCheckpoint("start");
+        _safeTransferFrom(
+            _oToken,
+            msg.sender,
+            address(this),
+            _optionTokenAmount
+        );
+        _gasCheckpoint("transfer");
+        (OTokenConfig memory config, uint256 oTokensToLp) = _sellForLp(
+            _oToken,
+            _optionTokenAmount,
+            _profitSlippageAllowed,
+            _swapSlippageAllowed,
+            _percentToLp,
+            false,
+            false
+        );
+
+        // one swap for exactly the wBLT our LP needs
+        _zapToWblt(_oToken, config, oTokensToLp, _discount);
+        _lockLp(_oToken, config, oTokensToLp, _discount);
+    }
+
+    /**
+     * @notice Exercise our oToken for WETH, splitting our underlying sale across
+     *  several swap paths to reduce price impact.
+     * @dev Use exercise_helper.routing.optimal_split() to pick shares. Each path is
+     *  quoted on its own, so paths may not share a pair. Our split must quote at least
+     *  as much WETH as our default route.
+     * @param _oToken The option token we are exercising.
+     * @param _amount The amount of oToken to exercise.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @param _swapSlippageAllowed Slippage we allow on minting wBLT and on each path of
+     *  our split, versus our quote.
+     * @param _splits Paths from underlying to WETH and their shares out of 10,000.
+     */
+    function exerciseWithSplit(
+        address _oToken,
+        uint256 _amount,
+        uint256 _profitSlippageAllowed,
+        uint256 _swapSlippageAllowed,
+        SwapSplit[] calldata _splits
+    ) external {
+        // quote and check our slippage, then check our split
+        _gasCheckpoint("start");
+        (FlashData memory data, uint256 wethNeeded) = _prepareExercise(
+            _oToken,
+            _amount,
+            false,
+            _profitSlippageAllowed,
+            _swapSlippageAllowed
+        );
+        _quoteSplit(data, oTokenConfigs[_oToken].underlying, _splits);
+        data.mode = ExerciseMode.Split;
+        _gasCheckpoint("split");
+
+        // transfer option token to this contract
+        _safeTransferFrom(_oToken, msg.sender, address(this), _amount);
+        _gasCheckpoint("transfer");
+
+        // get our flash loan started
+        _borrowPaymentToken(data, wethNeeded, false);
+        _gasCheckpoint("borrow");
+
+        (uint256 wethBalance, uint256 wBLTBalance, ) = _sweepLeftovers(
+            address(0),
+            data,
+            wethNeeded
+        );
+        _gasCheckpoint("sweep");
+        if (wBLTBalance > 0) {
+            _safeTransfer(address(wBLT), msg.sender, wBLTBalance);
+        }
+        if (wethBalance > 0) {
+            _safeTransfer(address(weth), msg.sender, wethBalance);
+        }
+        _gasCheckpoint("payout");
+    }
+
+    /**
+     * @notice Exercise oTokens for many owners at once, as an approved operator, and
+     *  split the proceeds pro rata between the owners.
+     * @dev Each owner must approve this contract for their oTokens and msg.sender as
+     *  their operator for _oToken with setOperator(). Our slippage settings may not
+     *  exceed any owner's ceilings. All entries share one quote, flash loan and swap,
+     *  so slippage settings apply to the pooled amount. Proceeds only ever go to each
+     *  owner's payout address.
+     * @param _oToken The option token we are exercising.
+     * @param _entries Owners and amounts, see OnBehalfEntry.
+     * @param _receiveUnderlying Whether owners receive WETH or underlying.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @param _swapSlippageAllowed Slippage we allow on minting wBLT and on selling
+     *  underlying to WETH, versus our quote.
+     */
+    function exerciseOnBehalf(
+        address _oToken,
+        OnBehalfEntry[] calldata _entries,
+        bool _receiveUnderlying,
+        uint256 _profitSlippageAllowed,
+        uint256 _swapSlippageAllowed
+    ) external {
+        if (_entries.length == 0) {
+            revert("Nothing to exercise");
+        }
+
+        // pull in everyone's oTokens
+        _gasCheckpoint("start");
+        uint256 totalAmount;
+        for (uint256 i; i < _entries.length; ++i) {
+            OnBehalfEntry calldata entry = _entries[i];
+            if (entry.owner != msg.sender) {
+                OperatorApproval memory approval = operators[entry.owner][
+                    msg.sender
+                ][_oToken];
+                if (!approval.approved) {
+                    revert("Not an approved operator");
+                }
+                if (
+                    _profitSlippageAllowed > approval.maxProfitSlippage ||
+                    _swapSlippageAllowed > approval.maxSwapSlippage
+                ) {
+                    revert("Slippage above owner's limit");
+                }
+            }
+            _safeTransferFrom(
+                _oToken,
+                entry.owner,
+                address(this),
+                entry.amount
+            );
+            totalAmount += entry.amount;
+        }
+        _gasCheckpoint("transfer");
+
+        // exercise everything together
+        address underlying;
+        uint256 wethBalance;
+        uint256 wBLTBalance;
+        uint256 underlyingBalance;
+        {
+            (FlashData memory data, uint256 wethNeeded) = _prepareExercise(
+                _oToken,
+                totalAmount,
+                _receiveUnderlying,
+                _profitSlippageAllowed,
+                _swapSlippageAllowed
+            );
+            _borrowPaymentToken(data, wethNeeded, false);
+            _gasCheckpoint("borrow");
+
+            underlying = oTokenConfigs[_oToken].underlying;
+            (wethBalance, wBLTBalance, underlyingBalance) = _sweepLeftovers(
+                underlying,
+                data,
+                wethNeeded
+            );
+            _gasCheckpoint("sweep");
+        }
+
+        // split what we have left pro rata
+        _payProRata(underlying, underlyingBalance, _entries, totalAmount);
+        _payProRata(address(wBLT), wBLTBalance, _entries, totalAmount);
+        _payProRata(address(weth), wethBalance, _entries, totalAmount);
+        _gasCheckpoint("payout");
+    }
+
+    /**
+     * @notice Allow or revoke an operator to exercise one of our oTokens for us.
+     * @dev Operators choose when to exercise and their slippage, up to our ceilings.
+     *  Proceeds always go to our payout address, see setPayoutAddress().
+     * @param _operator Address of our operator (such as a keeper).
+     * @param _oToken The option token they may exercise.
+     * @param _approved Whether they may exercise on our behalf.
+     * @param _maxProfitSlippage Highest profit slippage they may allow, out of 10,000.
+     * @param _maxSwapSlippage Highest swap slippage they may allow, out of 10,000.
+     */
+    function setOperator(
+        address _operator,
+        address _oToken,
+        bool _approved,
+        uint16 _maxProfitSlippage,
+        uint16 _maxSwapSlippage
+    ) external {
+        operators[msg.sender][_operator][_oToken] = OperatorApproval(
+            _approved,
+            _maxProfitSlippage,
+            _maxSwapSlippage
+        );
+    }
+
+    /**
+     * @notice Set where our exerciseOnBehalf() proceeds go.
+     * @param _payoutAddress Address to receive our proceeds, zero address for
+     *  ourselves.
+     */
+    function setPayoutAddress(address _payoutAddress) external {
+        payoutAddresses[msg.sender] = _payoutAddress;
+    }
+
+    /**
+     * @notice Exercise several oTokens (or several oTokens for different outputs) for
+     *  WETH or underlying, using a single flash loan.
+     * @dev Entries run in order within our flash loan. Each entry after our first is
+     *  quoted again against the prices earlier entries left, so entries may share a
+     *  pair, and each must still meet its own slippage settings. Leftovers are swept
+     *  once at the end, into underlying only if no entry wants WETH.
+     * @param _requests Our exercises, see ExerciseRequest.
+     */
+    function exerciseBatch(ExerciseRequest[] calldata _requests) external {
+        if (_requests.length == 0) {
+            revert("Nothing to exercise");
+        }
+
+        // quote and check every entry before we borrow anything
+        _gasCheckpoint("start");
+        FlashData[] memory data = new FlashData[](_requests.length);
+        uint256[] memory wethNeeded = new uint256[](_requests.length);
+        uint256 totalWeth;
+        for (uint256 i; i < _requests.length; ++i) {
+            ExerciseRequest calldata request = _requests[i];
+            (data[i], wethNeeded[i]) = _prepareExercise(
+                request.oToken,
+                request.amount,
+                request.receiveUnderlying,
+                request.profitSlippageAllowed,
+                request.swapSlippageAllowed
+            );
+            _safeTransferFrom(
+                request.oToken,
+                msg.sender,
+                address(this),
+                request.amount
+            );
+            _gasCheckpoint("transfer");
+            totalWeth += wethNeeded[i];
+        }
+
+        // one flash loan for everything
+        _borrowPaymentToken(data, wethNeeded, totalWeth, false);
+        _gasCheckpoint("borrow");
+
+        // WETH is an output if any entry wants it, so we only sweep leftover WETH and
+        //  wBLT into underlying, as exercise() does, when every entry wants underlying
+        uint256 wethEntry = data.length;
+        for (uint256 i; i < data.length; ++i) {
+            if (!data[i].receiveUnderlying) {
+                wethEntry = i;
+                break;
+            }
+        }
+
+        // send out underlying for any entries that wanted it, each sweep using the
+        //  thresholds of the entry we convert into
+        for (uint256 i; i < data.length; ++i) {
+            if (!data[i].receiveUnderlying) {
+                continue;
+            }
+            address underlying = oTokenConfigs[data[i].oToken].underlying;
+            uint256 underlyingBalance;
+            if (wethEntry == data.length) {
+                (, , underlyingBalance) = _sweepLeftovers(
+                    underlying,
+                    data[i],
+                    wethNeeded[i]
+                );
+            } else {
+                underlyingBalance = IERC20(underlying).balanceOf(address(this));
+            }
+            if (underlyingBalance > 0) {
+                _safeTransfer(underlying, msg.sender, underlyingBalance);
+            }
+        }
+
+        // otherwise convert significant wBLT to WETH with our first WETH entry's
+        //  thresholds, then send everything
+        if (wethEntry < data.length) {
+            _sweepLeftovers(address(0), data[wethEntry], wethNeeded[wethEntry]);
+        }
+        _gasCheckpoint("sweep");
+        uint256 wBLTBalance = wBLT.balanceOf(address(this));
+        if (wBLTBalance > 0) {
+            _safeTransfer(address(wBLT), msg.sender, wBLTBalance);
+        }
+        uint256 wethBalance = weth.balanceOf(address(this));
+        if (wethBalance > 0) {
+            _safeTransfer(address(weth), msg.sender, wethBalance);
+        }
+        _gasCheckpoint("payout");
+    }
+
+    /**
+     * @notice Check a split sale of our underlying and add it to our flash loan info.
+     * @param _data Info for our flash loan, our split amounts are added here.
+     * @param _underlying Underlying token of the oToken we are exercising.
+     * @param _splits Paths from underlying to WETH and their shares out of 10,000.
+     */
+    function _quoteSplit(
+        FlashData memory _data,
+        address _underlying,
+        SwapSplit[] calldata _splits
+    ) internal view {
+        _data.splitRoutes = new IRouter.Route[][](_splits.length);
+        _data.splitAmounts = new uint256[](_splits.length);
+        _data.splitMinAmountsOut = new uint256[](_splits.length);
+
+        _checkSplitPairs(_splits);
+
+        uint256 remaining = _data.oTokenAmount;
+        uint256 totalShares;
+        uint256 totalOut;
+        for (uint256 i; i < _splits.length; ++i) {
+            IRouter.Route[] calldata routes = _splits[i].routes;
+            if (
+                routes.length == 0 ||
+                routes[0].from != _underlying ||
+                routes[routes.length - 1].to != address(weth)
+            ) {
+                revert("Split must sell underlying for WETH");
+            }
+            totalShares += _splits[i].share;
+
+            // last path gets any rounding dust
+            uint256 amountIn = i == _splits.length - 1
+                ? remaining
+                : (_data.oTokenAmount * _splits[i].share) / MAX_BPS;
+            remaining -= amountIn;
+
+            uint256[] memory amounts = router.getAmountsOut(amountIn, routes);
+            uint256 amountOut = amounts[routes.length];
+            totalOut += amountOut;
+
+            _data.splitRoutes[i] = routes;
+            _data.splitAmounts[i] = amountIn;
+            _data.splitMinAmountsOut[i] =
+                (amountOut * (MAX_BPS - _data.slippageAllowed)) /
+                MAX_BPS;
+        }
+
+        if (totalShares != MAX_BPS) {
+            revert("Split shares must total 10,000");
+        }
+
+        // our split should do at least as well as our default route
+        if (totalOut < _data.wethReceived) {
+            revert("Split worse than default route");
+        }
+        _data.wethReceived = totalOut;
+    }
+
+    /**
+     * @notice Make sure no two hops of our split swap through the same pair.
+     * @dev Each path is quoted against the same starting reserves, so paths sharing a
+     *  pair would each be quoted as if the others hadn't moved its price. Hops between
+     *  wBLT and WETH mint or redeem BLT instead of swapping through a pair.
+     * @param _splits Paths from underlying to WETH and their shares out of 10,000.
+     */
+    function _checkSplitPairs(SwapSplit[] calldata _splits) internal view {
+        uint256 hops;
+        for (uint256 i; i < _splits.length; ++i) {
+            hops += _splits[i].routes.length;
+        }
+
+        address[] memory pairs = new address[](hops);
+        uint256 count;
+        for (uint256 i; i < _splits.length; ++i) {
+            IRouter.Route[] calldata routes = _splits[i].routes;
+            for (uint256 j; j < routes.length; ++j) {
+                IRouter.Route calldata route = routes[j];
+                if (
+                    (route.from == address(wBLT) &&
+                        route.to == address(weth)) ||
+                    (route.from == address(weth) && route.to == address(wBLT))
+                ) {
+                    continue;
+                }
+
+                address pair = pairFactory.getPair(
+                    route.from,
+                    route.to,
+                    route.stable
+                );
+                for (uint256 k; k < count; ++k) {
+                    if (pairs[k] == pair) {
+                        revert("Split paths can't share a pair");
+                    }
+                }
+                pairs[count] = pair;
+                ++count;
+            }
+        }
+    }
+
+    /**
+     * @notice Split a token balance between owners by their oToken amounts, paying
+     *  each owner's payout address.
+     * @dev Last owner gets any rounding dust.
+     * @param _token Address of token to send.
+     * @param _total Amount of token to split.
+     * @param _entries Owners and amounts, see OnBehalfEntry.
+     * @param _totalAmount Sum of all entry amounts.
+     */
+    function _payProRata(
+        address _token,
+        uint256 _total,
+        OnBehalfEntry[] calldata _entries,
+        uint256 _totalAmount
+    ) internal {
+        if (_total == 0) {
+            return;
+        }
+        uint256 remaining = _total;
+        uint256 last = _entries.length - 1;
+        for (uint256 i; i < last; ++i) {
+            uint256 share = (_total * _entries[i].amount) / _totalAmount;
+            if (share > 0) {
+                _safeTransfer(_token, _payoutAddress(_entries[i].owner), share);
+                remaining -= share;
+            }
+        }
+        _safeTransfer(_token, _payoutAddress(_entries[last].owner), remaining);
+    }
+
+    /**
+     * @notice Where an owner's exerciseOnBehalf() proceeds go.
+     * @param _owner Owner of the oTokens exercised.
+     * @return payout Their payout address, or the owner if unset.
+     */
+    function _payoutAddress(
+        address _owner
+    ) internal view returns (address payout) {
+        payout = payoutAddresses[_owner];
+        if (payout == address(0)) {
+            payout = _owner;
+        }
+    }
+
+    /* ========== HELPER FUNCTIONS ========== */
+
+    /**
+     * @notice Swap just enough of our underlying to wBLT to exercise to LP.
+     * @param _oToken The option token we are exercising.
+     * @param _config The oToken's cached config.
+     * @param _oTokensToLp Amount of oToken we are exercising to LP.
+     * @param _discount Our discount percentage for LP.
+     */
+    function _zapToWblt(
+        address _oToken,
+        OTokenConfig memory _config,
+        uint256 _oTokensToLp,
+        uint256 _discount
+    ) internal {
+        (uint256 paymentAmount, ) = IoToken(_oToken)
+            .getPaymentTokenAmountForExerciseLp(_oTokensToLp, _discount);
+        uint256 zapAmount = _getZapAmountIn(
+            _config,
+            _oTokensToLp,
+            paymentAmount,
+            wBLT.balanceOf(address(this))
+        );
+
+        if (zapAmount > IERC20(_config.underlying).balanceOf(address(this))) {
+            revert("Need more wBLT, decrease _percentToLp or _discount values");
+        }
+
+        if (zapAmount > 0) {
+            bvmRouter.swapExactTokensForTokensSimple(
+                zapAmount,
+                0,
+                _config.underlying,
+                address(wBLT),
+                false,
+                address(this),
+                block.timestamp
+            );
+        }
+    }
+
+    /**
+     * @notice Smallest amount of underlying to swap to wBLT so we can pay for and pair
+     *  our underlying for LP, given that our swap also moves the LP ratio.
+     * @dev Swapping z (after fees) into reserves (u, w) leaves us with z * w / t wBLT
+     *  and needs L * u * w / t^2 wBLT to pair L underlying, where t = u + z. Covering
+     *  our payment P, less wBLT we already hold, means solving
+     *  (w - P) * t^2 - u * w * t - L * u * w >= 0 for t, rounding up throughout.
+     * @param _config The oToken's cached config.
+     * @param _oTokensToLp Amount of underlying we will pair for LP.
+     * @param _paymentAmount wBLT owed for exercising our LP oTokens.
+     * @param _wBLTBalance wBLT we already hold.
+     * @return Amount of underlying to swap, zero if we already have enough wBLT.
+     */
+    function _getZapAmountIn(
+        OTokenConfig memory _config,
+        uint256 _oTokensToLp,
+        uint256 _paymentAmount,
+        uint256 _wBLTBalance
+    ) internal view returns (uint256) {
+        (uint256 reserveIn, uint256 reserveOut, ) = IPair(_config.pair)
+            .getReserves();
+
+        // pairs sort their tokens by address
+        if (_config.underlying > address(wBLT)) {
+            (reserveIn, reserveOut) = (reserveOut, reserveIn);
+        }
+
+        uint256 matching = Math.mulDiv(
+            _oTokensToLp,
+            reserveOut,
+            reserveIn,
+            Math.Rounding.Up
+        );
+        if (_wBLTBalance >= _paymentAmount + matching) {
+            return 0;
+        }
+        if (reserveOut + _wBLTBalance <= _paymentAmount) {
+            revert("Need more wBLT, decrease _percentToLp or _discount values");
+        }
+
+        uint256 a = reserveOut + _wBLTBalance - _paymentAmount;
+        uint256 root = Math.sqrt(reserveOut * reserveOut + 4 * a * matching);
+        uint256 t = Math.mulDiv(
+            reserveIn,
+            reserveOut + root + 1,
+            2 * a,
+            Math.Rounding.Up
+        );
+
+        // gross up for our pair fee, plus a little extra for rounding in the swap
+        return
+            Math.mulDiv(
+                t - reserveIn,
+                MAX_BPS,
+                MAX_BPS - _config.pairFee,
+                Math.Rounding.Up
+            ) + 2;
+    }
+}
@@ -0,0 +1,671 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.8.19;
+
+import {IERC20} from "@openzeppelin/contracts@4.9.3/token/ERC20/ERC20.sol";
+import {Math} from "@openzeppelin/contracts@4.9.3/utils/math/Math.sol";
+import {IoToken, IRouter, wBLTExerciseBase} from "./wBLTExerciseBase.sol";
+import {wBLTExerciseHelper} from "./wBLTExerciseHelper.sol";
+
+/**
+ * @title wBLT Exercise Quoter
+ * @notice Read-only solvers and batch quoting built on top of wBLTExerciseHelper's quote
+ *  functions. These live in their own contract to keep the helper well under the
+ *  contract size limit.
+ */
+
+contract wBLTExerciseQuoter {
+    /// @notice Which of the helper's quote functions to use
+    enum QuoteMode {
+        Weth,
+        Underlying,
+        Lp
+    }
+
+    /// @notice One entry for quoteBatch(). percentToLp and discount are only used for LP.
+    struct QuoteRequest {
+        address oToken;
+        uint256 amount;
+        QuoteMode mode;
+        uint256 profitSlippageAllowed;
+        uint256 percentToLp;
+        uint256 discount;
+    }
+
+    /// @notice Result of one quoteBatch() entry. Fields not returned by the chosen quote
+    ///  function are left at zero, and success is false if the quote reverted.
+    struct QuoteResult {
+        bool success;
+        bool withinSlippageTolerance;
+        uint256 wethNeeded;
+        uint256 realProfit;
+        uint256 expectedProfit;
+        uint256 profitSlippage;
+        uint256 lpAmountOut;
+        uint256 wBLTOut;
+    }
+
+    /// @notice Running state for quoteExerciseLpStateful(), pair reserves are updated
+    ///  after each simulated swap
+    struct LpSimulation {
+        address underlying;
+        address pair;
+        uint256 pairFee;
+        uint256 reserveUnderlying;
+        uint256 reserveWblt;
+        uint256 wBLTBalance;
+        uint256 wethBalance;
+    }
+
+    /// @notice The exercise helper we quote against
+    wBLTExerciseHelper public immutable exerciseHelper;
+
+    /// @notice WETH, payment token
+    address internal constant weth = 0x4200000000000000000000000000000000000006;
+
+    /// @notice Wrapped BLT, our auto-compounding LP vault token
+    address internal constant wBLT = 0x4E74D4Db6c0726ccded4656d0BCE448876BB4C7A;
+
+    /// @notice BMX router, used for BLT mint and redeem pricing
+    IRouter internal constant router =
+        IRouter(0xf5A008cA68870f223cd76E31248Cd04aF6cb9AF3);
+
+    /// @notice BVM standard router, used for pair reserves
+    IRouter internal constant bvmRouter =
+        IRouter(0xE11b93B61f6291d35c5a2beA0A9fF169080160cF);
+
+    uint256 internal constant MAX_BPS = 10_000;
+
+    /// @notice Number of bisection steps when searching for a size within slippage
+    uint256 internal constant SEARCH_STEPS = 16;
+
+    /// @notice Treat exercise cost as linear once its fitted curve is this many times
+    ///  our size
+    uint256 internal constant LINEAR_COST_CUTOFF = 1e6;
+
+    constructor(address _exerciseHelper) {
+        exerciseHelper = wBLTExerciseHelper(_exerciseHelper);
+    }
+
+    /**
+     * @notice Find the largest _percentToLp that exerciseToLp() can handle without
+     *  running out of wBLT.
+     * @dev Feasibility only decreases as _percentToLp increases (we sell fewer oTokens
+     *  and need more wBLT), so we bisect over quoteExerciseLp(). Reverts if even
+     *  selling all oTokens isn't profitable.
+     * @param _oToken The option token we are exercising.
+     * @param _optionTokenAmount The amount of oToken to exercise to LP.
+     * @param _discount Our discount percentage for LP.
+     * @return percentToLp Largest feasible percent to LP, out of 10,000.
+     * @return lpAmountOut Simulated amount of LP token to receive.
+     * @return wBLTOut Simulated amount of leftover wBLT to receive.
+     */
+    function quoteMaxPercentToLp(
+        address _oToken,
+        uint256 _optionTokenAmount,
+        uint256 _discount
+    )
+        external
+        view
+        returns (uint256 percentToLp, uint256 lpAmountOut, uint256 wBLTOut)
+    {
+        // at 10,000 we sell nothing, and quoting zero always reverts
+        uint256 high = MAX_BPS - 1;
+        while (percentToLp < high) {
+            uint256 mid = (percentToLp + high + 1) / 2;
+            try
+                exerciseHelper.quoteExerciseLp(
+                    _oToken,
+                    _optionTokenAmount,
+                    0,
+                    mid,
+                    _discount
+                )
+            returns (bool, uint256 _lpAmountOut, uint256 _wBLTOut, uint256) {
+                percentToLp = mid;
+                lpAmountOut = _lpAmountOut;
+                wBLTOut = _wBLTOut;
+            } catch {
+                high = mid - 1;
+            }
+        }
+
+        // only selling worked (or nothing did), quote directly to bubble up any revert
+        if (percentToLp == 0) {
+            (, lpAmountOut, wBLTOut, ) = exerciseHelper.quoteExerciseLp(
+                _oToken,
+                _optionTokenAmount,
+                0,
+                0,
+                _discount
+            );
+        }
+    }
+
+    /**
+     * @notice Find the oToken amount (up to _maxAmount) that maximizes realProfit
+     *  when exercising to WETH.
+     * @dev Selling x oTokens through the pair returns kr * x / (a + x) WETH after fees.
+     *  The TWAP cost of exercising has the same shape, kc * x / (u + x), which we fit
+     *  from two cost quotes. Profit then peaks where the two derivatives meet, which
+     *  has a closed form. If that size is outside _profitSlippageAllowed, we bisect
+     *  down for the largest size that fits.
+     * @param _oToken The option token we are exercising.
+     * @param _maxAmount The most oToken we are willing to exercise.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @return optimalAmount Amount of oToken to exercise. Zero if nothing is profitable.
+     * @return wethNeeded How much WETH is needed for optimalAmount.
+     * @return realProfit Simulated profit in WETH after repaying flash loan.
+     * @return profitSlippage Expected profit slippage for optimalAmount, 18 decimals.
+     */
+    function quoteOptimalExerciseAmount(
+        address _oToken,
+        uint256 _maxAmount,
+        uint256 _profitSlippageAllowed
+    )
+        external
+        view
+        returns (
+            uint256 optimalAmount,
+            uint256 wethNeeded,
+            uint256 realProfit,
+            uint256 profitSlippage
+        )
+    {
+        if (_maxAmount == 0) {
+            revert("Can't exercise zero");
+        }
+
+        optimalAmount = _optimalAmount(_oToken, _maxAmount);
+        if (optimalAmount == 0) {
+            return (0, 0, 0, 0);
+        }
+
+        // make sure we're within slippage, otherwise bisect down
+        bool withinSlippageTolerance;
+        (
+            withinSlippageTolerance,
+            wethNeeded,
+            realProfit,
+            profitSlippage
+        ) = _tryQuote(_oToken, optimalAmount, _profitSlippageAllowed);
+        if (withinSlippageTolerance) {
+            return (optimalAmount, wethNeeded, realProfit, profitSlippage);
+        }
+
+        uint256 low;
+        uint256 high = optimalAmount;
+        optimalAmount = 0;
+        (wethNeeded, realProfit, profitSlippage) = (0, 0, 0);
+        for (uint256 i; i < SEARCH_STEPS; ++i) {
+            uint256 mid = (low + high) / 2;
+            (
+                bool _within,
+                uint256 _wethNeeded,
+                uint256 _realProfit,
+                uint256 _profitSlippage
+            ) = _tryQuote(_oToken, mid, _profitSlippageAllowed);
+            if (_within) {
+                low = mid;
+                (optimalAmount, wethNeeded, realProfit, profitSlippage) = (
+                    mid,
+                    _wethNeeded,
+                    _realProfit,
+                    _profitSlippage
+                );
+            } else {
+                high = mid;
+            }
+        }
+    }
+
+    /**
+     * @notice Simulate exerciseToLp() step by step, carrying pair reserves through
+     *  each swap, for a tighter quote than quoteExerciseLp().
+     * @dev quoteExerciseLp() prices every step against the starting reserves. Here we
+     *  follow exerciseToLp(): mint wBLT, exercise, sell underlying for WETH, convert
+     *  leftover WETH and underlying to wBLT, then LP, updating our pair's reserves
+     *  after each swap. BLT mint and redeem pricing and the oToken's TWAP are
+     *  treated as unchanged within the transaction.
+     * @param _oToken The option token we are exercising.
+     * @param _optionTokenAmount The amount of oToken to exercise to LP.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     * @param _percentToLp Out of 10,000. How much our oToken should we send to exercise
+     *  for LP?
+     * @param _discount Our discount percentage for LP. How long do we want to lock for?
+     * @return withinSlippageTolerance Whether expected vs real profit fall within our
+     *  slippage tolerance.
+     * @return lpAmountOut Simulated amount of LP token to receive.
+     * @return wBLTOut Simulated amount of wBLT to receive.
+     * @return profitSlippage Expected profit slippage with given oToken amount, 18
+     *  decimals. Zero means extra profit (positive slippage).
+     */
+    function quoteExerciseLpStateful(
+        address _oToken,
+        uint256 _optionTokenAmount,
+        uint256 _profitSlippageAllowed,
+        uint256 _percentToLp,
+        uint256 _discount
+    )
+        external
+        view
+        returns (
+            bool withinSlippageTolerance,
+            uint256 lpAmountOut,
+            uint256 wBLTOut,
+            uint256 profitSlippage
+        )
+    {
+        if (_percentToLp > MAX_BPS) {
+            revert("Percent must be < 10,000");
+        }
+
+        // correct our optionTokenAmount for our percent to LP
+        uint256 oTokensToSell = (_optionTokenAmount *
+            (MAX_BPS - _percentToLp)) / MAX_BPS;
+        uint256 realProfit;
+        uint256 wethNeeded;
+        (
+            wethNeeded,
+            withinSlippageTolerance,
+            realProfit,
+            ,
+            profitSlippage
+        ) = exerciseHelper.quoteExerciseToUnderlying(
+            _oToken,
+            oTokensToSell,
+            _profitSlippageAllowed
+        );
+
+        LpSimulation memory sim = _simulateSale(
+            _oToken,
+            oTokensToSell,
+            wethNeeded,
+            realProfit
+        );
+        (lpAmountOut, wBLTOut) = _simulateLp(
+            sim,
+            _oToken,
+            _optionTokenAmount - oTokensToSell,
+            _discount
+        );
+    }
+
+    /**
+     * @notice Run many quotes in one call, without letting one revert abort the rest.
+     * @param _requests oToken, amount, mode and slippage for each quote.
+     * @return results One result per request, in the same order.
+     */
+    function quoteBatch(
+        QuoteRequest[] calldata _requests
+    ) external view returns (QuoteResult[] memory results) {
+        results = new QuoteResult[](_requests.length);
+        for (uint256 i; i < _requests.length; ++i) {
+            QuoteRequest calldata request = _requests[i];
+            QuoteResult memory result = results[i];
+
+            if (request.mode == QuoteMode.Lp) {
+                try
+                    exerciseHelper.quoteExerciseLp(
+                        request.oToken,
+                        request.amount,
+                        request.profitSlippageAllowed,
+                        request.percentToLp,
+                        request.discount
+                    )
+                returns (
+                    bool withinSlippageTolerance,
+                    uint256 lpAmountOut,
+                    uint256 wBLTOut,
+                    uint256 profitSlippage
+                ) {
+                    result.success = true;
+                    result.withinSlippageTolerance = withinSlippageTolerance;
+                    result.lpAmountOut = lpAmountOut;
+                    result.wBLTOut = wBLTOut;
+                    result.profitSlippage = profitSlippage;
+                } catch {}
+            } else if (request.mode == QuoteMode.Weth) {
+                try
+                    exerciseHelper.quoteExerciseProfit(
+                        request.oToken,
+                        request.amount,
+                        request.profitSlippageAllowed
+                    )
+                returns (
+                    uint256 wethNeeded,
+                    bool withinSlippageTolerance,
+                    uint256 realProfit,
+                    uint256 expectedProfit,
+                    uint256 profitSlippage
+                ) {
+                    result.success = true;
+                    result.withinSlippageTolerance = withinSlippageTolerance;
+                    result.wethNeeded = wethNeeded;
+                    result.realProfit = realProfit;
+                    result.expectedProfit = expectedProfit;
+                    result.profitSlippage = profitSlippage;
+                } catch {}
+            } else {
+                try
+                    exerciseHelper.quoteExerciseToUnderlying(
+                        request.oToken,
+                        request.amount,
+                        request.profitSlippageAllowed
+                    )
+                returns (
+                    uint256 wethNeeded,
+                    bool withinSlippageTolerance,
+                    uint256 realProfit,
+                    uint256 expectedProfit,
+                    uint256 profitSlippage
+                ) {
+                    result.success = true;
+                    result.withinSlippageTolerance = withinSlippageTolerance;
+                    result.wethNeeded = wethNeeded;
+                    result.realProfit = realProfit;
+                    result.expectedProfit = expectedProfit;
+                    result.profitSlippage = profitSlippage;
+                } catch {}
+            }
+        }
+    }
+
+    /**
+     * @notice Closed-form profit-maximizing size, see quoteOptimalExerciseAmount().
+     * @param _oToken The option token we are exercising.
+     * @param _maxAmount The most oToken we are willing to exercise.
+     * @return Amount of oToken that maximizes realProfit, capped at _maxAmount.
+     */
+    function _optimalAmount(
+        address _oToken,
+        uint256 _maxAmount
+    ) internal view returns (uint256) {
+        // our sell side, a is underlying reserve net of pair fee, kr is wBLT reserve in
+        //  WETH net of our fee
+        wBLTExerciseBase.OTokenConfig memory config = exerciseHelper
+            .getOTokenConfig(_oToken);
+        (uint256 a, uint256 kr) = bvmRouter.getReserves(
+            config.underlying,
+            wBLT,
+            false
+        );
+        a = (a * MAX_BPS) / (MAX_BPS - config.pairFee);
+
+        IRouter.Route[] memory wBltToWeth = new IRouter.Route[](1);
+        wBltToWeth[0] = IRouter.Route(wBLT, weth, false);
+        kr =
+            (((kr * router.getAmountsOut(1e18, wBltToWeth)[1]) / 1e18) *
+                (MAX_BPS - exerciseHelper.fee())) /
+            MAX_BPS;
+
+        // fit our cost curve from half and full size
+        uint256 x1 = _maxAmount / 2;
+        uint256 cost1 = _exerciseCost(_oToken, x1);
+        uint256 cost2 = _exerciseCost(_oToken, _maxAmount);
+        if (cost2 == 0) {
+            return _maxAmount;
+        }
+
+        if (
+            cost2 <= cost1 ||
+            cost1 * _maxAmount <= cost2 * x1 ||
+            x1 * (cost2 - cost1) >
+            LINEAR_COST_CUTOFF * (cost1 * _maxAmount - cost2 * x1)
+        ) {
+            // cost is effectively linear, so profit peaks where marginal revenue is
+            //  cost2 / _maxAmount
+            uint256 target = Math.sqrt(((kr * a) / cost2) * _maxAmount);
+            return target <= a ? 0 : Math.min(target - a, _maxAmount);
+        }
+
+        uint256 u = (x1 * _maxAmount * (cost2 - cost1)) /
+            (cost1 * _maxAmount - cost2 * x1);
+        uint256 sellSide = Math.sqrt(kr * a);
+        uint256 costSide = Math.sqrt(
+            ((cost2 * (u + _maxAmount)) / _maxAmount) * u
+        );
+
+        // marginal profit has the sign of (sellSide - costSide) * x + gains at zero
+        bool gainsAtZero = sellSide * u > costSide * a;
+        if (sellSide > costSide || (sellSide == costSide && gainsAtZero)) {
+            return _maxAmount;
+        } else if (gainsAtZero) {
+            return
+                Math.min(
+                    (sellSide * u - costSide * a) / (costSide - sellSide),
+                    _maxAmount
+                );
+        }
+        return 0;
+    }
+
+    /**
+     * @notice WETH cost of exercising a given amount of oToken.
+     * @param _oToken The option token we are exercising.
+     * @param _amount The amount of oToken to exercise.
+     */
+    function _exerciseCost(
+        address _oToken,
+        uint256 _amount
+    ) internal view returns (uint256) {
+        if (_amount == 0) {
+            return 0;
+        }
+        return
+            router.quoteMintAmountBLT(
+                weth,
+                IoToken(_oToken).getDiscountedPrice(_amount)
+            );
+    }
+
+    /**
+     * @notice Quote exercising to WETH, treating any revert as out of tolerance.
+     * @param _oToken The option token we are exercising.
+     * @param _amount The amount of oToken to exercise to WETH.
+     * @param _profitSlippageAllowed Considers effect of TWAP vs spot pricing of options
+     *  on profit outcomes.
+     */
+    function _tryQuote(
+        address _oToken,
+        uint256 _amount,
+        uint256 _profitSlippageAllowed
+    )
+        internal
+        view
+        returns (
+            bool withinSlippageTolerance,
+            uint256 wethNeeded,
+            uint256 realProfit,
+            uint256 profitSlippage
+        )
+    {
+        if (_amount == 0) {
+            return (false, 0, 0, 0);
+        }
+        try
+            exerciseHelper.quoteExerciseProfit(
+                _oToken,
+                _amount,
+                _profitSlippageAllowed
+            )
+        returns (
+            uint256 _wethNeeded,
+            bool _withinSlippageTolerance,
+            uint256 _realProfit,
+            uint256,
+            uint256 _profitSlippage
+        ) {
+            return (
+                _withinSlippageTolerance,
+                _wethNeeded,
+                _realProfit,
+                _profitSlippage
+            );
+        } catch {
+            return (false, 0, 0, 0);
+        }
+    }
+
+    /**
+     * @notice Load our oToken's pair for a stateful simulation.
+     * @dev Uses the helper's pair and pair fee, so we simulate the fee it quotes with.
+     * @param _oToken The option token we are simulating.
+     */
+    function _startSimulation(
+        address _oToken
+    ) internal view returns (LpSimulation memory sim) {
+        wBLTExerciseBase.OTokenConfig memory config = exerciseHelper
+            .getOTokenConfig(_oToken);
+        sim.underlying = config.underlying;
+        sim.pair = config.pair;
+        sim.pairFee = config.pairFee;
+        (sim.reserveUnderlying, sim.reserveWblt) = bvmRouter.getReserves(
+            sim.underlying,
+            wBLT,
+            false
+        );
+    }
+
+    /**
+     * @notice Simulate our flash loan and leftover swaps in exerciseToLp().
+     * @param _oToken The option token we are exercising.
+     * @param _oTokensToSell Amount of oToken we exercise to underlying.
+     * @param _wethNeeded How much WETH we borrow.
+     * @param _realProfit Underlying left after repaying our flash loan.
+     * @return sim Our pair reserves and balances, ready to LP.
+     */
+    function _simulateSale(
+        address _oToken,
+        uint256 _oTokensToSell,
+        uint256 _wethNeeded,
+        uint256 _realProfit
+    ) internal view returns (LpSimulation memory sim) {
+        sim = _startSimulation(_oToken);
+
+        // our fee is based on selling all of our underlying at starting reserves
+        uint256 wethReceived = _convert(
+            _getAmountOut(sim, _oTokensToSell),
+            wBLT,
+            weth
+        );
+        uint256 feeAmount = (wethReceived * exerciseHelper.fee()) / MAX_BPS;
+
+        // mint wBLT with our borrowed WETH, and pay to exercise
+        sim.wBLTBalance =
+            _convert(_wethNeeded, weth, wBLT) -
+            IoToken(_oToken).getDiscountedPrice(_oTokensToSell);
+
+        // sell just enough underlying to repay our flash loan and fee
+        sim.wethBalance = _convert(
+            _swapToWblt(sim, _oTokensToSell - _realProfit),
+            wBLT,
+            weth
+        );
+        if (sim.wethBalance < _wethNeeded + feeAmount) {
+            revert("Not enough WETH out");
+        }
+        sim.wethBalance -= _wethNeeded + feeAmount;
+
+        // convert significant leftovers to wBLT, same cutoffs as exerciseToLp()
+        (uint256 wethMin, , uint256 underlyingMin) = exerciseHelper
+            .getDustThresholds(
+                _oToken,
+                _oTokensToSell,
+                _wethNeeded,
+                0,
+                wethReceived
+            );
+        if (sim.wethBalance > wethMin) {
+            sim.wBLTBalance += _convert(sim.wethBalance, weth, wBLT);
+            sim.wethBalance = 0;
+        }
+        if (_realProfit > underlyingMin) {
+            sim.wBLTBalance += _swapToWblt(sim, _realProfit);
+        }
+    }
+
+    /**
+     * @notice Simulate exercising to LP at our updated reserves.
+     * @param _sim Our pair reserves and balances after our swaps.
+     * @param _oToken The option token we are exercising.
+     * @param _oTokensToLp Amount of oToken we exercise to LP.
+     * @param _discount Our discount percentage for LP.
+     * @return lpAmountOut Simulated amount of LP token to receive.
+     * @return wBLTOut Simulated amount of wBLT to receive.
+     */
+    function _simulateLp(
+        LpSimulation memory _sim,
+        address _oToken,
+        uint256 _oTokensToLp,
+        uint256 _discount
+    ) internal view returns (uint256 lpAmountOut, uint256 wBLTOut) {
+        (uint256 paymentAmount, ) = IoToken(_oToken)
+            .getPaymentTokenAmountForExerciseLp(_oTokensToLp, _discount);
+        uint256 matchingForLp = (_oTokensToLp * _sim.reserveWblt) /
+            _sim.reserveUnderlying;
+        if (paymentAmount + matchingForLp > _sim.wBLTBalance) {
+            revert("Need more wBLT, decrease _percentToLp or _discount values");
+        }
+
+        uint256 totalSupply = IERC20(_sim.pair).totalSupply();
+        lpAmountOut = Math.min(
+            (_oTokensToLp * totalSupply) / _sim.reserveUnderlying,
+            (matchingForLp * totalSupply) / _sim.reserveWblt
+        );
+        wBLTOut = _sim.wBLTBalance - paymentAmount - matchingForLp;
+    }
+
+    /**
+     * @notice Quote swapping underlying to wBLT through our pair, same as
+     *  pair.getAmountOut().
+     * @param _sim Current simulation state.
+     * @param _amount Amount of underlying to swap.
+     * @return wBLT received.
+     */
+    function _getAmountOut(
+        LpSimulation memory _sim,
+        uint256 _amount
+    ) internal pure returns (uint256) {
+        _amount -= (_amount * _sim.pairFee) / MAX_BPS;
+        return
+            (_amount * _sim.reserveWblt) / (_sim.reserveUnderlying + _amount);
+    }
+
+    /**
+     * @notice Simulate swapping underlying to wBLT through our pair, updating our
+     *  reserves. Pair fees are sent out of the pair, so only the rest is added.
+     * @param _sim Current simulation state.
+     * @param _amount Amount of underlying to swap.
+     * @return amountOut wBLT received.
+     */
+    function _swapToWblt(
+        LpSimulation memory _sim,
+        uint256 _amount
+    ) internal pure returns (uint256 amountOut) {
+        amountOut = _getAmountOut(_sim, _amount);
+        _sim.reserveUnderlying += _amount - (_amount * _sim.pairFee) / MAX_BPS;
+        _sim.reserveWblt -= amountOut;
+    }
+
+    /**
+     * @notice BLT mint or redeem through our router, these don't touch our pair.
+     * @param _amount Amount of _from to convert.
+     * @param _from Token we are converting from, WETH or wBLT.
+     * @param _to Token we are converting to, WETH or wBLT.
+     * @return Amount of _to received.
+     */
+    function _convert(
+        uint256 _amount,
+        address _from,
+        address _to
+    ) internal view returns (uint256) {
+        if (_amount == 0) {
+            return 0;
+        }
+        IRouter.Route[] memory route = new IRouter.Route[](1);
+        route[0] = IRouter.Route(_from, _to, false);
+        return router.getAmountsOut(_amount, route)[1];
+    }
+}
@@ -0,0 +1,31 @@
+"""
+Offline mirror of wBLTExerciseHelper's quote math.
+
+Quotes are computed from a Snapshot of chain state with no RPC calls. Use
+exercise_helper.chain.load_snapshot() to build one from a live (or forked) chain.
+"""
+
+from .amm import (
+    Hop,
+    get_amount_in,
+    get_amount_out,
+    get_amounts_in,
+    get_stable_amount_in,
+    get_stable_amount_out,
+    get_zap_amount_in,
+    quote_add_liquidity,
+)
+from .errors import Revert
+from .quotes import (
+    ExerciseQuote,
+    LpQuote,
+    get_discounted_price,
+    get_payment_token_amount_for_exercise_lp,
+    quote_all,
+    quote_exercise_lp,
+    quote_exercise_profit,
+    quote_exercise_to_underlying,
+    simulate_exercise_lp,
+)
+from .snapshot import BltRates, OToken, Pair, Snapshot
+from .solvers import OptimalExercise, max_percent_to_lp, optimal_exercise_amount
@@ -0,0 +1,273 @@
+from math import isqrt
+from typing import List, NamedTuple, Sequence, Tuple
+
+from .errors import Revert
+from .snapshot import MAX_BPS
+
+# burned on the first deposit to a pair, same as the BVM router
+MINIMUM_LIQUIDITY = 10**3
+
+# stable pair math is done with reserves normalized to 18 decimals
+STABLE_PRECISION = 10**18
+
+
+class Hop(NamedTuple):
+    """
+    One pair along a swap path. Plain (reserve_in, reserve_out, pair_fee) tuples
+    work too, and are treated as volatile pairs.
+
+    Decimals are 10**decimals, as returned by pair.metadata(), and only matter for
+    stable pairs.
+    """
+
+    reserve_in: int
+    reserve_out: int
+    pair_fee: int
+    stable: bool = False
+    decimals_in: int = STABLE_PRECISION
+    decimals_out: int = STABLE_PRECISION
+
+
+def get_amount_out(
+    amount_in: int, reserve_in: int, reserve_out: int, pair_fee: int
+) -> int:
+    """
+    Output of a volatile pair swap, fee taken from the input like pair.getAmountOut().
+
+    :param amount_in: Amount of the input token to swap.
+    :param reserve_in: Pair reserve of the input token.
+    :param reserve_out: Pair reserve of the output token.
+    :param pair_fee: Pair swap fee, out of 10,000.
+    :return: Amount of the output token received.
+    """
+    amount_in -= (amount_in * pair_fee) // MAX_BPS
+    return (amount_in * reserve_out) // (reserve_in + amount_in)
+
+
+def get_amount_in(
+    amount_out: int, reserve_in: int, reserve_out: int, pair_fee: int
+) -> int:
+    """
+    Mirror of the helper's _getAmountIn().
+
+    :param amount_out: Minimum amount we need to receive of the output token.
+    :param reserve_in: Pair reserve of the input token.
+    :param reserve_out: Pair reserve of the output token.
+    :param pair_fee: Pair swap fee, out of 10,000.
+    :return: Amount of the input token to swap to receive amount_out.
+    """
+    if amount_out == 0:
+        raise Revert("_getAmountIn: _amountOut must be >0")
+    if reserve_in == 0 or reserve_out == 0:
+        raise Revert("_getAmountIn: Reserves must be >0")
+    if amount_out > reserve_out:
+        raise Revert("Panic: arithmetic underflow")
+    numerator = reserve_in * amount_out * MAX_BPS
+    denominator = (reserve_out - amount_out) * (MAX_BPS - pair_fee)
+    if denominator == 0:
+        raise Revert("Panic: division by zero")
+    return numerator // denominator + 1
+
+
+def _k(x: int, y: int) -> int:
+    return (
+        ((x * y) // STABLE_PRECISION)
+        * ((x * x) // STABLE_PRECISION + (y * y) // STABLE_PRECISION)
+        // STABLE_PRECISION
+    )
+
+
+def _get_y(x0: int, xy: int, y: int) -> int:
+    # same Newton's method as the pair's _get_y()
+    p = STABLE_PRECISION
+    for _ in range(255):
+        y_prev = y
+        k = (x0 * (((y * y) // p) * y // p)) // p + (
+            (((x0 * x0) // p) * x0 // p) * y
+        ) // p
+        d = (3 * x0 * ((y * y) // p)) // p + (((x0 * x0) // p) * x0 // p)
+        if k < xy:
+            y += ((xy - k) * p) // d
+        else:
+            y -= ((k - xy) * p) // d
+        if abs(y - y_prev) <= 1:
+            return y
+    return y
+
+
+def get_stable_amount_out(
+    amount_in: int,
+    reserve_in: int,
+    reserve_out: int,
+    pair_fee: int,
+    decimals_in: int = STABLE_PRECISION,
+    decimals_out: int = STABLE_PRECISION,
+) -> int:
+    """
+    Output of a stable pair swap, same as pair.getAmountOut() with stable=True.
+
+    :param amount_in: Amount of the input token to swap.
+    :param reserve_in: Pair reserve of the input token.
+    :param reserve_out: Pair reserve of the output token.
+    :param pair_fee: Pair swap fee, out of 10,000.
+    :param decimals_in: 10**decimals of the input token.
+    :param decimals_out: 10**decimals of the output token.
+    :return: Amount of the output token received.
+    """
+    amount_in -= (amount_in * pair_fee) // MAX_BPS
+    xy = _k(
+        (reserve_in * STABLE_PRECISION) // decimals_in,
+        (reserve_out * STABLE_PRECISION) // decimals_out,
+    )
+    reserve_in = (reserve_in * STABLE_PRECISION) // decimals_in
+    reserve_out = (reserve_out * STABLE_PRECISION) // decimals_out
+    amount_in = (amount_in * STABLE_PRECISION) // decimals_in
+    y = reserve_out - _get_y(amount_in + reserve_in, xy, reserve_out)
+    return (y * decimals_out) // STABLE_PRECISION
+
+
+def get_stable_amount_in(
+    amount_out: int,
+    reserve_in: int,
+    reserve_out: int,
+    pair_fee: int,
+    decimals_in: int = STABLE_PRECISION,
+    decimals_out: int = STABLE_PRECISION,
+) -> int:
+    """
+    Mirror of the quoter's _getStableAmountIn().
+
+    :param amount_out: Minimum amount we need to receive of the output token.
+    :param reserve_in: Pair reserve of the input token.
+    :param reserve_out: Pair reserve of the output token.
+    :param pair_fee: Pair swap fee, out of 10,000.
+    :param decimals_in: 10**decimals of the input token.
+    :param decimals_out: 10**decimals of the output token.
+    :return: Amount of the input token to swap to receive amount_out.
+    """
+    if amount_out == 0:
+        raise Revert("_getAmountIn: _amountOut must be >0")
+    if reserve_in == 0 or reserve_out == 0:
+        raise Revert("_getAmountIn: Reserves must be >0")
+    reserve_in = (reserve_in * STABLE_PRECISION) // decimals_in
+    reserve_out = (reserve_out * STABLE_PRECISION) // decimals_out
+    xy = _k(reserve_in, reserve_out)
+
+    # round our output up so we never come up short
+    reserve_out -= -(-amount_out * STABLE_PRECISION // decimals_out)
+    if reserve_out < 0:
+        raise Revert("Panic: arithmetic underflow")
+
+    amount_in = (
+        (_get_y(reserve_out, xy, reserve_in) - reserve_in) * decimals_in
+    ) // STABLE_PRECISION + 1
+    return (amount_in * MAX_BPS) // (MAX_BPS - pair_fee) + 1
+
+
+def get_amounts_in(amount_out: int, hops: Sequence[Tuple]) -> List[int]:
+    """
+    Mirror of the helper's getAmountsIn() and getAmountsInForRoutes().
+
+    :param amount_out: Minimum amount we need to receive of the final token.
+    :param hops: Hop (or (reserve_in, reserve_out, pair_fee) for volatile pairs) for
+        each pair along our path, in swap order. A path of n tokens has n - 1 hops.
+    :return: Amounts for each token in our swap path.
+    """
+    if len(hops) < 1:
+        raise Revert("getAmountsIn: Path length must be >1")
+    amounts = [0] * (len(hops) + 1)
+    amounts[-1] = amount_out
+    for i in range(len(hops), 0, -1):
+        hop = Hop(*hops[i - 1])
+        if hop.stable:
+            amounts[i - 1] = get_stable_amount_in(
+                amounts[i],
+                hop.reserve_in,
+                hop.reserve_out,
+                hop.pair_fee,
+                hop.decimals_in,
+                hop.decimals_out,
+            )
+        else:
+            amounts[i - 1] = get_amount_in(
+                amounts[i], hop.reserve_in, hop.reserve_out, hop.pair_fee
+            )
+    return amounts
+
+
+def quote_add_liquidity(
+    amount_a_desired: int,
+    amount_b_desired: int,
+    reserve_a: int,
+    reserve_b: int,
+    total_supply: int,
+) -> Tuple[int, int, int]:
+    """
+    Mirror of the BVM router's quoteAddLiquidity() for an existing volatile pair.
+
+    :return: amountA, amountB and liquidity minted.
+    """
+    if reserve_a == 0 and reserve_b == 0:
+        liquidity = isqrt(amount_a_desired * amount_b_desired) - MINIMUM_LIQUIDITY
+        return amount_a_desired, amount_b_desired, liquidity
+
+    amount_b_optimal = (amount_a_desired * reserve_b) // reserve_a
+    if amount_b_optimal <= amount_b_desired:
+        amount_a, amount_b = amount_a_desired, amount_b_optimal
+    else:
+        amount_a = (amount_b_desired * reserve_a) // reserve_b
+        amount_b = amount_b_desired
+    liquidity = min(
+        (amount_a * total_supply) // reserve_a, (amount_b * total_supply) // reserve_b
+    )
+    return amount_a, amount_b, liquidity
+
+
+def time_weighted_average_price(
+    amount: int, observations: Sequence[Tuple[int, int]]
+) -> int:
+    """
+    Mirror of an oToken's getTimeWeightedAveragePrice().
+
+    Each window is priced with the pair's fee-less _getAmountOut() against that
+    window's time-weighted reserves, then we take the simple average.
+
+    :param amount: Amount of underlying to price.
+    :param observations: Time-weighted (underlying, wBLT) reserves per window.
+    :return: wBLT value of amount.
+    """
+    summed = 0
+    for reserve_underlying, reserve_wblt in observations:
+        summed += (amount * reserve_wblt) // (reserve_underlying + amount)
+    return summed // len(observations)
+
+
+def get_zap_amount_in(
+    option_tokens_to_lp: int,
+    payment_amount: int,
+    wblt_balance: int,
+    reserve_underlying: int,
+    reserve_wblt: int,
+    pair_fee: int,
+) -> int:
+    """
+    Mirror of the helper's _getZapAmountIn().
+
+    :param option_tokens_to_lp: Amount of underlying we will pair for LP.
+    :param payment_amount: wBLT owed for exercising our LP oTokens.
+    :param wblt_balance: wBLT we already hold.
+    :param reserve_underlying: Pair reserve of underlying, before our zap.
+    :param reserve_wblt: Pair reserve of wBLT, before our zap.
+    :param pair_fee: Pair swap fee, out of 10,000.
+    :return: Amount of underlying to swap, zero if we already have enough wBLT.
+    """
+    matching = -(-option_tokens_to_lp * reserve_wblt // reserve_underlying)
+    if wblt_balance >= payment_amount + matching:
+        return 0
+    if reserve_wblt + wblt_balance <= payment_amount:
+        raise Revert("Need more wBLT, decrease _percentToLp or _discount values")
+
+    a = reserve_wblt + wblt_balance - payment_amount
+    root = isqrt(reserve_wblt * reserve_wblt + 4 * a * matching)
+    t = -(-reserve_underlying * (reserve_wblt + root + 1) // (2 * a))
+    return -(-(t - reserve_underlying) * MAX_BPS // (MAX_BPS - pair_fee)) + 2
@@ -0,0 +1,235 @@
+"""
+Backtest exercise policies against a file of per-block snapshots.
+
+Snapshots are stored as CSV, one block per row, with the columns in SNAPSHOT_COLUMNS
+followed by a twap_reserve_underlying_<i>, twap_reserve_wblt_<i> pair for each of the
+oToken's TWAP windows, oldest first. We stream the file in chunks and quote every row
+of a chunk at once with exercise_helper.vectorized, so files of millions of rows
+never need to fit in memory.
+
+Each row is quoted on its own, so we assume arbitrage resets the pool between our
+exercises. Use exercise_helper.scheduler to plan around our own price impact.
+"""
+
+import csv
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from .snapshot import MAX_BPS, PRECISION, BltRates, OToken, Pair, Snapshot
+from .vectorized import _weth_received, exercise_profit_curve
+
+SNAPSHOT_COLUMNS = (
+    "block",
+    "reserve_underlying",
+    "reserve_wblt",
+    "pair_fee",
+    "discount",
+    "mint_price",
+    "redeem_price",
+    "wblt_per_weth",
+    "weth_per_wblt",
+    "helper_fee",
+)
+
+# rows quoted at once, about 100 MB of float64 working arrays
+DEFAULT_CHUNK_ROWS = 100_000
+
+# profit slippage histogram bins, 1% wide, as returned by our quotes (1e18 = 100%)
+SLIPPAGE_BINS = np.linspace(0, PRECISION, 101)
+
+
+class ExercisePolicy(NamedTuple):
+    """
+    When and how much we exercise to WETH.
+
+    :param amount: oToken to exercise each time.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :param every_blocks: Only try on blocks that are a multiple of this.
+    :param min_profit: Skip blocks where our real profit (in WETH) is below this.
+    """
+
+    amount: int
+    profit_slippage_allowed: int = 500
+    every_blocks: int = 1
+    min_profit: int = 0
+
+
+class BacktestReport(NamedTuple):
+    """
+    Results of one policy. Profit and fees are in WETH.
+
+    :param rows: Blocks the policy tried to exercise on.
+    :param exercises: Blocks where the exercise would have gone through.
+    :param exercised: Total oToken exercised.
+    :param realized_profit: Sum of real profit, after our fee.
+    :param fees_paid: Sum of fees sent to feeAddress.
+    :param slippage_histogram: Count of exercises in each SLIPPAGE_BINS bin.
+    """
+
+    rows: int
+    exercises: int
+    exercised: int
+    realized_profit: float
+    fees_paid: float
+    slippage_histogram: np.ndarray
+
+    def slippage_percentile(self, percentile: float) -> float:
+        """
+        Profit slippage (1e18 = 100%) at percentile, rounded up to its 1% bin.
+
+        :param percentile: Between 0 and 100.
+        """
+        if self.exercises == 0:
+            return 0.0
+        cumulative = np.cumsum(self.slippage_histogram)
+        index = np.searchsorted(cumulative, self.exercises * percentile / 100)
+        return float(SLIPPAGE_BINS[min(index + 1, len(SLIPPAGE_BINS) - 1)])
+
+
+def snapshot_row(block: int, snapshot: Snapshot) -> List[int]:
+    """
+    Flatten a snapshot into a row for write_snapshots().
+
+    :param block: Block the snapshot was taken at.
+    :param snapshot: Snapshot to store.
+    :return: Values in SNAPSHOT_COLUMNS order, then the TWAP windows.
+    """
+    row = [
+        block,
+        snapshot.pair.reserve_underlying,
+        snapshot.pair.reserve_wblt,
+        snapshot.pair.fee,
+        snapshot.otoken.discount,
+        snapshot.blt.mint_price,
+        snapshot.blt.redeem_price,
+        snapshot.blt.wblt_per_weth,
+        snapshot.blt.weth_per_wblt,
+        snapshot.fee,
+    ]
+    for window in snapshot.otoken.twap_observations:
+        row.extend(window)
+    return row
+
+
+def write_snapshots(path: str, rows: Iterable[Tuple[int, Snapshot]]):
+    """
+    Write (block, snapshot) pairs to path, such as from chain.load_snapshot().
+
+    :param path: CSV file to write.
+    :param rows: Snapshots to store, all with the same number of TWAP windows.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        header = None
+        for block, snapshot in rows:
+            if header is None:
+                header = list(SNAPSHOT_COLUMNS)
+                for i in range(len(snapshot.otoken.twap_observations)):
+                    header += [f"twap_reserve_underlying_{i}", f"twap_reserve_wblt_{i}"]
+                writer.writerow(header)
+            writer.writerow(snapshot_row(block, snapshot))
+
+
+def read_snapshots(
+    path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Iterator[Tuple[np.ndarray, Snapshot]]:
+    """
+    Stream a snapshot file in chunks.
+
+    :param path: CSV file written by write_snapshots(), or with the same columns.
+    :param chunk_rows: Rows to load at once.
+    :return: Iterator of (blocks, snapshot), with each snapshot field an array of
+        chunk values.
+    """
+    with open(path) as f:
+        header = f.readline().strip().split(",")
+        if tuple(header[: len(SNAPSHOT_COLUMNS)]) != SNAPSHOT_COLUMNS:
+            raise ValueError(f"Snapshot columns must start with {SNAPSHOT_COLUMNS}")
+        windows = (len(header) - len(SNAPSHOT_COLUMNS)) // 2
+        if windows == 0:
+            raise ValueError("Snapshot file has no TWAP windows")
+
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if not lines:
+                return
+            data = np.loadtxt(lines, delimiter=",", dtype=np.float64, ndmin=2)
+            columns = dict(zip(SNAPSHOT_COLUMNS, data.T))
+            twap = data[:, len(SNAPSHOT_COLUMNS) :]
+            yield columns["block"], Snapshot(
+                pair=Pair(
+                    reserve_underlying=columns["reserve_underlying"],
+                    reserve_wblt=columns["reserve_wblt"],
+                    fee=columns["pair_fee"],
+                ),
+                otoken=OToken(
+                    discount=columns["discount"],
+                    twap_observations=tuple(
+                        (twap[:, 2 * i], twap[:, 2 * i + 1]) for i in range(windows)
+                    ),
+                ),
+                blt=BltRates(
+                    mint_price=columns["mint_price"],
+                    redeem_price=columns["redeem_price"],
+                    wblt_per_weth=columns["wblt_per_weth"],
+                    weth_per_wblt=columns["weth_per_wblt"],
+                ),
+                fee=columns["helper_fee"],
+            )
+
+
+def backtest(
+    path: str,
+    policies: Sequence[ExercisePolicy],
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> List[BacktestReport]:
+    """
+    Run each policy over every block in path, in a single pass over the file.
+
+    :param path: Snapshot file, see read_snapshots().
+    :param policies: Policies to evaluate.
+    :param chunk_rows: Rows to load and quote at once.
+    :return: One BacktestReport per policy, in the same order.
+    """
+    totals = [
+        {
+            "rows": 0,
+            "exercises": 0,
+            "exercised": 0,
+            "realized_profit": 0.0,
+            "fees_paid": 0.0,
+            "slippage_histogram": np.zeros(len(SLIPPAGE_BINS) - 1, dtype=np.int64),
+        }
+        for _ in policies
+    ]
+
+    for blocks, snapshot in read_snapshots(path, chunk_rows):
+        for policy, total in zip(policies, totals):
+            active = blocks % policy.every_blocks == 0
+            amounts = np.full(len(blocks), float(policy.amount))
+            curve = exercise_profit_curve(
+                snapshot, amounts, policy.profit_slippage_allowed
+            )
+            executed = (
+                active
+                & curve.valid
+                & curve.within_slippage_tolerance
+                & (curve.real_profit >= policy.min_profit)
+            )
+
+            # same estimate as our quotes, a cut of the WETH from selling underlying
+            fees = np.floor(_weth_received(snapshot, amounts) * snapshot.fee / MAX_BPS)
+
+            count = int(executed.sum())
+            total["rows"] += int(active.sum())
+            total["exercises"] += count
+            total["exercised"] += policy.amount * count
+            total["realized_profit"] += float(curve.real_profit[executed].sum())
+            total["fees_paid"] += float(fees[executed].sum())
+            total["slippage_histogram"] += np.histogram(
+                curve.profit_slippage[executed], bins=SLIPPAGE_BINS
+            )[0]
+
+    return [BacktestReport(**total) for total in totals]
@@ -0,0 +1,130 @@
+import time
+
+from brownie import chain
+
+from .snapshot import PRECISION, BltRates, OToken, Pair, Snapshot
+from .state import cached_contract
+
+# these match the constants hardcoded in wBLTExerciseHelper
+WETH = "0x4200000000000000000000000000000000000006"
+WBLT = "0x4E74D4Db6c0726ccded4656d0BCE448876BB4C7A"
+ROUTER = "0xf5A008cA68870f223cd76E31248Cd04aF6cb9AF3"
+BVM_ROUTER = "0xE11b93B61f6291d35c5a2beA0A9fF169080160cF"
+BALANCER_VAULT = "0xBA12222222228d8Ba445958a75a0704d566BF2C8"
+PAIR_FACTORY = "0xe21Aac7F113Bd5DC2389e4d8a8db854a87fD6951"
+
+
+def _twap_observations(pair, underlying_is_token0, points):
+    # same windows as pair.sample(tokenIn, amountIn, points, 1)
+    length = pair.observationLength()
+    observations = [pair.observations(i) for i in range(length - 1 - points, length)]
+    windows = []
+    for older, newer in zip(observations, observations[1:]):
+        elapsed = newer[0] - older[0]
+        reserve0 = (newer[1] - older[1]) // elapsed
+        reserve1 = (newer[2] - older[2]) // elapsed
+        if underlying_is_token0:
+            windows.append((reserve0, reserve1))
+        else:
+            windows.append((reserve1, reserve0))
+    return tuple(windows)
+
+
+def load_snapshot(helper, otoken) -> Snapshot:
+    """
+    Read everything needed to quote an oToken offline from the current block.
+
+    :param helper: Deployed wBLTExerciseHelper, used for its fee.
+    :param otoken: oToken contract we want to quote.
+    :return: Snapshot of the current state.
+    """
+    router = cached_contract(ROUTER)
+    pair_factory = cached_contract(PAIR_FACTORY)
+    underlying = otoken.underlyingToken()
+    pair = cached_contract(pair_factory.getPair(underlying, WBLT, False))
+
+    reserve0, reserve1 = pair.getReserves()[:2]
+    underlying_is_token0 = pair.token0() == underlying
+    if not underlying_is_token0:
+        reserve0, reserve1 = reserve1, reserve0
+
+    return Snapshot(
+        pair=Pair(
+            reserve_underlying=reserve0,
+            reserve_wblt=reserve1,
+            fee=pair_factory.getFee(pair),
+            total_supply=pair.totalSupply(),
+        ),
+        otoken=OToken(
+            discount=otoken.discount(),
+            twap_observations=_twap_observations(
+                pair, underlying_is_token0, otoken.twapPoints()
+            ),
+        ),
+        blt=BltRates(
+            mint_price=router.quoteMintAmountBLT(WETH, PRECISION),
+            redeem_price=router.quoteRedeemAmountBLT(WETH, PRECISION),
+            wblt_per_weth=router.getAmountsOut(PRECISION, [(WETH, WBLT, False)])[1],
+            weth_per_wblt=router.getAmountsOut(PRECISION, [(WBLT, WETH, False)])[1],
+        ),
+        fee=helper.fee(),
+    )
+
+
+class ChainNode:
+    """
+    Node for exercise_helper.scheduler that exercises to WETH through a deployed
+    helper.
+
+    :param helper: Deployed wBLTExerciseHelper.
+    :param otoken: oToken contract to exercise.
+    :param account: Account holding (and having approved) the oToken.
+    :param live: Wait for real blocks instead of mining them, for live networks.
+    :param poll_interval: Seconds between block checks when live.
+    """
+
+    def __init__(self, helper, otoken, account, live=False, poll_interval=2):
+        self.helper = helper
+        self.otoken = otoken
+        self.account = account
+        self.live = live
+        self.poll_interval = poll_interval
+
+    def block_number(self) -> int:
+        return chain.height
+
+    def snapshot(self) -> Snapshot:
+        return load_snapshot(self.helper, self.otoken)
+
+    def exercise(self, amount, profit_slippage_allowed, swap_slippage_allowed):
+        return self.helper.exercise(
+            self.otoken,
+            amount,
+            False,
+            profit_slippage_allowed,
+            swap_slippage_allowed,
+            {"from": self.account},
+        )
+
+    def mine(self, blocks):
+        if not self.live:
+            chain.mine(blocks)
+            return
+        target = chain.height + blocks
+        while chain.height < target:
+            time.sleep(self.poll_interval)
+
+
+def exercised_log_fetcher(helper):
+    """
+    fetch_logs for exercise_helper.indexer.index_logs(), reading our helper's
+    Exercised events.
+
+    :param helper: Deployed wBLTExerciseHelper.
+    :return: Function of (from_block, to_block), both inclusive.
+    """
+
+    def fetch_logs(from_block, to_block):
+        return helper.events.get_sequence(from_block, to_block, "Exercised")
+
+    return fetch_logs
@@ -0,0 +1,309 @@
+"""
+Quote-vs-execution drift over randomized exercises.
+
+random_cases() draws exercise sizes, LP settings, oToken discounts and pool states
+around a base Snapshot. tests/test_quote_drift.py runs each case on our local mocks,
+quoting and then executing every mode from the same state, and writes a DriftResult
+per quote. summarize() then gives the distribution of drift for each quote, across
+however many result files our test workers wrote.
+
+Drift is (quoted - executed) / quoted, so positive drift means our quote promised
+more than we got. Cases where our quote reverted are counted separately from those
+where our quote went through but our exercise reverted, which are the ones a tighter
+slippage setting would turn into failed transactions.
+"""
+
+import json
+from dataclasses import replace
+from math import ceil
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from .snapshot import MAX_BPS, OToken, Snapshot
+
+# what each result compares, the LP quotes share one exerciseToLp()
+QUOTES = ("weth", "underlying", "lp", "lp_stateful")
+
+# drift histogram bins, 1 bp wide from -2% to 2%, anything further lands in the edges
+DRIFT_BINS = np.linspace(-0.02, 0.02, 401)
+
+
+class FuzzCase(NamedTuple):
+    """
+    One randomized exercise.
+
+    :param case: Index of this case, unique within a run.
+    :param amount: oToken to exercise.
+    :param percent_to_lp: Out of 10,000, for exerciseToLp().
+    :param lp_discount: LP discount passed to exerciseToLp().
+    :param discount: oToken exercise discount.
+    :param reserve_underlying: Pair reserve of underlying.
+    :param reserve_wblt: Pair reserve of wBLT.
+    :param twap_skew: TWAP price relative to spot, 0.01 for 1% above.
+    """
+
+    case: int
+    amount: int
+    percent_to_lp: int
+    lp_discount: int
+    discount: int
+    reserve_underlying: int
+    reserve_wblt: int
+    twap_skew: float
+
+
+class DriftResult(NamedTuple):
+    """
+    One quote of one case, against what executing it returned.
+
+    :param case: FuzzCase.case this came from.
+    :param quote: Which quote, one of QUOTES.
+    :param quoted: Quoted output, or None if our quote reverted.
+    :param executed: Output we received, or None if either reverted.
+    :param error: Revert message, prefixed with "quote: " or "execution: ".
+    """
+
+    case: int
+    quote: str
+    quoted: Optional[int]
+    executed: Optional[int]
+    error: str = ""
+
+    @property
+    def drift(self) -> Optional[float]:
+        """(quoted - executed) / quoted, or None unless both went through."""
+        if self.quoted is None or self.executed is None or self.quoted == 0:
+            return None
+        return (self.quoted - self.executed) / self.quoted
+
+
+class DriftSummary(NamedTuple):
+    """
+    Drift of one quote across a run.
+
+    :param quote: Which quote, one of QUOTES.
+    :param cases: Cases quoted.
+    :param quote_reverts: Cases where our quote reverted.
+    :param execution_reverts: Cases quoted fine that reverted on execution.
+    :param percentiles: Drift at each of summarize()'s percentiles, in order.
+    :param mean: Mean drift.
+    :param max: Largest drift, our worst overestimate.
+    :param min: Smallest drift, our worst underestimate.
+    :param slippage_bps: Smallest slippage, out of 10,000, covering our drift at the
+        last of summarize()'s percentiles.
+    :param histogram: Count of drifts in each DRIFT_BINS bin.
+    """
+
+    quote: str
+    cases: int
+    quote_reverts: int
+    execution_reverts: int
+    percentiles: List[float]
+    mean: float
+    max: float
+    min: float
+    slippage_bps: int
+    histogram: np.ndarray
+
+
+def random_cases(
+    base: Snapshot,
+    count: int,
+    seed: Union[int, Sequence[int]] = 0,
+    first_case: int = 0,
+    size_range: Sequence[float] = (1e-4, 0.1),
+    reserve_scale: Sequence[float] = (0.25, 4.0),
+    percent_to_lp_range: Sequence[int] = (0, 2_000),
+    lp_discount_range: Sequence[int] = (20, 50),
+    discount_range: Sequence[int] = (25, 75),
+    twap_skew_range: Sequence[float] = (-0.05, 0.05),
+) -> List[FuzzCase]:
+    """
+    Draw cases around base. The same arguments always give the same cases.
+
+    :param base: Snapshot whose reserves we scale.
+    :param count: Cases to draw.
+    :param seed: Seed for our generator, such as (run seed, batch).
+    :param first_case: Index of our first case, so batches don't overlap.
+    :param size_range: Exercise size as a share of our underlying reserve, drawn
+        log-uniformly.
+    :param reserve_scale: Factor on each of base's reserves, drawn log-uniformly and
+        independently, so price moves as well as depth.
+    :param percent_to_lp_range: Inclusive range of percentToLp.
+    :param lp_discount_range: Inclusive range of LP discount.
+    :param discount_range: Inclusive range of oToken discount.
+    :param twap_skew_range: Range of TWAP price relative to spot.
+    :return: count cases.
+    """
+    rng = np.random.default_rng(seed)
+
+    def log_uniform(low, high):
+        return np.exp(rng.uniform(np.log(low), np.log(high), count))
+
+    reserve_underlying = base.pair.reserve_underlying * log_uniform(*reserve_scale)
+    reserve_wblt = base.pair.reserve_wblt * log_uniform(*reserve_scale)
+    amounts = reserve_underlying * log_uniform(*size_range)
+    percent_to_lp = rng.integers(
+        percent_to_lp_range[0], percent_to_lp_range[1] + 1, count
+    )
+    lp_discount = rng.integers(lp_discount_range[0], lp_discount_range[1] + 1, count)
+    discount = rng.integers(discount_range[0], discount_range[1] + 1, count)
+    twap_skew = rng.uniform(*twap_skew_range, count)
+    return [
+        FuzzCase(
+            first_case + i,
+            int(amounts[i]),
+            int(percent_to_lp[i]),
+            int(lp_discount[i]),
+            int(discount[i]),
+            int(reserve_underlying[i]),
+            int(reserve_wblt[i]),
+            float(twap_skew[i]),
+        )
+        for i in range(count)
+    ]
+
+
+def case_snapshot(base: Snapshot, case: FuzzCase) -> Snapshot:
+    """
+    base with case's reserves, discount and TWAP.
+
+    :param base: Snapshot for everything case doesn't set, such as BLT rates.
+    :param case: Case to apply.
+    :return: New Snapshot, with every TWAP window at case's skew from spot.
+    """
+    twap_wblt = int(case.reserve_wblt * (1 + case.twap_skew))
+    windows = len(base.otoken.twap_observations)
+    return replace(
+        base,
+        pair=replace(
+            base.pair,
+            reserve_underlying=case.reserve_underlying,
+            reserve_wblt=case.reserve_wblt,
+        ),
+        otoken=OToken(
+            discount=case.discount,
+            twap_observations=((case.reserve_underlying, twap_wblt),) * windows,
+        ),
+    )
+
+
+def write_results(path: str, results: Iterable[DriftResult]):
+    """
+    Write results to path, one JSON object per line.
+
+    :param path: File to write, its directory is created if needed.
+    :param results: Results to store.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result._asdict()) + "\n")
+
+
+def read_results(path: str) -> Iterator[DriftResult]:
+    """
+    Read results written by write_results().
+
+    :param path: A results file, or a directory of them (*.jsonl), such as from
+        parallel test workers.
+    :return: Iterator of DriftResult.
+    """
+    path = Path(path)
+    files = sorted(path.glob("*.jsonl")) if path.is_dir() else [path]
+    for file in files:
+        with open(file) as f:
+            for line in f:
+                if line.strip():
+                    yield DriftResult(**json.loads(line))
+
+
+def summarize(
+    results: Iterable[DriftResult],
+    percentiles: Sequence[float] = (50, 95, 99, 99.9),
+) -> List[DriftSummary]:
+    """
+    Drift distribution of each quote.
+
+    :param results: Results to summarize, such as from read_results().
+    :param percentiles: Percentiles of drift to report, between 0 and 100.
+    :return: One DriftSummary per quote with results, in QUOTES order.
+    """
+    by_quote = {}
+    for result in results:
+        by_quote.setdefault(result.quote, []).append(result)
+
+    summaries = []
+    order = {name: i for i, name in enumerate(QUOTES)}
+    for quote in sorted(by_quote, key=lambda name: order.get(name, len(QUOTES))):
+        quoted = by_quote[quote]
+        drifts = np.array(
+            [result.drift for result in quoted if result.drift is not None],
+            dtype=np.float64,
+        )
+        if len(drifts) == 0:
+            # nothing went through, so report zeros rather than NaNs
+            drifts = np.zeros(1)
+        values = [float(np.percentile(drifts, p)) for p in percentiles]
+        summaries.append(
+            DriftSummary(
+                quote,
+                len(quoted),
+                sum(result.quoted is None for result in quoted),
+                sum(
+                    result.quoted is not None and result.executed is None
+                    for result in quoted
+                ),
+                values,
+                float(drifts.mean()),
+                float(drifts.max()),
+                float(drifts.min()),
+                ceil(max(values[-1], 0.0) * MAX_BPS),
+                np.histogram(
+                    np.clip(drifts, DRIFT_BINS[0], DRIFT_BINS[-1]), bins=DRIFT_BINS
+                )[0],
+            )
+        )
+    return summaries
+
+
+def format_summary(
+    summaries: Sequence[DriftSummary],
+    percentiles: Sequence[float] = (50, 95, 99, 99.9),
+) -> str:
+    """
+    Text table of summaries, one row per quote, drift in percent.
+
+    :param summaries: From summarize().
+    :param percentiles: The same percentiles passed to summarize().
+    :return: Table with reverts, drift percentiles and suggested slippage.
+    """
+    headers = (
+        ["quote", "cases", "quote reverts", "exec reverts", "mean"]
+        + [f"p{p:g}" for p in percentiles]
+        + ["min", "max", "slippage bps"]
+    )
+    rows = [headers]
+    for summary in summaries:
+        drifts = [summary.mean] + list(summary.percentiles) + [summary.min, summary.max]
+        rows.append(
+            [
+                summary.quote,
+                f"{summary.cases:,}",
+                f"{summary.quote_reverts:,}",
+                f"{summary.execution_reverts:,}",
+            ]
+            + [f"{100 * drift:.4f}%" for drift in drifts]
+            + [str(summary.slippage_bps)]
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(headers))]
+    return "\n".join(
+        " ".join(
+            [row[0].ljust(widths[0])]
+            + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        )
+        for row in rows
+    )
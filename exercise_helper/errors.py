@@ -0,0 +1,11 @@
+class Revert(Exception):
+    """
+    Raised wherever wBLTExerciseHelper (or a contract it calls) would revert.
+
+    The message matches the on-chain revert string, so checks written against
+    brownie.reverts() can be reused unchanged.
+    """
+
+    @property
+    def revert_msg(self) -> str:
+        return self.args[0] if self.args else ""
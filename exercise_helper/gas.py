@@ -0,0 +1,123 @@
+"""
+Per-phase gas from the helper's GasCheckpoint events.
+
+Turn on setGasTracing() (on a local chain or fork), run some exercises, and pass the
+receipts through checkpoints_from_tx() and phase_gas(). Each phase is the gas used
+since the previous checkpoint, so it includes about 2k gas for that checkpoint's own
+event. Nested phases are named like "borrow;mint", and the parent's own entry
+("borrow") covers whatever its children don't, such as repaying our flash loan.
+
+format_table() lines up runs side by side, and folded_stacks() writes the folded
+format read by flamegraph.pl, inferno and speedscope.
+"""
+
+from collections import OrderedDict
+from typing import List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# gas outside our checkpoints: intrinsic and calldata gas, dispatch, less refunds
+OVERHEAD = "overhead"
+
+
+class PhaseGas(NamedTuple):
+    """Gas used by one phase of one transaction."""
+
+    phase: str
+    gas: int
+
+
+def _decode_phase(phase) -> str:
+    if isinstance(phase, str):
+        phase = bytes.fromhex(phase[2:] if phase.startswith("0x") else phase)
+    return bytes(phase).rstrip(b"\0").decode()
+
+
+def checkpoints_from_tx(tx) -> List[Tuple[str, int]]:
+    """
+    Read GasCheckpoint events from a brownie receipt.
+
+    :param tx: TransactionReceipt of a call to the helper with gasTracing on.
+    :return: (phase, gasLeft) for each checkpoint, in order.
+    """
+    if "GasCheckpoint" not in tx.events:
+        return []
+    return [
+        (_decode_phase(event["phase"]), event["gasLeft"])
+        for event in tx.events["GasCheckpoint"]
+    ]
+
+
+def phase_gas(
+    checkpoints: Sequence[Tuple[str, int]], gas_used: Optional[int] = None
+) -> List[PhaseGas]:
+    """
+    Gas used by each phase, from consecutive checkpoints.
+
+    :param checkpoints: (phase, gasLeft) in order, such as from checkpoints_from_tx().
+    :param gas_used: Transaction's gasUsed, to add an OVERHEAD phase for everything
+        outside our first and last checkpoints. May be negative if refunds exceed it.
+    :return: PhaseGas for each checkpoint after the first, in order.
+    """
+    phases = [
+        PhaseGas(phase, previous - gas_left)
+        for (_, previous), (phase, gas_left) in zip(checkpoints, checkpoints[1:])
+    ]
+    if gas_used is not None and checkpoints:
+        traced = checkpoints[0][1] - checkpoints[-1][1]
+        phases.append(PhaseGas(OVERHEAD, gas_used - traced))
+    return phases
+
+
+def _totals(phases: Sequence[PhaseGas]) -> Mapping[str, int]:
+    # repeated phases (such as each batch entry's swaps) are summed
+    totals = OrderedDict()
+    for phase, gas in phases:
+        totals[phase] = totals.get(phase, 0) + gas
+    return totals
+
+
+def format_table(runs: Mapping[str, Sequence[PhaseGas]]) -> str:
+    """
+    Text table of gas per phase, one column per run.
+
+    :param runs: Phases for each run, keyed by a label such as "exercise 100 WETH".
+    :return: Table with a total row, phases in the order first seen.
+    """
+    totals = {label: _totals(phases) for label, phases in runs.items()}
+    names = []
+    for run in totals.values():
+        names.extend(name for name in run if name not in names)
+
+    labels = list(runs)
+    width = max([len(name) for name in names] + [len("total")])
+    columns = [max(len(label), 10) for label in labels]
+    lines = [
+        " ".join(
+            ["phase".ljust(width)]
+            + [label.rjust(column) for label, column in zip(labels, columns)]
+        )
+    ]
+    for name in names + ["total"]:
+        cells = []
+        for label, column in zip(labels, columns):
+            if name == "total":
+                value = sum(totals[label].values())
+            else:
+                value = totals[label].get(name)
+            cells.append(("" if value is None else f"{value:,}").rjust(column))
+        lines.append(" ".join([name.ljust(width)] + cells))
+    return "\n".join(lines)
+
+
+def folded_stacks(runs: Mapping[str, Sequence[PhaseGas]]) -> str:
+    """
+    Folded stacks for a flame graph, with each run as a root frame.
+
+    :param runs: Phases for each run, keyed by a label such as "exercise 100 WETH".
+    :return: One "run;phase;child gas" line per phase with positive gas.
+    """
+    lines = []
+    for label, phases in runs.items():
+        for name, gas in _totals(phases).items():
+            if gas > 0:
+                lines.append(f"{label.replace(';', ' ')};{name} {gas}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,138 @@
+"""
+Local mocks of everything wBLTExerciseHelper calls, so it runs on a plain local
+chain with no fork or network access.
+
+The helper hardcodes WETH, wBLT, the Balancer vault, both routers and the pair
+factory. We deploy each of those mocks normally, copy its runtime code to the
+hardcoded address, and only then configure it there, as these mocks keep all of
+their config in storage. The underlying, its wBLT pair and the oToken are deployed
+normally. Deploy the helper itself after calling deploy_mocks(), since its
+constructor approves the routers.
+
+State is set from a Snapshot, so our offline quotes can be checked against the same
+state on chain.
+"""
+
+from typing import NamedTuple
+
+from brownie import (
+    MockBalancerVault,
+    MockERC20,
+    MockOToken,
+    MockPair,
+    MockPairFactory,
+    MockRouter,
+    web3,
+)
+
+from .chain import BALANCER_VAULT, BVM_ROUTER, PAIR_FACTORY, ROUTER, WBLT, WETH
+from .snapshot import Snapshot
+from .state import set_code
+
+# WETH our mock vault can flash loan
+VAULT_WETH = 100_000 * 10**18
+
+
+class MockEcosystem(NamedTuple):
+    """Mock contracts, with those the helper hardcodes at their real addresses."""
+
+    weth: object
+    wblt: object
+    underlying: object
+    pair: object
+    factory: object
+    router: object
+    bvm_router: object
+    vault: object
+    otoken: object
+
+
+def _deploy_at(container, address: str, account, *args):
+    # deploy normally, then copy our runtime code over to address
+    template = container.deploy(*args, {"from": account})
+    set_code(address, web3.eth.get_code(template.address).hex())
+    return container.at(address)
+
+
+def deploy_mocks(account, snapshot: Snapshot) -> MockEcosystem:
+    """
+    Deploy our mocks and set them to snapshot.
+
+    :param account: Account to deploy from, also receives the pair's initial LP.
+    :param snapshot: State to start from, see apply_snapshot(). Its helper fee is
+        left to the helper we deploy later.
+    :return: MockEcosystem of our deployed mocks.
+    """
+    weth = _deploy_at(MockERC20, WETH, account, "Wrapped Ether", "WETH")
+    wblt = _deploy_at(MockERC20, WBLT, account, "Wrapped BLT", "wBLT")
+    factory = _deploy_at(MockPairFactory, PAIR_FACTORY, account)
+    vault = _deploy_at(MockBalancerVault, BALANCER_VAULT, account)
+    router = _deploy_at(MockRouter, ROUTER, account)
+    bvm_router = _deploy_at(MockRouter, BVM_ROUTER, account)
+    for each in (router, bvm_router):
+        each.initialize(factory, weth, wblt, {"from": account})
+    weth.mint(vault, VAULT_WETH, {"from": account})
+
+    underlying = MockERC20.deploy("Mock BMX", "BMX", {"from": account})
+    factory.createPair(underlying, wblt, snapshot.pair.fee, {"from": account})
+    pair = MockPair.at(factory.getPair(underlying, wblt, False))
+    otoken = MockOToken.deploy(
+        underlying, wblt, pair, snapshot.otoken.discount, {"from": account}
+    )
+
+    mocks = MockEcosystem(
+        weth, wblt, underlying, pair, factory, router, bvm_router, vault, otoken
+    )
+    apply_snapshot(mocks, snapshot, account)
+    return mocks
+
+
+def apply_snapshot(mocks: MockEcosystem, snapshot: Snapshot, account):
+    """
+    Set our mocks to match snapshot.
+
+    Only fields that differ from our mocks are sent, so moving between many snapshots
+    costs a few transactions each. Pair reserves are minted or burned to match,
+    leaving the pair's LP supply as it is. An empty pair mints its first LP to account
+    instead, so snapshot's total_supply is only matched when it's the geometric mean
+    of our reserves.
+
+    :param mocks: Deployed mocks, from deploy_mocks().
+    :param snapshot: State to set, except the helper's fee.
+    :param account: Account to send our transactions from.
+    """
+    tx = {"from": account}
+    pair = snapshot.pair
+    for token, target in (
+        (mocks.underlying, pair.reserve_underlying),
+        (mocks.wblt, pair.reserve_wblt),
+    ):
+        balance = token.balanceOf(mocks.pair)
+        if target > balance:
+            token.mint(mocks.pair, target - balance, tx)
+        elif balance > target:
+            token.burn(mocks.pair, balance - target, tx)
+    if mocks.pair.totalSupply() == 0:
+        mocks.pair.mint(account, tx)
+    else:
+        mocks.pair.sync(tx)
+    if mocks.factory.getFee(mocks.pair) != pair.fee:
+        mocks.factory.setFee(mocks.pair, pair.fee, tx)
+
+    otoken = snapshot.otoken
+    if mocks.otoken.discount() != otoken.discount:
+        mocks.otoken.setDiscount(otoken.discount, tx)
+    reserves_underlying, reserves_wblt = zip(*otoken.twap_observations)
+    mocks.otoken.setTwapObservations(list(reserves_underlying), list(reserves_wblt), tx)
+
+    blt = snapshot.blt
+    rates = (blt.mint_price, blt.redeem_price, blt.wblt_per_weth, blt.weth_per_wblt)
+    for router in (mocks.router, mocks.bvm_router):
+        current = (
+            router.mintPrice(),
+            router.redeemPrice(),
+            router.wBLTPerWeth(),
+            router.wethPerWBLT(),
+        )
+        if current != rates:
+            router.setBltRates(*rates, tx)
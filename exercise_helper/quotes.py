@@ -0,0 +1,371 @@
+from dataclasses import replace
+from typing import List, NamedTuple, Tuple
+
+from .amm import (
+    get_amount_out,
+    get_amounts_in,
+    quote_add_liquidity,
+    time_weighted_average_price,
+)
+from .errors import Revert
+from .snapshot import DISCOUNT_DENOMINATOR, MAX_BPS, PRECISION, Snapshot
+
+
+class ExerciseQuote(NamedTuple):
+    """Return values of quoteExerciseProfit() and quoteExerciseToUnderlying()."""
+
+    weth_needed: int
+    within_slippage_tolerance: bool
+    real_profit: int
+    expected_profit: int
+    profit_slippage: int
+
+
+class LpQuote(NamedTuple):
+    """Return values of quoteExerciseLp()."""
+
+    within_slippage_tolerance: bool
+    lp_amount_out: int
+    wblt_out: int
+    profit_slippage: int
+
+
+def get_discounted_price(snapshot: Snapshot, amount: int) -> int:
+    """
+    Mirror of oToken.getDiscountedPrice(), wBLT needed to exercise amount.
+    """
+    otoken = snapshot.otoken
+    twap = time_weighted_average_price(amount, otoken.twap_observations)
+    return (twap * otoken.discount) // DISCOUNT_DENOMINATOR
+
+
+def get_payment_token_amount_for_exercise_lp(
+    snapshot: Snapshot, amount: int, discount: int
+) -> Tuple[int, int]:
+    """
+    Mirror of oToken.getPaymentTokenAmountForExerciseLp().
+
+    :return: paymentAmount and paymentAmountToAddLiquidity, both in wBLT.
+    """
+    twap = time_weighted_average_price(amount, snapshot.otoken.twap_observations)
+    payment_amount = (twap * discount) // DISCOUNT_DENOMINATOR
+    pair = snapshot.pair
+    payment_to_add_liquidity = (amount * pair.reserve_wblt) // pair.reserve_underlying
+    return payment_amount, payment_to_add_liquidity
+
+
+def quote_mint_amount_blt(snapshot: Snapshot, wblt_amount: int) -> int:
+    """
+    Mirror of router.quoteMintAmountBLT(weth, wblt_amount), WETH needed.
+    """
+    return (wblt_amount * snapshot.blt.mint_price) // PRECISION
+
+
+def quote_redeem_amount_blt(snapshot: Snapshot, weth_amount: int) -> int:
+    """
+    Mirror of router.quoteRedeemAmountBLT(weth, weth_amount), wBLT needed.
+    """
+    return (weth_amount * snapshot.blt.redeem_price) // PRECISION
+
+
+def get_amounts_out_to_weth(snapshot: Snapshot, amount: int) -> List[int]:
+    """
+    Mirror of router.getAmountsOut() for our underlying -> wBLT -> WETH route.
+    """
+    pair = snapshot.pair
+    wblt_out = get_amount_out(
+        amount, pair.reserve_underlying, pair.reserve_wblt, pair.fee
+    )
+    weth_out = (wblt_out * snapshot.blt.weth_per_wblt) // PRECISION
+    return [amount, wblt_out, weth_out]
+
+
+def _check_inputs(option_token_amount: int, profit_slippage_allowed: int):
+    if option_token_amount == 0:
+        raise Revert("Can't exercise zero")
+    if profit_slippage_allowed > MAX_BPS:
+        raise Revert("Slippage must be less than 10,000")
+
+
+def _profit_slippage(real_profit: int, expected_profit: int) -> int:
+    # if profitSlippage returns zero, we have positive slippage (extra profit)
+    if expected_profit > real_profit:
+        return PRECISION - (real_profit * PRECISION) // expected_profit
+    return 0
+
+
+def quote_exercise_profit(
+    snapshot: Snapshot, option_token_amount: int, profit_slippage_allowed: int
+) -> ExerciseQuote:
+    """
+    Mirror of quoteExerciseProfit().
+
+    :param snapshot: State to quote against.
+    :param option_token_amount: The amount of oToken to exercise to WETH.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :return: Same values as the contract, see ExerciseQuote.
+    """
+    _check_inputs(option_token_amount, profit_slippage_allowed)
+
+    wblt_needed = get_discounted_price(snapshot, option_token_amount)
+    weth_needed = quote_mint_amount_blt(snapshot, wblt_needed)
+
+    weth_received = get_amounts_out_to_weth(snapshot, option_token_amount)[2]
+    estimated_fee = (weth_received * snapshot.fee) // MAX_BPS
+
+    if weth_needed > weth_received - estimated_fee:
+        raise Revert("Cost exceeds profit")
+    real_profit = weth_received - weth_needed - estimated_fee
+
+    discount = snapshot.otoken.discount
+    expected_profit = (
+        weth_needed * (DISCOUNT_DENOMINATOR - discount)
+    ) // discount - estimated_fee
+    if expected_profit < 0:
+        raise Revert("Panic: arithmetic underflow")
+
+    profit_slippage = _profit_slippage(real_profit, expected_profit)
+    expected_profit = (expected_profit * (MAX_BPS - profit_slippage_allowed)) // MAX_BPS
+
+    return ExerciseQuote(
+        weth_needed,
+        real_profit > expected_profit,
+        real_profit,
+        expected_profit,
+        profit_slippage,
+    )
+
+
+def quote_exercise_to_underlying(
+    snapshot: Snapshot, option_token_amount: int, profit_slippage_allowed: int
+) -> ExerciseQuote:
+    """
+    Mirror of quoteExerciseToUnderlying().
+
+    :param snapshot: State to quote against.
+    :param option_token_amount: The amount of oToken to exercise to underlying.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :return: Same values as the contract, see ExerciseQuote. Profits are in
+        underlying.
+    """
+    _check_inputs(option_token_amount, profit_slippage_allowed)
+
+    wblt_needed = get_discounted_price(snapshot, option_token_amount)
+    weth_needed = quote_mint_amount_blt(snapshot, wblt_needed)
+
+    # simulate swapping all to WETH to better estimate total WETH needed
+    min_amount = get_amounts_out_to_weth(snapshot, option_token_amount)[2]
+    min_amount = weth_needed + (min_amount * snapshot.fee) // MAX_BPS
+
+    # WETH -> wBLT, then wBLT -> underlying
+    min_amount = quote_redeem_amount_blt(snapshot, min_amount)
+    pair = snapshot.pair
+    min_amount = get_amounts_in(
+        min_amount, [(pair.reserve_underlying, pair.reserve_wblt, pair.fee)]
+    )[0]
+
+    if min_amount > option_token_amount:
+        raise Revert("Cost exceeds profit")
+    real_profit = option_token_amount - min_amount
+
+    expected_profit = (
+        option_token_amount
+        * (
+            (MAX_BPS * (DISCOUNT_DENOMINATOR - snapshot.otoken.discount))
+            // DISCOUNT_DENOMINATOR
+            - snapshot.fee
+        )
+    ) // MAX_BPS
+
+    profit_slippage = _profit_slippage(real_profit, expected_profit)
+    expected_profit = (expected_profit * (MAX_BPS - profit_slippage_allowed)) // MAX_BPS
+
+    return ExerciseQuote(
+        weth_needed,
+        real_profit > expected_profit,
+        real_profit,
+        expected_profit,
+        profit_slippage,
+    )
+
+
+def quote_exercise_lp(
+    snapshot: Snapshot,
+    option_token_amount: int,
+    profit_slippage_allowed: int,
+    percent_to_lp: int,
+    discount: int,
+) -> LpQuote:
+    """
+    Mirror of quoteExerciseLp().
+
+    :param snapshot: State to quote against.
+    :param option_token_amount: The amount of oToken to exercise to LP.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :param percent_to_lp: Out of 10,000, how much of our oToken to exercise for LP.
+    :param discount: Our discount percentage for LP.
+    :return: Same values as the contract, see LpQuote.
+    """
+    if percent_to_lp > MAX_BPS:
+        raise Revert("Percent must be < 10,000")
+
+    tokens_to_sell = (option_token_amount * (MAX_BPS - percent_to_lp)) // MAX_BPS
+    quote = quote_exercise_to_underlying(
+        snapshot, tokens_to_sell, profit_slippage_allowed
+    )
+
+    # simulate swapping our underlying to wBLT
+    pair = snapshot.pair
+    wblt_amount_out = get_amount_out(
+        quote.real_profit, pair.reserve_underlying, pair.reserve_wblt, pair.fee
+    )
+
+    tokens_to_lp = option_token_amount - tokens_to_sell
+    payment_amount, matching_for_lp = get_payment_token_amount_for_exercise_lp(
+        snapshot, tokens_to_lp, discount
+    )
+    payment_amount += matching_for_lp
+
+    if payment_amount > wblt_amount_out:
+        raise Revert("Need more wBLT, decrease _percentToLp or _discount values")
+
+    lp_amount_out = quote_add_liquidity(
+        tokens_to_lp,
+        matching_for_lp,
+        pair.reserve_underlying,
+        pair.reserve_wblt,
+        pair.total_supply,
+    )[2]
+
+    return LpQuote(
+        quote.within_slippage_tolerance,
+        lp_amount_out,
+        wblt_amount_out - payment_amount,
+        quote.profit_slippage,
+    )
+
+
+def _swap_to_wblt(snapshot: Snapshot, amount: int) -> Tuple[Snapshot, int]:
+    # pair fees are sent out of the pair, so only the rest is added to reserves
+    pair = snapshot.pair
+    wblt_out = get_amount_out(
+        amount, pair.reserve_underlying, pair.reserve_wblt, pair.fee
+    )
+    pair = replace(
+        pair,
+        reserve_underlying=pair.reserve_underlying
+        + amount
+        - (amount * pair.fee) // MAX_BPS,
+        reserve_wblt=pair.reserve_wblt - wblt_out,
+    )
+    return replace(snapshot, pair=pair), wblt_out
+
+
+def simulate_exercise_lp(
+    snapshot: Snapshot,
+    option_token_amount: int,
+    profit_slippage_allowed: int,
+    percent_to_lp: int,
+    discount: int,
+    weth_min: int = 10**12,
+    underlying_min: int = 10**15,
+) -> LpQuote:
+    """
+    Mirror of wBLTExerciseQuoter.quoteExerciseLpStateful().
+
+    Follows exerciseToLp() step by step, updating pair reserves after each swap
+    instead of pricing everything against the starting reserves.
+
+    :param snapshot: State to quote against.
+    :param option_token_amount: The amount of oToken to exercise to LP.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :param percent_to_lp: Out of 10,000, how much of our oToken to exercise for LP.
+    :param discount: Our discount percentage for LP.
+    :param weth_min: Leftover WETH at or below this isn't swapped. The helper's
+        default is the larger of 1e12 and base fee * 300,000 gas.
+    :param underlying_min: Leftover underlying at or below this isn't swapped.
+    :return: LpQuote, with lp_amount_out and wblt_out at post-swap reserves.
+    """
+    if percent_to_lp > MAX_BPS:
+        raise Revert("Percent must be < 10,000")
+
+    tokens_to_sell = (option_token_amount * (MAX_BPS - percent_to_lp)) // MAX_BPS
+    quote = quote_exercise_to_underlying(
+        snapshot, tokens_to_sell, profit_slippage_allowed
+    )
+    blt = snapshot.blt
+
+    # our fee is based on selling all of our underlying at starting reserves
+    fee_amount = (
+        get_amounts_out_to_weth(snapshot, tokens_to_sell)[2] * snapshot.fee
+    ) // MAX_BPS
+
+    # mint wBLT with our borrowed WETH, and pay to exercise
+    wblt_balance = (quote.weth_needed * blt.wblt_per_weth) // PRECISION
+    wblt_balance -= get_discounted_price(snapshot, tokens_to_sell)
+
+    # sell just enough underlying to repay our flash loan and fee
+    snapshot, wblt_out = _swap_to_wblt(snapshot, tokens_to_sell - quote.real_profit)
+    weth_balance = (wblt_out * blt.weth_per_wblt) // PRECISION
+    if weth_balance < quote.weth_needed + fee_amount:
+        raise Revert("Not enough WETH out")
+    weth_balance -= quote.weth_needed + fee_amount
+
+    # convert significant leftovers to wBLT, same cutoffs as exerciseToLp()
+    if weth_balance > weth_min:
+        wblt_balance += (weth_balance * blt.wblt_per_weth) // PRECISION
+    if quote.real_profit > underlying_min:
+        snapshot, wblt_out = _swap_to_wblt(snapshot, quote.real_profit)
+        wblt_balance += wblt_out
+
+    # pay and pair for LP at our updated reserves
+    tokens_to_lp = option_token_amount - tokens_to_sell
+    payment_amount, matching_for_lp = get_payment_token_amount_for_exercise_lp(
+        snapshot, tokens_to_lp, discount
+    )
+    if payment_amount + matching_for_lp > wblt_balance:
+        raise Revert("Need more wBLT, decrease _percentToLp or _discount values")
+
+    pair = snapshot.pair
+    lp_amount_out = min(
+        (tokens_to_lp * pair.total_supply) // pair.reserve_underlying,
+        (matching_for_lp * pair.total_supply) // pair.reserve_wblt,
+    )
+    return LpQuote(
+        quote.within_slippage_tolerance,
+        lp_amount_out,
+        wblt_balance - payment_amount - matching_for_lp,
+        quote.profit_slippage,
+    )
+
+
+def quote_all(
+    snapshot: Snapshot,
+    option_token_amount: int,
+    profit_slippage_allowed: int,
+    percent_to_lp: int,
+    discount: int,
+) -> Tuple[ExerciseQuote, ExerciseQuote, LpQuote]:
+    """
+    Mirror of quoteAll().
+
+    :param snapshot: State to quote against.
+    :param option_token_amount: The amount of oToken to exercise.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :param percent_to_lp: Out of 10,000, how much of our oToken to exercise for LP.
+    :param discount: Our discount percentage for LP.
+    :return: WETH, underlying and LP quotes, in that order.
+    """
+    return (
+        quote_exercise_profit(snapshot, option_token_amount, profit_slippage_allowed),
+        quote_exercise_to_underlying(
+            snapshot, option_token_amount, profit_slippage_allowed
+        ),
+        quote_exercise_lp(
+            snapshot,
+            option_token_amount,
+            profit_slippage_allowed,
+            percent_to_lp,
+            discount,
+        ),
+    )
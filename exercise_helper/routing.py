@@ -0,0 +1,110 @@
+"""
+Off-chain optimizer for the helper's exerciseWithSplit().
+
+Each path's output is concave in its input, so handing out our underlying one share
+at a time to whichever path gains the most from it maximizes total output. Paths are
+priced independently, same as the contract's check, which is why the contract rejects
+paths sharing a pair.
+"""
+
+import heapq
+from typing import List, NamedTuple, Sequence, Tuple
+
+from .amm import Hop, get_amount_out, get_stable_amount_out
+from .errors import Revert
+from .snapshot import MAX_BPS, PRECISION
+
+
+class SwapPath(NamedTuple):
+    """
+    One path from underlying to WETH.
+
+    Use rate for legs with a fixed price, such as redeeming wBLT for WETH at
+    blt.weth_per_wblt. It is applied to the output of the last hop.
+    """
+
+    hops: Sequence[Tuple]
+    rate: int = PRECISION
+
+
+class SplitQuote(NamedTuple):
+    """Shares (out of 10,000) for each path, plus the amounts we expect."""
+
+    shares: List[int]
+    amounts_in: List[int]
+    amounts_out: List[int]
+    total_out: int
+
+
+def path_amount_out(path: SwapPath, amount_in: int) -> int:
+    """
+    Output of selling amount_in along path.
+
+    :param path: SwapPath to price.
+    :param amount_in: Amount of underlying sold down this path.
+    :return: Amount of WETH received.
+    """
+    amount = amount_in
+    for hop in path.hops:
+        hop = Hop(*hop)
+        if amount == 0:
+            return 0
+        if hop.stable:
+            amount = get_stable_amount_out(
+                amount,
+                hop.reserve_in,
+                hop.reserve_out,
+                hop.pair_fee,
+                hop.decimals_in,
+                hop.decimals_out,
+            )
+        else:
+            amount = get_amount_out(
+                amount, hop.reserve_in, hop.reserve_out, hop.pair_fee
+            )
+    return (amount * path.rate) // PRECISION
+
+
+def split_amounts(amount_in: int, shares: Sequence[int]) -> List[int]:
+    """
+    Same share to amount conversion as the helper's _quoteSplit().
+
+    :param amount_in: Total underlying we are selling.
+    :param shares: Share of each path, out of 10,000.
+    :return: Underlying sold down each path, last path takes any rounding dust.
+    """
+    amounts = [(amount_in * share) // MAX_BPS for share in shares]
+    if amounts:
+        amounts[-1] = amount_in - sum(amounts[:-1])
+    return amounts
+
+
+def optimal_split(paths: Sequence[SwapPath], amount_in: int) -> SplitQuote:
+    """
+    Split a sale of amount_in across paths to get the most WETH out.
+
+    :param paths: Candidate paths from underlying to WETH.
+    :param amount_in: Total underlying we are selling.
+    :return: SplitQuote, with shares to pass to exerciseWithSplit().
+    """
+    if len(paths) == 0:
+        raise Revert("Split must sell underlying for WETH")
+
+    shares = [0] * len(paths)
+
+    def gain(i):
+        before = path_amount_out(paths[i], (amount_in * shares[i]) // MAX_BPS)
+        after = path_amount_out(paths[i], (amount_in * (shares[i] + 1)) // MAX_BPS)
+        return after - before
+
+    # marginal gains only shrink as a path fills, so a heap stays accurate
+    heap = [(-gain(i), i) for i in range(len(paths))]
+    heapq.heapify(heap)
+    for _ in range(MAX_BPS):
+        _, i = heapq.heappop(heap)
+        shares[i] += 1
+        heapq.heappush(heap, (-gain(i), i))
+
+    amounts_in = split_amounts(amount_in, shares)
+    amounts_out = [path_amount_out(path, x) for path, x in zip(paths, amounts_in)]
+    return SplitQuote(shares, amounts_in, amounts_out, sum(amounts_out))
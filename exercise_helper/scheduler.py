@@ -0,0 +1,165 @@
+"""
+Spread a large exercise to WETH over several blocks.
+
+Our exercise cost is priced from the oToken's TWAP, but we sell at spot. Dumping a
+whole position in one block pushes spot well under the TWAP, so we plan smaller
+chunks, wait between them for arbitrage to bring the pool back, and re-quote before
+each one, only submitting while the quote is within our profit slippage.
+
+A node is anything with these methods, such as exercise_helper.chain.ChainNode:
+    block_number() -> int
+    snapshot() -> Snapshot, state at the current block
+    exercise(amount, profit_slippage_allowed, swap_slippage_allowed), send the exercise
+    mine(blocks), return once this many more blocks have passed
+"""
+
+from typing import Any, List, NamedTuple, Optional
+
+from .errors import Revert
+from .quotes import ExerciseQuote, quote_exercise_profit
+from .snapshot import MAX_BPS, Snapshot
+from .solvers import SEARCH_STEPS
+
+# default cap on how far one chunk moves the pair's price, out of 10,000
+DEFAULT_MAX_PRICE_IMPACT = 100
+
+
+class ScheduledChunk(NamedTuple):
+    """One attempt at a chunk. Chunks that aren't submitted are retried later."""
+
+    block: int
+    amount: int
+    quote: Optional[ExerciseQuote]
+    submitted: bool
+    receipt: Any = None
+
+
+def _within_tolerance(
+    snapshot: Snapshot, amount: int, profit_slippage_allowed: int
+) -> Optional[ExerciseQuote]:
+    try:
+        quote = quote_exercise_profit(snapshot, amount, profit_slippage_allowed)
+    except Revert:
+        return None
+    return quote if quote.within_slippage_tolerance else None
+
+
+def max_chunk_for_price_impact(snapshot: Snapshot, max_price_impact: int) -> int:
+    """
+    Largest sale of underlying that moves our execution price by at most
+    max_price_impact, not counting the pair fee.
+
+    Selling x (after fees) into reserves r gets a price r / (r + x) of spot, so we
+    solve x / (r + x) = max_price_impact.
+
+    :param snapshot: State to plan against.
+    :param max_price_impact: Price impact allowed per chunk, out of 10,000.
+    :return: Amount of underlying (and so oToken) to sell.
+    """
+    if max_price_impact == 0 or max_price_impact >= MAX_BPS:
+        raise Revert("Price impact must be between 0 and 10,000")
+    pair = snapshot.pair
+    after_fee = (pair.reserve_underlying * max_price_impact) // (
+        MAX_BPS - max_price_impact
+    )
+    return (after_fee * MAX_BPS) // (MAX_BPS - pair.fee)
+
+
+def plan_chunks(
+    snapshot: Snapshot,
+    total_amount: int,
+    profit_slippage_allowed: int,
+    max_price_impact: int = DEFAULT_MAX_PRICE_IMPACT,
+) -> List[int]:
+    """
+    Split total_amount into equal chunks that are each within our profit slippage
+    and price impact at the current state.
+
+    :param snapshot: State to plan against.
+    :param total_amount: Total oToken to exercise.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :param max_price_impact: Price impact allowed per chunk, out of 10,000.
+    :return: Chunk sizes, in the order to exercise them.
+    """
+    if total_amount == 0:
+        raise Revert("Can't exercise zero")
+
+    chunk_size = min(
+        total_amount, max_chunk_for_price_impact(snapshot, max_price_impact)
+    )
+    if _within_tolerance(snapshot, chunk_size, profit_slippage_allowed) is None:
+        # profit slippage rises with size, so bisect down for the largest that works
+        low, high = 0, chunk_size
+        for _ in range(SEARCH_STEPS):
+            mid = (low + high) // 2
+            if _within_tolerance(snapshot, mid, profit_slippage_allowed) is not None:
+                low = mid
+            else:
+                high = mid
+        if low == 0:
+            raise Revert("Profit slippage higher than allowed")
+        chunk_size = low
+
+    # even chunks, so the last one isn't a leftover sliver
+    count = -(-total_amount // chunk_size)
+    base, extra = divmod(total_amount, count)
+    return [base + 1] * extra + [base] * (count - extra)
+
+
+def run_schedule(
+    node,
+    total_amount: int,
+    profit_slippage_allowed: int,
+    swap_slippage_allowed: int,
+    blocks_between: int = 1,
+    max_wait_blocks: int = 100,
+    max_price_impact: int = DEFAULT_MAX_PRICE_IMPACT,
+) -> List[ScheduledChunk]:
+    """
+    Plan total_amount into chunks, then exercise them through node.
+
+    Before each chunk we re-quote at the latest block. If it isn't within our profit
+    slippage, we wait blocks_between blocks and try again, giving up once we've
+    waited max_wait_blocks in a row.
+
+    :param node: Node to read state from and exercise through, see module docs.
+    :param total_amount: Total oToken to exercise.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :param swap_slippage_allowed: Allowed swap slippage, out of 10,000, passed to
+        the helper.
+    :param blocks_between: Blocks to wait after each attempt.
+    :param max_wait_blocks: Stop once a chunk has waited this many blocks.
+    :param max_price_impact: Price impact allowed per chunk, out of 10,000.
+    :return: Every attempt, in order. Sum the submitted amounts for what was
+        exercised.
+    """
+    remaining = plan_chunks(
+        node.snapshot(), total_amount, profit_slippage_allowed, max_price_impact
+    )
+    attempts = []
+    waited = 0
+    while remaining:
+        amount = remaining[0]
+        block = node.block_number()
+        snapshot = node.snapshot()
+        try:
+            quote = quote_exercise_profit(snapshot, amount, profit_slippage_allowed)
+        except Revert:
+            quote = None
+
+        if quote is not None and quote.within_slippage_tolerance:
+            receipt = node.exercise(
+                amount, profit_slippage_allowed, swap_slippage_allowed
+            )
+            attempts.append(ScheduledChunk(block, amount, quote, True, receipt))
+            remaining.pop(0)
+            waited = 0
+        else:
+            attempts.append(ScheduledChunk(block, amount, quote, False))
+            if waited >= max_wait_blocks:
+                break
+            waited += blocks_between
+
+        if remaining:
+            node.mine(blocks_between)
+    return attempts
@@ -0,0 +1,301 @@
+"""
+Local quote service for quoteExerciseProfit() and quoteExerciseToUnderlying().
+
+Quotes only change when an oToken's pair reserves, its discount or BLT pricing
+change. For each tracked oToken we precompute profit against amount on a log-spaced
+grid, answer queries by binary search and linear interpolation, and only rebuild once
+a pair Sync or oToken SetDiscount event (or new BLT rates) arrives.
+
+Sync events only carry reserves, but the oToken's strike comes from its TWAP
+windows, which move with every observation. Without a loader (such as a wrapped
+exercise_helper.chain.load_snapshot) those windows stay as they were when the
+oToken was tracked, so weth_needed and profits drift from the contract's quotes.
+Pass one for correct quotes, running loader-less is only fit for tests and replays.
+
+weth_needed is always exact, never interpolated, since it is what we pay and linear
+interpolation between grid points could quote less than the contract will pull.
+"""
+
+import json
+from bisect import bisect_right
+from dataclasses import replace
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from .errors import Revert
+from .quotes import (
+    ExerciseQuote,
+    _profit_slippage,
+    get_discounted_price,
+    quote_exercise_profit,
+    quote_exercise_to_underlying,
+    quote_mint_amount_blt,
+)
+from .snapshot import MAX_BPS, BltRates, Snapshot
+from .vectorized import exercise_profit_curve, exercise_to_underlying_curve
+
+# curve grid, from 0.001 to 1M oTokens
+DEFAULT_POINTS = 512
+DEFAULT_MIN_AMOUNT = 10**15
+DEFAULT_MAX_AMOUNT = 10**24
+
+
+class ChainEvent(NamedTuple):
+    """
+    A decoded log, as recorded from chain.
+
+    :param block: Block the log was emitted in.
+    :param address: Contract that emitted it.
+    :param name: Event name, such as Sync or SetDiscount.
+    :param args: Decoded event arguments.
+    """
+
+    block: int
+    address: str
+    name: str
+    args: Dict[str, int]
+
+
+class QuoteCurve(NamedTuple):
+    """
+    One quote function sampled over amounts.
+
+    Values are kept as lists so a single query doesn't pay for numpy overhead.
+    expected_profit is before any slippage allowance.
+    """
+
+    amounts: List[float]
+    weth_needed: List[float]
+    real_profit: List[float]
+    expected_profit: List[float]
+    valid: List[bool]
+
+
+class _Tracked:
+    def __init__(self, otoken, pair, underlying_is_token0, snapshot):
+        self.otoken = otoken
+        self.pair = pair
+        self.underlying_is_token0 = underlying_is_token0
+        self.snapshot = snapshot
+        self.curves = None
+
+
+def read_events(path: str) -> Iterator[ChainEvent]:
+    """
+    Read a recorded event stream, one JSON object per line with the ChainEvent
+    fields.
+
+    :param path: File to read.
+    :return: Iterator of ChainEvent, in file order.
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield ChainEvent(**json.loads(line))
+
+
+def _sample(curve, snapshot: Snapshot, amounts: np.ndarray) -> QuoteCurve:
+    result = curve(snapshot, amounts, 0)
+    return QuoteCurve(
+        amounts.tolist(),
+        result.weth_needed.tolist(),
+        result.real_profit.tolist(),
+        result.expected_profit.tolist(),
+        result.valid.tolist(),
+    )
+
+
+class QuoteServer:
+    """
+    Cached quotes for any number of oTokens.
+
+    :param points: Grid points per curve.
+    :param min_amount: Smallest amount on our grid, smaller queries are quoted
+        exactly.
+    :param max_amount: Largest amount on our grid, larger queries are quoted
+        exactly.
+    :param loader: Function of an oToken address returning a fresh Snapshot,
+        called on Sync events instead of patching reserves. Needed for correct
+        quotes, without it a Sync leaves our TWAP windows, and so our strike,
+        stale.
+    """
+
+    def __init__(
+        self,
+        points: int = DEFAULT_POINTS,
+        min_amount: int = DEFAULT_MIN_AMOUNT,
+        max_amount: int = DEFAULT_MAX_AMOUNT,
+        loader: Optional[Callable[[str], Snapshot]] = None,
+    ):
+        self.grid = np.geomspace(float(min_amount), float(max_amount), points)
+        self.loader = loader
+        self.block = None
+        self.builds = 0
+        self._tracked = {}
+        self._by_pair = {}
+
+    def track(self, otoken: str, pair: str, underlying_is_token0: bool, snapshot):
+        """
+        Start serving quotes for otoken.
+
+        :param otoken: oToken address.
+        :param pair: Address of its underlying-wBLT pair, for Sync events.
+        :param underlying_is_token0: Whether underlying is token0 on the pair.
+        :param snapshot: Current state of the oToken.
+        """
+        tracked = _Tracked(otoken, pair, underlying_is_token0, snapshot)
+        self._tracked[otoken] = tracked
+        self._by_pair.setdefault(pair, []).append(tracked)
+
+    def snapshot(self, otoken: str) -> Snapshot:
+        """Latest state we have for otoken."""
+        return self._tracked[otoken].snapshot
+
+    def handle(self, event: ChainEvent):
+        """
+        Apply one event, dropping the curves it affects.
+
+        :param event: Decoded log, other events are ignored.
+        """
+        if event.name == "Sync":
+            for tracked in self._by_pair.get(event.address, []):
+                if self.loader is not None:
+                    tracked.snapshot = self.loader(tracked.otoken)
+                else:
+                    reserve0, reserve1 = event.args["reserve0"], event.args["reserve1"]
+                    if not tracked.underlying_is_token0:
+                        reserve0, reserve1 = reserve1, reserve0
+                    pair = replace(
+                        tracked.snapshot.pair,
+                        reserve_underlying=reserve0,
+                        reserve_wblt=reserve1,
+                    )
+                    tracked.snapshot = replace(tracked.snapshot, pair=pair)
+                tracked.curves = None
+        elif event.name == "SetDiscount" and event.address in self._tracked:
+            tracked = self._tracked[event.address]
+            otoken = replace(tracked.snapshot.otoken, discount=event.args["discount"])
+            tracked.snapshot = replace(tracked.snapshot, otoken=otoken)
+            tracked.curves = None
+
+    def update_blt(self, blt: BltRates):
+        """
+        New BLT mint/redeem pricing, which every oToken's quotes depend on.
+
+        :param blt: Latest rates.
+        """
+        for tracked in self._tracked.values():
+            if tracked.snapshot.blt != blt:
+                tracked.snapshot = replace(tracked.snapshot, blt=blt)
+                tracked.curves = None
+
+    def on_block(self, block: int):
+        """
+        Rebuild any curves dropped since the last block.
+
+        :param block: New block number.
+        """
+        self.block = block
+        for tracked in self._tracked.values():
+            self._curves(tracked)
+
+    def replay(self, events: Iterable[ChainEvent]):
+        """
+        Apply a stream of events in order, rebuilding curves at each new block.
+
+        :param events: Events sorted by block, such as from read_events().
+        """
+        for event in events:
+            if self.block is not None and event.block > self.block:
+                self.on_block(event.block)
+            self.handle(event)
+            self.block = event.block
+
+    def _curves(self, tracked):
+        if tracked.curves is None:
+            tracked.curves = (
+                _sample(exercise_profit_curve, tracked.snapshot, self.grid),
+                _sample(exercise_to_underlying_curve, tracked.snapshot, self.grid),
+            )
+            self.builds += 1
+        return tracked.curves
+
+    def _quote(self, tracked, curve, amount, profit_slippage_allowed, exact):
+        if profit_slippage_allowed > MAX_BPS:
+            raise Revert("Slippage must be less than 10,000")
+        i = bisect_right(curve.amounts, amount)
+
+        # off our grid, or near a revert, so let the exact quote decide
+        if (
+            i == 0
+            or i == len(curve.amounts)
+            or not (curve.valid[i - 1] and curve.valid[i])
+        ):
+            return exact(tracked.snapshot, amount, profit_slippage_allowed)
+
+        low, high = curve.amounts[i - 1], curve.amounts[i]
+        weight = (amount - low) / (high - low)
+
+        def at(values):
+            return int(values[i - 1] + (values[i] - values[i - 1]) * weight)
+
+        real_profit = at(curve.real_profit)
+        expected_profit = at(curve.expected_profit)
+        profit_slippage = _profit_slippage(real_profit, expected_profit)
+        expected_profit = (
+            expected_profit * (MAX_BPS - profit_slippage_allowed)
+        ) // MAX_BPS
+        # WETH in is cheap to get exactly, and interpolating could undershoot it
+        snapshot = tracked.snapshot
+        weth_needed = quote_mint_amount_blt(
+            snapshot, get_discounted_price(snapshot, amount)
+        )
+        return ExerciseQuote(
+            weth_needed,
+            real_profit > expected_profit,
+            real_profit,
+            expected_profit,
+            profit_slippage,
+        )
+
+    def quote_exercise_profit(
+        self, otoken: str, amount: int, profit_slippage_allowed: int
+    ) -> ExerciseQuote:
+        """
+        Cached quoteExerciseProfit().
+
+        :param otoken: Tracked oToken address.
+        :param amount: The amount of oToken to exercise to WETH.
+        :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+        :return: ExerciseQuote, interpolated from our curve.
+        """
+        tracked = self._tracked[otoken]
+        return self._quote(
+            tracked,
+            self._curves(tracked)[0],
+            amount,
+            profit_slippage_allowed,
+            quote_exercise_profit,
+        )
+
+    def quote_exercise_to_underlying(
+        self, otoken: str, amount: int, profit_slippage_allowed: int
+    ) -> ExerciseQuote:
+        """
+        Cached quoteExerciseToUnderlying().
+
+        :param otoken: Tracked oToken address.
+        :param amount: The amount of oToken to exercise to underlying.
+        :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+        :return: ExerciseQuote, interpolated from our curve. Profits are in
+            underlying.
+        """
+        tracked = self._tracked[otoken]
+        return self._quote(
+            tracked,
+            self._curves(tracked)[1],
+            amount,
+            profit_slippage_allowed,
+            quote_exercise_to_underlying,
+        )
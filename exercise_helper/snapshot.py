@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Tuple
+
+# helper constants, these match wBLTExerciseHelper
+MAX_BPS = 10_000
+DISCOUNT_DENOMINATOR = 100
+PRECISION = 10**18
+
+# default helper fee, 0.25%
+DEFAULT_FEE = 25
+
+
+@dataclass(frozen=True)
+class Pair:
+    """
+    State of a volatile underlying-wBLT pair.
+
+    Reserves are always stored as (underlying, wBLT), regardless of token0/token1
+    ordering on the pair itself.
+
+    :param reserve_underlying: Pair reserve of the oToken's underlying.
+    :param reserve_wblt: Pair reserve of wBLT.
+    :param fee: Swap fee out of 10,000, as returned by pairFactory.getFee(pair).
+    :param total_supply: Total supply of the LP token, needed for quoteAddLiquidity.
+    """
+
+    reserve_underlying: int
+    reserve_wblt: int
+    fee: int
+    total_supply: int = 0
+
+
+@dataclass(frozen=True)
+class BltRates:
+    """
+    BLT mint and redeem pricing for WETH, scaled to 1e18.
+
+    BLT is minted and redeemed at oracle prices, so the router quotes scale linearly
+    with size. We store one quote per direction and scale it.
+
+    :param mint_price: router.quoteMintAmountBLT(weth, 1e18), WETH needed to mint 1
+        wBLT.
+    :param redeem_price: router.quoteRedeemAmountBLT(weth, 1e18), wBLT needed to
+        receive 1 WETH.
+    :param wblt_per_weth: router.getAmountsOut(1e18, wethToWblt)[1], wBLT received for
+        1 WETH.
+    :param weth_per_wblt: router.getAmountsOut(1e18, wBltToWeth)[1], WETH received for
+        1 wBLT.
+    """
+
+    mint_price: int
+    redeem_price: int
+    wblt_per_weth: int
+    weth_per_wblt: int
+
+
+@dataclass(frozen=True)
+class OToken:
+    """
+    State of an oToken needed to price exercises.
+
+    :param discount: Exercise discount, out of 100. This is the percent of the TWAP
+        price that is paid when exercising.
+    :param twap_observations: Time-weighted (underlying, wBLT) reserves for each of the
+        oToken's twapPoints windows, oldest first, as used by pair.sample().
+    """
+
+    discount: int
+    twap_observations: Tuple[Tuple[int, int], ...]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Everything our helper reads from chain to quote a single oToken.
+
+    :param pair: Underlying-wBLT pair state.
+    :param otoken: oToken state.
+    :param blt: BLT mint/redeem pricing for WETH.
+    :param fee: Helper fee, out of 10,000.
+    """
+
+    pair: Pair
+    otoken: OToken
+    blt: BltRates
+    fee: int = DEFAULT_FEE
@@ -0,0 +1,156 @@
+from math import isqrt
+from typing import NamedTuple, Tuple
+
+from .errors import Revert
+from .quotes import (
+    LpQuote,
+    get_discounted_price,
+    quote_exercise_lp,
+    quote_exercise_profit,
+    quote_mint_amount_blt,
+)
+from .snapshot import MAX_BPS, PRECISION, Snapshot
+
+# number of bisection steps when searching for a size within slippage
+SEARCH_STEPS = 16
+
+# treat exercise cost as linear once its fitted curve is this many times our size
+LINEAR_COST_CUTOFF = 10**6
+
+
+class OptimalExercise(NamedTuple):
+    """Return values of quoteOptimalExerciseAmount()."""
+
+    optimal_amount: int
+    weth_needed: int
+    real_profit: int
+    profit_slippage: int
+
+
+def max_percent_to_lp(
+    snapshot: Snapshot, option_token_amount: int, discount: int
+) -> Tuple[int, LpQuote]:
+    """
+    Mirror of wBLTExerciseQuoter.quoteMaxPercentToLp().
+
+    Feasibility only decreases as percent_to_lp increases, so we bisect over
+    quote_exercise_lp() for the last value that doesn't revert.
+
+    :param snapshot: State to quote against.
+    :param option_token_amount: The amount of oToken to exercise to LP.
+    :param discount: Our discount percentage for LP.
+    :return: Largest feasible percent to LP (out of 10,000) and its quote.
+    """
+    low = 0
+    high = MAX_BPS - 1
+    best = None
+    while low < high:
+        mid = (low + high + 1) // 2
+        try:
+            best = quote_exercise_lp(snapshot, option_token_amount, 0, mid, discount)
+            low = mid
+        except Revert:
+            high = mid - 1
+
+    # only selling worked (or nothing did), quote directly to raise any revert
+    if low == 0:
+        best = quote_exercise_lp(snapshot, option_token_amount, 0, 0, discount)
+    return low, best
+
+
+def _try_quote(snapshot: Snapshot, amount: int, profit_slippage_allowed: int):
+    if amount == 0:
+        return None
+    try:
+        quote = quote_exercise_profit(snapshot, amount, profit_slippage_allowed)
+    except Revert:
+        return None
+    if not quote.within_slippage_tolerance:
+        return None
+    return OptimalExercise(
+        amount, quote.weth_needed, quote.real_profit, quote.profit_slippage
+    )
+
+
+def _exercise_cost(snapshot: Snapshot, amount: int) -> int:
+    if amount == 0:
+        return 0
+    return quote_mint_amount_blt(snapshot, get_discounted_price(snapshot, amount))
+
+
+def optimal_exercise_amount(
+    snapshot: Snapshot, max_amount: int, profit_slippage_allowed: int
+) -> OptimalExercise:
+    """
+    Mirror of wBLTExerciseQuoter.quoteOptimalExerciseAmount().
+
+    Selling through the pair returns kr * x / (a + x) WETH after fees, and the TWAP
+    cost of exercising has the same shape, kc * x / (u + x), which we fit from two
+    cost quotes. Profit then peaks where the two derivatives meet, which has a closed
+    form. If that size is outside our allowed profit slippage, we bisect down.
+
+    :param snapshot: State to quote against.
+    :param max_amount: The most oToken we are willing to exercise.
+    :param profit_slippage_allowed: Allowed profit slippage, out of 10,000.
+    :return: OptimalExercise, all zero if nothing is profitable.
+    """
+    if max_amount == 0:
+        raise Revert("Can't exercise zero")
+
+    pair = snapshot.pair
+    a = (pair.reserve_underlying * MAX_BPS) // (MAX_BPS - pair.fee)
+    kr = (
+        ((pair.reserve_wblt * snapshot.blt.weth_per_wblt) // PRECISION)
+        * (MAX_BPS - snapshot.fee)
+        // MAX_BPS
+    )
+
+    x1 = max_amount // 2
+    cost1 = _exercise_cost(snapshot, x1)
+    cost2 = _exercise_cost(snapshot, max_amount)
+    curvature = cost1 * max_amount - cost2 * x1
+
+    if cost2 == 0:
+        optimal_amount = max_amount
+    elif (
+        cost2 <= cost1
+        or curvature <= 0
+        or x1 * (cost2 - cost1) > LINEAR_COST_CUTOFF * curvature
+    ):
+        # cost is effectively linear, so profit peaks where marginal revenue = cost2 / x
+        target = isqrt(((kr * a) // cost2) * max_amount)
+        optimal_amount = 0 if target <= a else min(target - a, max_amount)
+    else:
+        u = (x1 * max_amount * (cost2 - cost1)) // curvature
+        kc = (cost2 * (u + max_amount)) // max_amount
+        sell_side = isqrt(kr * a)
+        cost_side = isqrt(kc * u)
+
+        # marginal profit has the sign of (sell_side - cost_side) * x + gains
+        gains_at_zero = sell_side * u > cost_side * a
+        if sell_side > cost_side or (sell_side == cost_side and gains_at_zero):
+            optimal_amount = max_amount
+        elif gains_at_zero:
+            optimal_amount = min(
+                (sell_side * u - cost_side * a) // (cost_side - sell_side), max_amount
+            )
+        else:
+            optimal_amount = 0
+
+    if optimal_amount == 0:
+        return OptimalExercise(0, 0, 0, 0)
+
+    result = _try_quote(snapshot, optimal_amount, profit_slippage_allowed)
+    if result is not None:
+        return result
+
+    low, high = 0, optimal_amount
+    result = OptimalExercise(0, 0, 0, 0)
+    for _ in range(SEARCH_STEPS):
+        mid = (low + high) // 2
+        quote = _try_quote(snapshot, mid, profit_slippage_allowed)
+        if quote is not None:
+            low, result = mid, quote
+        else:
+            high = mid
+    return result
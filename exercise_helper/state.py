@@ -0,0 +1,248 @@
+"""
+Run our fork tests on a plain local chain, with no fork, RPC or block explorer.
+
+StateRecorder is a web3 middleware that traces every transaction and call (plus any
+direct balance, code or storage reads) with geth's prestateTracer, which anvil
+supports. For each account and storage slot it keeps the first value seen, which is
+its value at our fork block, as anything changed since was read by the trace of
+whatever changed it. load_state() writes the result into a fresh local chain, and
+clear_state() wipes it again from accounts our mocks take over.
+
+Contracts loaded through cached_contract() keep their name and ABI in a cache, so
+later loads skip the explorer. Contracts missing from our cache raise unless we're
+told to fetch them, with allow_explorer() or CONTRACT_CACHE_EXPLORER=1, so a run
+meant to be offline never quietly reaches for the network. See record_state_dump
+and use_state_dump in tests/conftest.py.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict
+
+from brownie import Contract, web3
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+CONTRACT_CACHE = FIXTURES / "contracts.json"
+STATE_DUMP = FIXTURES / "state.json"
+
+PRESTATE = {"tracer": "prestateTracer"}
+
+# ganache names for our state-setting methods, anvil and hardhat use a prefix
+_GANACHE_METHODS = {
+    "setCode": "evm_setAccountCode",
+    "setStorageAt": "evm_setAccountStorageAt",
+    "setBalance": "evm_setAccountBalance",
+    "setNonce": "evm_setAccountNonce",
+}
+
+# contract caches we've read, by path
+_caches = {}
+
+# whether cached_contract() may load contracts missing from our cache from the explorer
+_explorer = bool(os.environ.get("CONTRACT_CACHE_EXPLORER"))
+
+
+def _set_method(name: str) -> str:
+    client = web3.clientVersion.lower()
+    if "anvil" in client:
+        return f"anvil_{name}"
+    if "hardhat" in client:
+        return f"hardhat_{name}"
+    return _GANACHE_METHODS[name]
+
+
+def set_code(address: str, code: str):
+    """
+    Replace the code at address on a local chain.
+
+    :param address: Account to update.
+    :param code: Runtime bytecode, as hex.
+    """
+    web3.manager.request_blocking(_set_method("setCode"), [address, code])
+
+
+def _read_cache(path: Path) -> Dict[str, Dict]:
+    path = Path(path)
+    if path not in _caches:
+        _caches[path] = json.loads(path.read_text()) if path.exists() else {}
+    return _caches[path]
+
+
+def allow_explorer(allowed: bool = True):
+    """
+    Let cached_contract() load contracts we haven't cached from the explorer.
+
+    :param allowed: False to go back to raising on contracts missing from our cache.
+    """
+    global _explorer
+    _explorer = allowed
+
+
+def cached_contract(address: str, path: Path = CONTRACT_CACHE):
+    """
+    Load a contract from our cache, or from the explorer if we haven't cached it and
+    allow_explorer() was called.
+
+    :param address: Contract address.
+    :param path: Cache file, see write_contract_cache().
+    :return: Brownie Contract.
+    """
+    cache = _read_cache(path)
+    entry = cache.get(str(address).lower())
+    if entry is not None:
+        return Contract.from_abi(entry["name"], address, entry["abi"])
+    if not _explorer:
+        raise LookupError(
+            f"{address} isn't in {path}, call allow_explorer() or set "
+            "CONTRACT_CACHE_EXPLORER=1 to load it from the explorer"
+        )
+    contract = Contract(address)
+    cache[str(address).lower()] = {"name": contract._name, "abi": contract.abi}
+    return contract
+
+
+def write_contract_cache(path: Path = CONTRACT_CACHE):
+    """
+    Save every contract loaded with cached_contract() so far.
+
+    :param path: Cache file to write.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(_read_cache(path), indent=2, sort_keys=True) + "\n")
+
+
+def _quantity(value) -> int:
+    # nodes return quantities as either hex strings or numbers
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _slot(value) -> str:
+    # same zero-padded form prestateTracer uses
+    return "0x" + format(_quantity(value), "064x")
+
+
+class StateRecorder:
+    """
+    Records the state read or written through web3 while installed.
+
+    :param block: Block we forked from, stored with our dump for reference.
+    :param timestamp: Timestamp of that block.
+    :param chain_id: Chain we forked.
+    """
+
+    def __init__(self, block: int = 0, timestamp: int = 0, chain_id: int = 0):
+        self.block = block
+        self.timestamp = timestamp
+        self.chain_id = chain_id
+        self.accounts = {}
+
+    def _account(self, address: str) -> Dict:
+        return self.accounts.setdefault(address.lower(), {"storage": {}})
+
+    def merge(self, prestate: Dict[str, Dict]):
+        """
+        Add a prestateTracer result, keeping values we've already seen.
+
+        :param prestate: Accounts, each with balance, nonce, code and storage.
+        """
+        for address, state in prestate.items():
+            account = self._account(address)
+            for key in ("balance", "nonce", "code"):
+                if key in state:
+                    account.setdefault(key, state[key])
+            for slot, value in state.get("storage", {}).items():
+                account["storage"].setdefault(slot, value)
+
+    def middleware(self, make_request, w3):
+        """web3 middleware, add with web3.middleware_onion.add()."""
+
+        def record(method, params):
+            response = make_request(method, params)
+            if "result" not in response:
+                return response
+            result = response["result"]
+
+            if method in ("eth_call", "eth_estimateGas"):
+                block = params[1] if len(params) > 1 else "latest"
+                trace = make_request("debug_traceCall", [params[0], block, PRESTATE])
+                self.merge(trace["result"])
+            elif method in ("eth_sendTransaction", "eth_sendRawTransaction"):
+                trace = make_request("debug_traceTransaction", [result, PRESTATE])
+                self.merge(trace["result"])
+            elif method == "eth_getBalance":
+                self._account(params[0]).setdefault("balance", result)
+            elif method == "eth_getCode":
+                self._account(params[0]).setdefault("code", result)
+            elif method == "eth_getStorageAt":
+                self._account(params[0])["storage"].setdefault(_slot(params[1]), result)
+            return response
+
+        return record
+
+    def write(self, path: Path = STATE_DUMP):
+        """
+        Save our state dump.
+
+        :param path: File to write.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state = {
+            "block": self.block,
+            "timestamp": self.timestamp,
+            "chain_id": self.chain_id,
+            "accounts": self.accounts,
+        }
+        path.write_text(json.dumps(state, indent=1, sort_keys=True) + "\n")
+
+
+def load_state(path: Path = STATE_DUMP) -> Dict:
+    """
+    Write a recorded state dump into our local chain.
+
+    Block number and time stay those of our local chain, which are usually later
+    than our fork block.
+
+    :param path: Dump written by StateRecorder.write().
+    :return: The dump we loaded.
+    """
+    state = json.loads(Path(path).read_text())
+    methods = {name: _set_method(name) for name in _GANACHE_METHODS}
+    for address, account in state["accounts"].items():
+        if account.get("code", "0x") != "0x":
+            web3.manager.request_blocking(
+                methods["setCode"], [address, account["code"]]
+            )
+        if "balance" in account:
+            web3.manager.request_blocking(
+                methods["setBalance"], [address, account["balance"]]
+            )
+        if "nonce" in account:
+            web3.manager.request_blocking(
+                methods["setNonce"], [address, hex(_quantity(account["nonce"]))]
+            )
+        for slot, value in account["storage"].items():
+            web3.manager.request_blocking(
+                methods["setStorageAt"], [address, slot, value]
+            )
+    return state
+
+
+def clear_state(state: Dict, addresses):
+    """
+    Zero the storage load_state() wrote at addresses, such as before putting mocks
+    at the addresses of the contracts they stand in for.
+
+    :param state: Dump returned by load_state().
+    :param addresses: Accounts to clear, others are left as loaded.
+    """
+    method = _set_method("setStorageAt")
+    zero = "0x" + "00" * 32
+    for address in addresses:
+        account = state["accounts"].get(str(address).lower())
+        if account is None:
+            continue
+        for slot in account["storage"]:
+            web3.manager.request_blocking(method, [address, slot, zero])
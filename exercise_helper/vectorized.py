@@ -0,0 +1,244 @@
+"""
+NumPy versions of our quotes, evaluated over whole arrays of inputs at once.
+
+Math runs in float64 with the contract's integer divisions floored, so results match
+the exact quotes to ~1e-12 relative error. Entries where the contract would revert are
+flagged with valid=False instead of raising.
+
+Snapshot fields may also be arrays, one entry per block, which broadcast against our
+inputs. exercise_helper.backtest uses this to quote many blocks at once.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from .snapshot import DISCOUNT_DENOMINATOR, MAX_BPS, PRECISION, Snapshot
+
+
+class ExerciseCurve(NamedTuple):
+    """Array versions of ExerciseQuote, plus a mask of non-reverting entries."""
+
+    weth_needed: np.ndarray
+    within_slippage_tolerance: np.ndarray
+    real_profit: np.ndarray
+    expected_profit: np.ndarray
+    profit_slippage: np.ndarray
+    valid: np.ndarray
+
+
+class LpCurve(NamedTuple):
+    """Array versions of LpQuote, plus a mask of non-reverting entries."""
+
+    within_slippage_tolerance: np.ndarray
+    lp_amount_out: np.ndarray
+    wblt_out: np.ndarray
+    profit_slippage: np.ndarray
+    valid: np.ndarray
+
+
+def _as_float(value) -> np.ndarray:
+    # works for python ints too large for int64, and for array snapshot fields
+    return np.asarray(value, dtype=np.float64)
+
+
+def _twap(snapshot: Snapshot, amounts: np.ndarray) -> np.ndarray:
+    summed = np.zeros_like(amounts)
+    for reserve_underlying, reserve_wblt in snapshot.otoken.twap_observations:
+        summed += np.floor(
+            amounts
+            * _as_float(reserve_wblt)
+            / (_as_float(reserve_underlying) + amounts)
+        )
+    return np.floor(summed / len(snapshot.otoken.twap_observations))
+
+
+def _amount_out(snapshot: Snapshot, amounts: np.ndarray) -> np.ndarray:
+    pair = snapshot.pair
+    amounts = amounts - np.floor(amounts * pair.fee / MAX_BPS)
+    return np.floor(
+        amounts
+        * _as_float(pair.reserve_wblt)
+        / (_as_float(pair.reserve_underlying) + amounts)
+    )
+
+
+def _weth_needed(snapshot: Snapshot, amounts: np.ndarray) -> np.ndarray:
+    discounted = np.floor(
+        _twap(snapshot, amounts) * snapshot.otoken.discount / DISCOUNT_DENOMINATOR
+    )
+    return np.floor(discounted * snapshot.blt.mint_price / PRECISION)
+
+
+def _weth_received(snapshot: Snapshot, amounts: np.ndarray) -> np.ndarray:
+    return np.floor(
+        _amount_out(snapshot, amounts) * snapshot.blt.weth_per_wblt / PRECISION
+    )
+
+
+def _slippage(real_profit, expected_profit, profit_slippage_allowed):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profit_slippage = np.where(
+            expected_profit > real_profit,
+            PRECISION - np.floor(real_profit * PRECISION / expected_profit),
+            0.0,
+        )
+    expected_profit = np.floor(
+        expected_profit * (MAX_BPS - profit_slippage_allowed) / MAX_BPS
+    )
+    return profit_slippage, expected_profit, real_profit > expected_profit
+
+
+def exercise_profit_curve(
+    snapshot: Snapshot, option_token_amounts, profit_slippage_allowed=0
+) -> ExerciseCurve:
+    """
+    Vectorized quoteExerciseProfit().
+
+    :param snapshot: State to quote against.
+    :param option_token_amounts: Array of oToken amounts to exercise to WETH.
+    :param profit_slippage_allowed: Allowed profit slippage out of 10,000, scalar or
+        array broadcastable against option_token_amounts.
+    :return: ExerciseCurve with one entry per amount.
+    """
+    amounts, profit_slippage_allowed = np.broadcast_arrays(
+        np.asarray(option_token_amounts, dtype=np.float64),
+        np.asarray(profit_slippage_allowed, dtype=np.float64),
+    )
+    weth_needed = _weth_needed(snapshot, amounts)
+    weth_received = _weth_received(snapshot, amounts)
+    estimated_fee = np.floor(weth_received * snapshot.fee / MAX_BPS)
+    real_profit = weth_received - weth_needed - estimated_fee
+
+    discount = snapshot.otoken.discount
+    expected_profit = (
+        np.floor(weth_needed * (DISCOUNT_DENOMINATOR - discount) / discount)
+        - estimated_fee
+    )
+    valid = (
+        (amounts > 0)
+        & (profit_slippage_allowed <= MAX_BPS)
+        & (real_profit >= 0)
+        & (expected_profit >= 0)
+    )
+
+    profit_slippage, expected_profit, within = _slippage(
+        real_profit, expected_profit, profit_slippage_allowed
+    )
+    return ExerciseCurve(
+        weth_needed, within, real_profit, expected_profit, profit_slippage, valid
+    )
+
+
+def exercise_to_underlying_curve(
+    snapshot: Snapshot, option_token_amounts, profit_slippage_allowed=0
+) -> ExerciseCurve:
+    """
+    Vectorized quoteExerciseToUnderlying().
+
+    :param snapshot: State to quote against.
+    :param option_token_amounts: Array of oToken amounts to exercise to underlying.
+    :param profit_slippage_allowed: Allowed profit slippage out of 10,000, scalar or
+        array broadcastable against option_token_amounts.
+    :return: ExerciseCurve with one entry per amount, profits in underlying.
+    """
+    amounts, profit_slippage_allowed = np.broadcast_arrays(
+        np.asarray(option_token_amounts, dtype=np.float64),
+        np.asarray(profit_slippage_allowed, dtype=np.float64),
+    )
+    pair = snapshot.pair
+    weth_needed = _weth_needed(snapshot, amounts)
+    weth_min = weth_needed + np.floor(
+        _weth_received(snapshot, amounts) * snapshot.fee / MAX_BPS
+    )
+    wblt_min = np.floor(weth_min * snapshot.blt.redeem_price / PRECISION)
+
+    # same as _getAmountIn, but flag entries that would revert
+    with np.errstate(divide="ignore", invalid="ignore"):
+        underlying_in = (
+            np.floor(
+                _as_float(pair.reserve_underlying)
+                * wblt_min
+                * MAX_BPS
+                / ((pair.reserve_wblt - wblt_min) * (MAX_BPS - pair.fee))
+            )
+            + 1
+        )
+    real_profit = amounts - underlying_in
+
+    discount = snapshot.otoken.discount
+    profit_per_token = (
+        MAX_BPS * (DISCOUNT_DENOMINATOR - discount)
+    ) // DISCOUNT_DENOMINATOR - snapshot.fee
+    expected_profit = np.floor(amounts * profit_per_token / MAX_BPS)
+    valid = (
+        (amounts > 0)
+        & (profit_slippage_allowed <= MAX_BPS)
+        & (wblt_min > 0)
+        & (wblt_min < pair.reserve_wblt)
+        & (real_profit >= 0)
+    )
+
+    profit_slippage, expected_profit, within = _slippage(
+        real_profit, expected_profit, profit_slippage_allowed
+    )
+    return ExerciseCurve(
+        weth_needed, within, real_profit, expected_profit, profit_slippage, valid
+    )
+
+
+def exercise_lp_curve(
+    snapshot: Snapshot,
+    option_token_amounts,
+    percent_to_lp,
+    discount,
+    profit_slippage_allowed=0,
+) -> LpCurve:
+    """
+    Vectorized quoteExerciseLp().
+
+    :param snapshot: State to quote against.
+    :param option_token_amounts: Array of oToken amounts to exercise to LP.
+    :param percent_to_lp: Out of 10,000, how much of our oToken to exercise for LP.
+    :param discount: Our discount percentage for LP.
+    :param profit_slippage_allowed: Allowed profit slippage out of 10,000.
+    :return: LpCurve with one entry per broadcast input.
+    """
+    amounts, percent_to_lp, discount, profit_slippage_allowed = np.broadcast_arrays(
+        np.asarray(option_token_amounts, dtype=np.float64),
+        np.asarray(percent_to_lp, dtype=np.float64),
+        np.asarray(discount, dtype=np.float64),
+        np.asarray(profit_slippage_allowed, dtype=np.float64),
+    )
+    pair = snapshot.pair
+    # same split as the contract, rounded so that zero percent is exactly zero
+    tokens_to_lp = np.ceil(amounts * percent_to_lp / MAX_BPS)
+    tokens_to_sell = amounts - tokens_to_lp
+    sell = exercise_to_underlying_curve(
+        snapshot, tokens_to_sell, profit_slippage_allowed
+    )
+    wblt_amount_out = _amount_out(snapshot, np.maximum(sell.real_profit, 0.0))
+
+    matching_for_lp = np.floor(
+        tokens_to_lp * _as_float(pair.reserve_wblt) / pair.reserve_underlying
+    )
+    payment_amount = (
+        np.floor(_twap(snapshot, tokens_to_lp) * discount / DISCOUNT_DENOMINATOR)
+        + matching_for_lp
+    )
+
+    # quoteAddLiquidity, our matching amount is always the optimal amount
+    lp_amount_out = np.minimum(
+        np.floor(tokens_to_lp * _as_float(pair.total_supply) / pair.reserve_underlying),
+        np.floor(matching_for_lp * _as_float(pair.total_supply) / pair.reserve_wblt),
+    )
+    valid = (
+        sell.valid & (percent_to_lp <= MAX_BPS) & (payment_amount <= wblt_amount_out)
+    )
+    return LpCurve(
+        sell.within_slippage_tolerance,
+        lp_amount_out,
+        wblt_amount_out - payment_amount,
+        sell.profit_slippage,
+        valid,
+    )
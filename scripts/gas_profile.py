@@ -0,0 +1,74 @@
+"""
+Profile gas per phase of our exercise pipeline on a fork.
+
+    brownie run gas_profile --network base-dev-fork
+
+Prints a table of gas per phase for each entry point and size, and writes
+gas_profile.folded for a flame graph, such as `flamegraph.pl gas_profile.folded`.
+"""
+
+from brownie import Contract, accounts, chain, wBLTExerciseHelper
+
+from exercise_helper.gas import (
+    checkpoints_from_tx,
+    folded_stacks,
+    format_table,
+    phase_gas,
+)
+
+OBMX = "0x3Ff7AB26F2dfD482C40bDaDfC0e88D01BFf79713"
+OBMX_WHALE = "0xE02Fb5C70aF32F80Aa7F9E8775FE7F12550348ec"
+OWNER = "0x89955a99552F11487FFdc054a6875DF9446B2902"
+
+SIZES = [10 * 10**18, 100 * 10**18, 1_000 * 10**18]
+PROFIT_SLIPPAGE = 9500
+SWAP_SLIPPAGE = 100
+PERCENT_TO_LP = 100
+DISCOUNT = 35
+
+
+def main(output="gas_profile.folded"):
+    owner = accounts.at(OWNER, force=True)
+    whale = accounts.at(OBMX_WHALE, force=True)
+    obmx = Contract(OBMX)
+
+    helper = wBLTExerciseHelper.deploy({"from": owner})
+    helper.setGasTracing(True, {"from": owner})
+    obmx.approve(helper, 2**256 - 1, {"from": whale})
+
+    # the first exercise registers our oToken, keep that out of our numbers
+    helper.exercise(
+        obmx, SIZES[0], False, PROFIT_SLIPPAGE, SWAP_SLIPPAGE, {"from": whale}
+    )
+
+    runs = {}
+    for size in SIZES:
+        label = f"{size // 10**18} oBMX"
+        cases = {
+            f"weth {label}": lambda: helper.exercise(
+                obmx, size, False, PROFIT_SLIPPAGE, SWAP_SLIPPAGE, {"from": whale}
+            ),
+            f"underlying {label}": lambda: helper.exercise(
+                obmx, size, True, PROFIT_SLIPPAGE, SWAP_SLIPPAGE, {"from": whale}
+            ),
+            f"lp {label}": lambda: helper.exerciseToLp(
+                obmx,
+                size,
+                PROFIT_SLIPPAGE,
+                SWAP_SLIPPAGE,
+                PERCENT_TO_LP,
+                DISCOUNT,
+                {"from": whale},
+            ),
+        }
+        for name, run in cases.items():
+            # same starting state for every case
+            chain.snapshot()
+            tx = run()
+            runs[name] = phase_gas(checkpoints_from_tx(tx), tx.gas_used)
+            chain.revert()
+
+    print(format_table(runs))
+    with open(output, "w") as f:
+        f.write(folded_stacks(runs))
+    print(f"Wrote {output}")
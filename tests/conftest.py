@@ -1,7 +1,28 @@
 import pytest
-from brownie import config, Contract, ZERO_ADDRESS, chain, interface, accounts
+import warnings
+from dataclasses import replace
+from brownie import config, Contract, ZERO_ADDRESS, chain, interface, accounts, network
 from eth_abi import encode_single
 import requests
+from exercise_helper import BltRates, OToken, Pair, Snapshot
+from exercise_helper.chain import (
+    BALANCER_VAULT,
+    BVM_ROUTER,
+    PAIR_FACTORY,
+    ROUTER,
+    WBLT,
+    WETH,
+)
+from exercise_helper.mocks import deploy_mocks
+from exercise_helper.state import (
+    STATE_DUMP,
+    StateRecorder,
+    allow_explorer,
+    cached_contract,
+    clear_state,
+    load_state,
+    write_contract_cache,
+)
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -38,8 +59,49 @@ def fun_with_anvil(web3):
     web3.manager.request_blocking("anvil_setNextBlockBaseFeePerGas", ["0x0"])
 
 
+# record the state our tests touch to tests/fixtures, along with the ABIs of contracts our fixtures load. needs anvil, so use base-anvil-fork
+record_state_dump = False
+
+# run everything on a plain local chain (such as --network development) loaded from our recorded state, no fork or explorer needed.
+# on by default, turn off to run against a live fork instead
+use_state_dump = not record_state_dump
+
+# contracts missing from tests/fixtures/contracts.json only come from the block explorer while recording, or with CONTRACT_CACHE_EXPLORER=1
+if record_state_dump:
+    allow_explorer()
+
+
+@pytest.fixture(scope="session", autouse=record_state_dump)
+def state_recorder(web3, chain):
+    block = web3.eth.get_block("latest")
+    recorder = StateRecorder(block.number, block.timestamp, chain.id)
+    web3.middleware_onion.add(recorder.middleware, name="state_recorder")
+    yield recorder
+
+    # cache everything our helper hardcodes too, some are only loaded by scripts
+    for address in (WETH, WBLT, BALANCER_VAULT, ROUTER, BVM_ROUTER, PAIR_FACTORY):
+        cached_contract(address)
+    web3.middleware_onion.remove("state_recorder")
+    recorder.write()
+    write_contract_cache()
+
+
+@pytest.fixture(scope="session", autouse=use_state_dump)
+def state_dump():
+    # mock-only runs don't need our dump, and fork tests fail without it as the contracts they load have no code
+    if not STATE_DUMP.exists():
+        warnings.warn(
+            f"no state dump at {STATE_DUMP}, fork tests will fail. record one with record_state_dump = True "
+            "on base-anvil-fork or set use_state_dump = False to run on a live fork"
+        )
+        yield None
+    else:
+        yield load_state(STATE_DUMP)
+
+
 ################################################## TENDERLY DEBUGGING ##################################################
 
+
 # change autouse to True if we want to use this fork to help debug tests
 @pytest.fixture(scope="session", autouse=use_tenderly)
 def tenderly_fork(web3, chain):
@@ -75,6 +137,7 @@ def tenderly_fork(web3, chain):
 
 ################################################ UPDATE THINGS BELOW HERE ################################################
 
+
 # use this to test both exercising for WETH and underlying
 @pytest.fixture(
     params=[
@@ -103,19 +166,21 @@ def buy_underlying(request):
 
 @pytest.fixture(scope="session")
 def router():
-    router = Contract("0x22Fd6123392E729D5116E3b2a1FDF46298D26b2D")  # v25, testing
+    router = cached_contract(
+        "0x22Fd6123392E729D5116E3b2a1FDF46298D26b2D"
+    )  # v25, testing
     yield router
 
 
 @pytest.fixture(scope="session")
 def bvm_router():
-    bvm_router = Contract("0x70FfF9B84788566065f1dFD8968Fb72F798b9aE5")
+    bvm_router = cached_contract("0x70FfF9B84788566065f1dFD8968Fb72F798b9aE5")
     yield bvm_router
 
 
 @pytest.fixture(scope="session")
 def gauge():
-    yield Contract("0x1F7B5E65c09dF12742255BB8Fe26958f4B52F9bb")  # wBLT-BMX
+    yield cached_contract("0x1F7B5E65c09dF12742255BB8Fe26958f4B52F9bb")  # wBLT-BMX
 
 
 @pytest.fixture(scope="session")
@@ -140,22 +205,22 @@ def w_blt_whale():
 
 @pytest.fixture(scope="session")
 def w_blt():
-    yield Contract("0x4E74D4Db6c0726ccded4656d0BCE448876BB4C7A")
+    yield cached_contract("0x4E74D4Db6c0726ccded4656d0BCE448876BB4C7A")
 
 
 @pytest.fixture(scope="session")
 def weth():
-    yield Contract("0x4200000000000000000000000000000000000006")
+    yield cached_contract("0x4200000000000000000000000000000000000006")
 
 
 @pytest.fixture(scope="session")
 def bmx():
-    yield Contract("0x548f93779fBC992010C07467cBaf329DD5F059B7")
+    yield cached_contract("0x548f93779fBC992010C07467cBaf329DD5F059B7")
 
 
 @pytest.fixture(scope="session")
 def obmx():
-    yield Contract("0x3Ff7AB26F2dfD482C40bDaDfC0e88D01BFf79713")
+    yield cached_contract("0x3Ff7AB26F2dfD482C40bDaDfC0e88D01BFf79713")
 
 
 # route to swap from wBLT to WETH
@@ -184,3 +249,100 @@ def bmx_exercise_helper(wBLTExerciseHelper, screamsh, router):
     #         "0x021Ecb50c4f2de23d4a1E1492b7362094a94EC79"
     #     )  # using v22 router
     yield bmx_exercise_helper
+
+
+# batches, split sales, LP zaps and operator exercises, in their own contract
+@pytest.fixture(scope="function")
+def exercise_flows(wBLTExerciseFlows, screamsh):
+    exercise_flows = screamsh.deploy(wBLTExerciseFlows)
+    yield exercise_flows
+
+
+# read-only solvers on top of our helper
+@pytest.fixture(scope="function")
+def exercise_quoter(wBLTExerciseQuoter, screamsh, bmx_exercise_helper):
+    exercise_quoter = screamsh.deploy(wBLTExerciseQuoter, bmx_exercise_helper)
+    yield exercise_quoter
+
+
+################################################## LOCAL MOCKS ##################################################
+
+
+# offline_snapshot with TWAP at spot, and BLT rates our mock router can round trip without coming up short
+@pytest.fixture(scope="session")
+def mock_snapshot(offline_snapshot):
+    pair = offline_snapshot.pair
+    yield replace(
+        offline_snapshot,
+        otoken=OToken(
+            discount=50,
+            twap_observations=((pair.reserve_underlying, pair.reserve_wblt),) * 4,
+        ),
+        blt=BltRates(
+            mint_price=646_000_000_000_000,
+            redeem_price=1_558 * 10**18,
+            wblt_per_weth=1_550 * 10**18,
+            weth_per_wblt=642_000_000_000_000,
+        ),
+    )
+
+
+# mocks of everything our helper calls, at its hardcoded addresses. these need a local chain, such as --network development
+@pytest.fixture(scope="module")
+def mocks(request, module_isolation, mock_snapshot):
+    if "fork" in network.show_active():
+        pytest.skip(
+            "Mocks need a local chain without a fork, use --network development"
+        )
+    # our mocks take over real addresses, so don't leave them our state dump's storage. module_isolation puts it back after
+    state = request.getfixturevalue("state_dump") if use_state_dump else None
+    if state is not None:
+        clear_state(
+            state, (WETH, WBLT, PAIR_FACTORY, BALANCER_VAULT, ROUTER, BVM_ROUTER)
+        )
+    yield deploy_mocks(accounts[0], mock_snapshot)
+
+
+# our helper on top of our mocks
+@pytest.fixture(scope="module")
+def mock_exercise_helper(mocks, wBLTExerciseHelper):
+    yield wBLTExerciseHelper.deploy({"from": accounts[0]})
+
+
+# our flows contract on top of our mocks
+@pytest.fixture(scope="module")
+def mock_exercise_flows(mocks, wBLTExerciseFlows):
+    yield wBLTExerciseFlows.deploy({"from": accounts[0]})
+
+
+# our quoter on top of our mock helper
+@pytest.fixture(scope="module")
+def mock_exercise_quoter(mock_exercise_helper, wBLTExerciseQuoter):
+    yield wBLTExerciseQuoter.deploy(mock_exercise_helper, {"from": accounts[0]})
+
+
+################################################## OFFLINE QUOTE ENGINE ##################################################
+
+
+# offline snapshot, roughly the BMX-wBLT pool and wBLT pricing on Base. use this for tests that don't need a fork.
+@pytest.fixture(scope="session")
+def offline_snapshot():
+    yield Snapshot(
+        pair=Pair(
+            reserve_underlying=200_000 * 10**18,
+            reserve_wblt=107_000 * 10**18,
+            fee=20,
+            total_supply=146_287 * 10**18,
+        ),
+        otoken=OToken(
+            discount=88,
+            twap_observations=((199_000 * 10**18, 108_000 * 10**18),)
+            + ((199_500 * 10**18, 107_800 * 10**18),) * 3,
+        ),
+        blt=BltRates(
+            mint_price=645_000_000_000_000,
+            redeem_price=1_557 * 10**18,
+            wblt_per_weth=1_550 * 10**18,
+            weth_per_wblt=642_000_000_000_000,
+        ),
+    )
@@ -0,0 +1,95 @@
+import time
+from dataclasses import replace
+
+import numpy as np
+import pytest
+from exercise_helper import Pair, Revert, quote_exercise_profit
+from exercise_helper.backtest import ExercisePolicy, backtest, write_snapshots
+from exercise_helper.snapshot import MAX_BPS
+
+
+def _history(snapshot, blocks, seed=0):
+    # random walk of the pool's price, with the TWAP lagging a block behind spot
+    rng = np.random.default_rng(seed)
+    k = snapshot.pair.reserve_underlying * snapshot.pair.reserve_wblt
+    price = snapshot.pair.reserve_wblt / snapshot.pair.reserve_underlying
+    last = (snapshot.pair.reserve_underlying, snapshot.pair.reserve_wblt)
+    for block in range(blocks):
+        price *= float(np.exp(rng.normal(0, 0.01)))
+        reserve_underlying = int((k / price) ** 0.5)
+        reserve_wblt = k // reserve_underlying
+        yield block, replace(
+            snapshot,
+            pair=Pair(reserve_underlying, reserve_wblt, snapshot.pair.fee),
+            otoken=replace(snapshot.otoken, twap_observations=(last,) * 4),
+        )
+        last = (reserve_underlying, reserve_wblt)
+
+
+def test_offline_backtest(offline_snapshot, tmp_path):
+    snapshot = replace(
+        offline_snapshot, otoken=replace(offline_snapshot.otoken, discount=50)
+    )
+    path = tmp_path / "snapshots.csv"
+    history = list(_history(snapshot, 2_000))
+    write_snapshots(path, history)
+
+    policies = [
+        ExercisePolicy(100 * 10**18),
+        ExercisePolicy(1_000 * 10**18, profit_slippage_allowed=300, every_blocks=10),
+        ExercisePolicy(100 * 10**18, min_profit=14 * 10**15),
+    ]
+    reports = backtest(path, policies, chunk_rows=333)
+
+    # chunk size only changes float rounding in our sums
+    for chunked, whole in zip(reports, backtest(path, policies)):
+        assert chunked.exercises == whole.exercises
+        assert chunked.realized_profit == pytest.approx(whole.realized_profit)
+        assert (chunked.slippage_histogram == whole.slippage_histogram).all()
+
+    # check against our exact quotes, one block at a time
+    for policy, report in zip(policies, reports):
+        print(policy, report._replace(slippage_histogram=None))
+        print("Median slippage:", report.slippage_percentile(50) / 1e18)
+        rows = exercises = profit = fees = 0
+        for block, state in history:
+            if block % policy.every_blocks:
+                continue
+            rows += 1
+            try:
+                quote = quote_exercise_profit(
+                    state, policy.amount, policy.profit_slippage_allowed
+                )
+            except Revert:
+                continue
+            if not quote.within_slippage_tolerance:
+                continue
+            if quote.real_profit < policy.min_profit:
+                continue
+            exercises += 1
+            profit += quote.real_profit
+            fees += (
+                (quote.real_profit + quote.weth_needed)
+                * state.fee
+                // (MAX_BPS - state.fee)
+            )
+
+        assert report.rows == rows
+        assert report.exercises == exercises
+        assert report.exercised == exercises * policy.amount
+        assert report.realized_profit == pytest.approx(profit, rel=1e-9)
+        assert report.fees_paid == pytest.approx(fees, rel=1e-6)
+        assert report.slippage_histogram.sum() == exercises
+
+    # a minimum profit skips our worse blocks
+    assert 0 < reports[2].exercises < reports[0].exercises
+
+    # a longer history, streamed in chunks
+    path = tmp_path / "long.csv"
+    write_snapshots(path, _history(snapshot, 100_000, seed=1))
+    start = time.perf_counter()
+    reports = backtest(path, policies)
+    elapsed = time.perf_counter() - start
+    print("100k blocks x", len(policies), "policies:", round(elapsed, 2), "seconds")
+    assert reports[0].rows == 100_000
+    assert reports[1].rows == 10_000
@@ -0,0 +1,10 @@
+# EIP-170 limit on deployed code, anything bigger can't be deployed on Base
+MAX_CODE_SIZE = 24_576
+
+
+def test_contract_size(wBLTExerciseHelper, wBLTExerciseFlows, wBLTExerciseQuoter):
+    for container in [wBLTExerciseHelper, wBLTExerciseFlows, wBLTExerciseQuoter]:
+        # deployedBytecode is hex without 0x, two characters per byte
+        size = len(container._build["deployedBytecode"]) // 2
+        print(container._name, "{:,} bytes".format(size))
+        assert size <= MAX_CODE_SIZE
@@ -0,0 +1,95 @@
+import brownie
+from brownie import chain
+import pytest
+
+
+def test_exercise_batch(
+    obmx, bmx, weth, w_blt, bmx_exercise_helper, exercise_flows, obmx_whale
+):
+    profit_slippage = 9500
+    swap_slippage = 100
+
+    # entries run in order, so put our strict underlying exercise first
+    requests = [
+        (obmx, 100e18, True, profit_slippage, swap_slippage),
+        (obmx, 100e18, False, profit_slippage, swap_slippage),
+    ]
+    underlying_quote = bmx_exercise_helper.quoteExerciseToUnderlying(
+        obmx, 100e18, profit_slippage
+    )
+
+    obmx.approve(exercise_flows, 2**256 - 1, {"from": obmx_whale})
+    obmx_before = obmx.balanceOf(obmx_whale)
+    weth_before = weth.balanceOf(obmx_whale)
+    bmx_before = bmx.balanceOf(obmx_whale)
+
+    tx = exercise_flows.exerciseBatch(requests, {"from": obmx_whale})
+    print("Batch gas used:", tx.gas_used)
+
+    bmx_profit = bmx.balanceOf(obmx_whale) - bmx_before
+    weth_profit = weth.balanceOf(obmx_whale) - weth_before
+    print("BMX profit:", bmx_profit / 1e18, "WETH profit:", weth_profit / 1e18)
+    assert obmx_before - obmx.balanceOf(obmx_whale) == 200e18
+    assert bmx_profit >= underlying_quote["realProfit"]
+    assert weth_profit > 0
+
+    # nothing left behind
+    for token in [obmx, bmx, weth, w_blt]:
+        assert token.balanceOf(exercise_flows) == 0
+
+    with brownie.reverts("Nothing to exercise"):
+        exercise_flows.exerciseBatch([], {"from": obmx_whale})
+
+
+def test_exercise_batch_same_pair(
+    obmx, bmx, weth, w_blt, bmx_exercise_helper, exercise_flows, obmx_whale
+):
+    profit_slippage = 9500
+    swap_slippage = 100
+    to_exercise = 1_000e18
+
+    # our underlying entry runs after our first has already sold into the same pair,
+    #  so it only goes through if it is quoted against that pair's new reserves
+    requests = [
+        (obmx, to_exercise, False, profit_slippage, swap_slippage),
+        (obmx, to_exercise, True, profit_slippage, swap_slippage),
+    ]
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    obmx.approve(exercise_flows, 2**256 - 1, {"from": obmx_whale})
+
+    # the same exercises one at a time, as a reference
+    chain.snapshot()
+    weth_before = weth.balanceOf(obmx_whale)
+    bmx_before = bmx.balanceOf(obmx_whale)
+    for request in requests:
+        bmx_exercise_helper.exercise(*request, {"from": obmx_whale})
+    single_weth = weth.balanceOf(obmx_whale) - weth_before
+    single_bmx = bmx.balanceOf(obmx_whale) - bmx_before
+    chain.revert()
+
+    tx = exercise_flows.exerciseBatch(requests, {"from": obmx_whale})
+    print("Batch gas used:", tx.gas_used)
+    weth_profit = weth.balanceOf(obmx_whale) - weth_before
+    bmx_profit = bmx.balanceOf(obmx_whale) - bmx_before
+    print("Batch WETH:", weth_profit / 1e18, "single:", single_weth / 1e18)
+    print("Batch BMX:", bmx_profit / 1e18, "single:", single_bmx / 1e18)
+
+    # our second entry now sells more underlying to repay its share of our loan, just
+    #  as it would on its own. only dust differs, as it is swept once in a batch
+    assert [event["mode"] for event in tx.events["Exercised"]] == [0, 1]
+    assert weth_profit == pytest.approx(single_weth, rel=1e-2)
+    assert bmx_profit == pytest.approx(single_bmx, rel=1e-2)
+    for token in [obmx, bmx, weth, w_blt]:
+        assert token.balanceOf(exercise_flows) == 0
+
+    # with no entry wanting WETH, leftovers are swept into underlying as usual
+    chain.revert()
+    requests = [
+        (obmx, to_exercise, True, profit_slippage, swap_slippage),
+        (obmx, to_exercise / 2, True, profit_slippage, swap_slippage),
+    ]
+    exercise_flows.exerciseBatch(requests, {"from": obmx_whale})
+    assert bmx.balanceOf(obmx_whale) > bmx_before
+    assert weth.balanceOf(obmx_whale) - weth_before < 1e15
+    for token in [obmx, bmx, weth, w_blt]:
+        assert token.balanceOf(exercise_flows) == 0
@@ -0,0 +1,91 @@
+from brownie import chain
+from exercise_helper import get_amount_out, get_zap_amount_in
+
+
+def test_offline_zap_amount_in(offline_snapshot):
+    pair = offline_snapshot.pair
+    reserve_underlying, reserve_wblt = pair.reserve_underlying, pair.reserve_wblt
+    to_lp = 100 * 10**18
+    payment = 40 * 10**18
+
+    def covered(amount_in, wblt_balance):
+        # wBLT out of our zap, and wBLT needed to pair after our zap moves the pool
+        wblt_out = get_amount_out(amount_in, reserve_underlying, reserve_wblt, pair.fee)
+        amount_in -= (amount_in * pair.fee) // 10_000
+        matching = (to_lp * (reserve_wblt - wblt_out)) // (
+            reserve_underlying + amount_in
+        )
+        return wblt_out + wblt_balance >= payment + matching
+
+    for wblt_balance in [0, 10 * 10**18, 50 * 10**18]:
+        zap = get_zap_amount_in(
+            to_lp, payment, wblt_balance, reserve_underlying, reserve_wblt, pair.fee
+        )
+        print("Zap", zap / 1e18, "underlying with", wblt_balance / 1e18, "wBLT")
+        assert covered(zap, wblt_balance)
+
+        # and we aren't swapping more than we need to
+        assert not covered(zap * (10**12 - 1) // 10**12, wblt_balance)
+
+    # already holding enough wBLT means no swap at all
+    assert (
+        get_zap_amount_in(
+            to_lp, payment, 100 * 10**18, reserve_underlying, reserve_wblt, pair.fee
+        )
+        == 0
+    )
+
+
+def test_exercise_to_lp_zap(
+    obmx, bmx, weth, w_blt, gauge, bmx_exercise_helper, exercise_flows, obmx_whale
+):
+    to_exercise = 1_500e18
+    profit_slippage = 9500
+    swap_slippage = 100
+    percent_to_lp = 100
+    discount = 35
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    obmx.approve(exercise_flows, 2**256 - 1, {"from": obmx_whale})
+
+    # exercise the usual way, then the same thing with our zap
+    results = []
+    for function in [
+        bmx_exercise_helper.exerciseToLp,
+        exercise_flows.exerciseToLpZap,
+    ]:
+        chain.snapshot()
+        balances_before = [
+            token.balanceOf(obmx_whale) for token in [gauge, w_blt, bmx, weth]
+        ]
+        tx = function(
+            obmx,
+            to_exercise,
+            profit_slippage,
+            swap_slippage,
+            percent_to_lp,
+            discount,
+            {"from": obmx_whale},
+        )
+        received = [
+            token.balanceOf(obmx_whale) - before
+            for token, before in zip([gauge, w_blt, bmx, weth], balances_before)
+        ]
+        print(
+            function.abi["name"], "gas:", tx.gas_used, "LP, wBLT, BMX, WETH:", received
+        )
+        results.append((tx.gas_used, received))
+
+        # nothing left behind in either contract
+        for token in [bmx, weth, w_blt, obmx]:
+            assert token.balanceOf(bmx_exercise_helper) == 0
+            assert token.balanceOf(exercise_flows) == 0
+        chain.revert()
+
+    (gas, received), (zap_gas, zap_received) = results
+    assert zap_gas < gas
+
+    # same LP, but we keep our extra underlying instead of swapping it to wBLT
+    assert zap_received[0] > 0
+    assert zap_received[0] >= received[0] * 0.995
+    assert zap_received[2] > received[2]
+    assert zap_received[1] < received[1]
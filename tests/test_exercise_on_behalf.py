@@ -0,0 +1,104 @@
+import brownie
+from brownie import accounts
+import pytest
+
+
+def test_exercise_on_behalf(
+    obmx, bmx, weth, exercise_flows, obmx_whale, receive_underlying
+):
+    keeper = accounts[3]
+    owners = [accounts[1], accounts[2]]
+    payouts = [accounts[4], owners[1]]
+    amounts = [100e18, 300e18]
+    output = bmx if receive_underlying else weth
+
+    for owner, amount in zip(owners, amounts):
+        obmx.transfer(owner, amount, {"from": obmx_whale})
+        obmx.approve(exercise_flows, 2**256 - 1, {"from": owner})
+
+    # our first owner sends their proceeds elsewhere, our second keeps the default
+    exercise_flows.setPayoutAddress(payouts[0], {"from": owners[0]})
+    entries = list(zip(owners, amounts))
+
+    # our keeper isn't approved yet
+    with brownie.reverts("Not an approved operator"):
+        exercise_flows.exerciseOnBehalf(
+            obmx, entries, receive_underlying, 9500, 100, {"from": keeper}
+        )
+
+    for owner in owners:
+        exercise_flows.setOperator(keeper, obmx, True, 9500, 100, {"from": owner})
+    before = [output.balanceOf(payout) for payout in payouts]
+    tx = exercise_flows.exerciseOnBehalf(
+        obmx, entries, receive_underlying, 9500, 100, {"from": keeper}
+    )
+    print("Gas used:", tx.gas_used)
+
+    # everything exercised, and split pro rata
+    for owner in owners:
+        assert obmx.balanceOf(owner) == 0
+    profits = [
+        output.balanceOf(payout) - amount_before
+        for payout, amount_before in zip(payouts, before)
+    ]
+    print("Owner profits:", [profit / 1e18 for profit in profits])
+    assert profits[0] > 0
+    assert profits[1] == pytest.approx(profits[0] * 3, rel=1e-9)
+    assert output.balanceOf(keeper) == 0
+    assert output.balanceOf(exercise_flows) == 0
+
+    # revoking works too
+    obmx.transfer(owners[0], 100e18, {"from": obmx_whale})
+    exercise_flows.setOperator(keeper, obmx, False, 0, 0, {"from": owners[0]})
+    with brownie.reverts("Not an approved operator"):
+        exercise_flows.exerciseOnBehalf(
+            obmx, entries[:1], receive_underlying, 9500, 100, {"from": keeper}
+        )
+
+
+def test_hostile_operator(obmx, bmx, weth, exercise_flows, obmx_whale):
+    operator = accounts[3]
+    owner = accounts[1]
+    obmx.transfer(owner, 100e18, {"from": obmx_whale})
+    obmx.approve(exercise_flows, 2**256 - 1, {"from": owner})
+    exercise_flows.setOperator(operator, obmx, True, 9500, 100, {"from": owner})
+
+    # our approval only covers oBMX
+    with brownie.reverts("Not an approved operator"):
+        exercise_flows.exerciseOnBehalf(
+            bmx, [(owner, 100e18)], False, 9500, 100, {"from": operator}
+        )
+
+    # nor may our operator loosen slippage past our ceilings to sandwich us
+    with brownie.reverts("Slippage above owner's limit"):
+        exercise_flows.exerciseOnBehalf(
+            obmx, [(owner, 100e18)], False, 10_000, 100, {"from": operator}
+        )
+    with brownie.reverts("Slippage above owner's limit"):
+        exercise_flows.exerciseOnBehalf(
+            obmx, [(owner, 100e18)], False, 9500, 101, {"from": operator}
+        )
+
+    # pointing our payout address is only up to us, so our operator's call just sets
+    #  their own
+    exercise_flows.setPayoutAddress(operator, {"from": operator})
+    assert exercise_flows.payoutAddresses(owner) == brownie.ZERO_ADDRESS
+
+    # including themselves in a batch doesn't get them our proceeds either
+    obmx.transfer(operator, 1e18, {"from": obmx_whale})
+    obmx.approve(exercise_flows, 2**256 - 1, {"from": operator})
+    owner_before = weth.balanceOf(owner)
+    operator_before = weth.balanceOf(operator)
+    exercise_flows.exerciseOnBehalf(
+        obmx,
+        [(owner, 100e18), (operator, 1e18)],
+        False,
+        9500,
+        100,
+        {"from": operator},
+    )
+    owner_profit = weth.balanceOf(owner) - owner_before
+    operator_profit = weth.balanceOf(operator) - operator_before
+    assert owner_profit > 0
+    assert operator_profit == pytest.approx(owner_profit / 100, rel=1e-6)
+    assert weth.balanceOf(exercise_flows) == 0
@@ -0,0 +1,108 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from brownie import accounts
+
+# gas used by each case, regenerate with UPDATE_GAS_BASELINE=1 after an intended change
+BASELINE = Path(__file__).parent / "gas_baseline.json"
+
+# how much more gas than our baseline we allow before failing
+TOLERANCE = 0.01
+
+SIZES = [10, 100, 1_000, 10_000]
+PROFIT_SLIPPAGE = 500
+SWAP_SLIPPAGE = 50
+PERCENT_TO_LP = 1_000
+LP_DISCOUNT = 35
+
+CASES = [
+    "exercise_weth",
+    "exercise_underlying",
+    "exercise_to_lp",
+    "quote_exercise_profit",
+    "quote_exercise_to_underlying",
+    "quote_exercise_lp",
+]
+
+
+@pytest.fixture(scope="module")
+def gas_baseline():
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    yield baseline
+
+
+# our user holds plenty of oTokens, and our helper has already registered our oToken
+@pytest.fixture(scope="module")
+def benchmark_user(mocks, mock_exercise_helper):
+    user = accounts[1]
+    mocks.otoken.mint(user, 100 * sum(SIZES) * 10**18, {"from": user})
+    mocks.otoken.approve(mock_exercise_helper, 2**256 - 1, {"from": user})
+    mock_exercise_helper.exercise(
+        mocks.otoken, 10**18, False, PROFIT_SLIPPAGE, SWAP_SLIPPAGE, {"from": user}
+    )
+    yield user
+
+
+def _gas(case, helper, otoken, amount, user):
+    if case == "exercise_weth" or case == "exercise_underlying":
+        tx = helper.exercise(
+            otoken,
+            amount,
+            case == "exercise_underlying",
+            PROFIT_SLIPPAGE,
+            SWAP_SLIPPAGE,
+            {"from": user},
+        )
+        return tx.gas_used
+    if case == "exercise_to_lp":
+        tx = helper.exerciseToLp(
+            otoken,
+            amount,
+            PROFIT_SLIPPAGE,
+            SWAP_SLIPPAGE,
+            PERCENT_TO_LP,
+            LP_DISCOUNT,
+            {"from": user},
+        )
+        return tx.gas_used
+
+    # quotes are views, so estimate what a transaction calling them would use
+    if case == "quote_exercise_profit":
+        return helper.quoteExerciseProfit.estimate_gas(otoken, amount, PROFIT_SLIPPAGE)
+    if case == "quote_exercise_to_underlying":
+        return helper.quoteExerciseToUnderlying.estimate_gas(
+            otoken, amount, PROFIT_SLIPPAGE
+        )
+    return helper.quoteExerciseLp.estimate_gas(
+        otoken, amount, PROFIT_SLIPPAGE, PERCENT_TO_LP, LP_DISCOUNT
+    )
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("case", CASES)
+def test_gas_benchmark(
+    mocks, mock_exercise_helper, benchmark_user, gas_baseline, case, size
+):
+    name = f"{case} {size}"
+    gas = _gas(
+        case, mock_exercise_helper, mocks.otoken, size * 10**18, benchmark_user
+    )
+
+    # only ever write our baseline when asked to, never as a side effect of a run
+    if os.environ.get("UPDATE_GAS_BASELINE"):
+        gas_baseline[name] = gas
+        BASELINE.write_text(json.dumps(gas_baseline, indent=2, sort_keys=True) + "\n")
+        print(f"{name}: recorded {gas:,} gas")
+        return
+
+    baseline = gas_baseline.get(name)
+    if baseline is None:
+        pytest.fail(f"no baseline for {name}, record one with UPDATE_GAS_BASELINE=1")
+
+    change = (gas - baseline) / baseline
+    print(f"{name}: {gas:,} gas, {change:+.2%} vs baseline {baseline:,}")
+    if change < -TOLERANCE:
+        print("Gas improved, update our baseline with UPDATE_GAS_BASELINE=1")
+    assert change <= TOLERANCE, f"{name} used {gas:,} gas, {change:+.2%} vs baseline"
@@ -0,0 +1,114 @@
+import brownie
+from exercise_helper.gas import (
+    OVERHEAD,
+    checkpoints_from_tx,
+    folded_stacks,
+    format_table,
+    phase_gas,
+)
+
+
+def test_offline_phase_gas():
+    checkpoints = [
+        ("start", 1_000_000),
+        ("transfer", 990_000),
+        ("register", 985_000),
+        ("quote", 900_000),
+        ("borrow;loan", 880_000),
+        ("borrow;mint", 700_000),
+        ("borrow;exercise", 600_000),
+        ("borrow;sale", 500_000),
+        ("borrow;fee", 480_000),
+        ("borrow", 450_000),
+        ("sweep", 440_000),
+        ("payout", 430_000),
+    ]
+    phases = phase_gas(checkpoints, 600_000)
+    print(phases)
+    assert phases[0] == ("transfer", 10_000)
+    assert dict(phases)["borrow;mint"] == 180_000
+    assert dict(phases)["borrow"] == 30_000
+    assert phases[-1] == (OVERHEAD, 30_000)
+    assert sum(gas for _, gas in phases) == 600_000
+
+    # a batch repeats phases, which we sum
+    batch = phase_gas(checkpoints[3:9] + [("borrow;loan", 470_000)])
+    runs = {"weth 100 oBMX": phases, "batch": batch}
+    table = format_table(runs)
+    print(table)
+    lines = table.splitlines()
+    assert lines[0].split() == ["phase", "weth", "100", "oBMX", "batch"]
+    assert lines[-1].split() == ["total", "600,000", "430,000"]
+    assert "borrow;loan" in table and "30,000" in table
+
+    folded = folded_stacks(runs)
+    print(folded)
+    assert "weth 100 oBMX;borrow;mint 180000\n" in folded
+    assert "batch;borrow;loan 30000\n" in folded
+    assert "batch;borrow;fee" in folded
+
+
+def test_gas_tracing(obmx, bmx_exercise_helper, obmx_whale, screamsh):
+    to_exercise = 100e18
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+
+    # off by default
+    tx = bmx_exercise_helper.exercise(
+        obmx, to_exercise, False, 9500, 100, {"from": obmx_whale}
+    )
+    assert checkpoints_from_tx(tx) == []
+    untraced = tx.gas_used
+
+    bmx_exercise_helper.setGasTracing(True, {"from": screamsh})
+    tx = bmx_exercise_helper.exercise(
+        obmx, to_exercise, False, 9500, 100, {"from": obmx_whale}
+    )
+    phases = phase_gas(checkpoints_from_tx(tx), tx.gas_used)
+    print(format_table({"weth 100 oBMX": phases}))
+    assert [phase for phase, _ in phases] == [
+        "transfer",
+        "register",
+        "quote",
+        "borrow;loan",
+        "borrow;mint",
+        "borrow;exercise",
+        "borrow;sale",
+        "borrow;fee",
+        "borrow",
+        "sweep",
+        "payout",
+        OVERHEAD,
+    ]
+    assert sum(gas for _, gas in phases) == tx.gas_used
+    print("Tracing cost:", tx.gas_used - untraced)
+
+    # only our owner may toggle it
+    with brownie.reverts("Ownable: caller is not the owner"):
+        bmx_exercise_helper.setGasTracing(False, {"from": obmx_whale})
+    bmx_exercise_helper.setGasTracing(False, {"from": screamsh})
+    assert not bmx_exercise_helper.gasTracing()
+
+
+def test_gas_tracing_entry_points(obmx, exercise_flows, obmx_whale, screamsh):
+    obmx.approve(exercise_flows, 2**256 - 1, {"from": obmx_whale})
+    exercise_flows.setGasTracing(True, {"from": screamsh})
+
+    # every entry point starts its trace the same way, so phases line up across them
+    txs = {
+        "batch": exercise_flows.exerciseBatch(
+            [(obmx, 100e18, False, 9500, 100)], {"from": obmx_whale}
+        ),
+        "on behalf": exercise_flows.exerciseOnBehalf(
+            obmx, [(obmx_whale, 100e18)], False, 9500, 100, {"from": obmx_whale}
+        ),
+        "zap": exercise_flows.exerciseToLpZap(
+            obmx, 100e18, 9500, 100, 100, 35, {"from": obmx_whale}
+        ),
+    }
+    for name, tx in txs.items():
+        checkpoints = checkpoints_from_tx(tx)
+        phases = [phase for phase, _ in phase_gas(checkpoints, tx.gas_used)]
+        print(name, phases)
+        assert checkpoints[0][0] == "start"
+        assert "transfer" in phases and "borrow" in phases
+        assert phases[-2:] == ["payout", OVERHEAD]
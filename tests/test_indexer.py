@@ -0,0 +1,153 @@
+import json
+import time
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pytest
+from exercise_helper.chain import exercised_log_fetcher
+from exercise_helper.indexer import MODES, index_logs, load_store, summarize
+
+OTOKENS = [
+    "0x3Ff7AB26F2dfD482C40bDaDfC0e88D01BFf79713",
+    "0xe2E0B1A3F4e1a9E6fE21A0cD1C6F0A3E45B0a000",
+]
+
+
+def _write_fixture(path, count, seed=0):
+    # Exercised logs as returned by brownie/web3, spread over about a million blocks
+    rng = np.random.default_rng(seed)
+    blocks = np.sort(rng.integers(0, 1_000_000, count))
+    with open(path, "w") as f:
+        for i, block in enumerate(blocks.tolist()):
+            amount = int(rng.integers(1, 10_000)) * 10**18
+            weth_needed = amount // 3_000
+            log = {
+                "blockNumber": block,
+                "logIndex": i % 7,
+                "transactionHash": f"0x{i:064x}",
+                "args": {
+                    "oToken": OTOKENS[i % 2],
+                    "mode": int(rng.integers(0, len(MODES))),
+                    "amount": amount,
+                    "wethNeeded": weth_needed,
+                    "proceeds": weth_needed // 2,
+                    "fee": weth_needed // 400,
+                    "profitSlippage": int(rng.integers(0, 10**17)),
+                },
+            }
+            f.write(json.dumps(log) + "\n")
+
+
+class FixtureNode:
+    """Serves logs from our fixture by block range, like eth_getLogs."""
+
+    def __init__(self, path):
+        with open(path) as f:
+            self.logs = [json.loads(line) for line in f]
+        self.blocks = [log["blockNumber"] for log in self.logs]
+        self.calls = 0
+        self.fail_at = None
+
+    def fetch_logs(self, from_block, to_block):
+        self.calls += 1
+        if self.fail_at is not None and from_block >= self.fail_at:
+            raise ConnectionError("RPC went away")
+        start = bisect_left(self.blocks, from_block)
+        end = bisect_right(self.blocks, to_block)
+        return self.logs[start:end]
+
+
+def test_offline_indexer(tmp_path):
+    fixture = tmp_path / "logs.jsonl"
+    _write_fixture(fixture, 50_000)
+    node = FixtureNode(fixture)
+    store = tmp_path / "store"
+
+    # our RPC dies partway through, then we resume
+    node.fail_at = 400_000
+    with pytest.raises(ConnectionError):
+        index_logs(store, node.fetch_logs, 999_999, page_size=50_000)
+    partial = load_store(store)
+    assert partial["block"].max() < 400_000
+    assert len(partial["block"]) == np.searchsorted(node.blocks, 400_000)
+
+    node.fail_at = None
+    calls = node.calls
+    start = time.perf_counter()
+    indexed = index_logs(store, node.fetch_logs, 999_999, page_size=50_000)
+    assert indexed == 50_000 - len(partial["block"])
+    assert node.calls - calls == 12
+
+    # nothing new, nothing fetched
+    assert index_logs(store, node.fetch_logs, 999_999) == 0
+    assert node.calls - calls == 12
+
+    columns = load_store(store)
+    stats = summarize(columns)
+    print("Indexed and summarized in", round(time.perf_counter() - start, 2), "s")
+    for row in stats:
+        print(row.otoken, row.mode, row.exercises, row.fees / 1e18)
+
+    # every event exactly once, in order
+    assert len(columns["block"]) == 50_000
+    assert (np.diff(columns["block"]) >= 0).all()
+    assert len(set(columns["tx_hash"].tolist())) == 50_000
+
+    # and our analytics match the raw logs
+    assert {row.otoken for row in stats} == {otoken.lower() for otoken in OTOKENS}
+    assert sum(row.exercises for row in stats) == 50_000
+    fees = sum(log["args"]["fee"] for log in node.logs)
+    assert sum(row.fees for row in stats) == pytest.approx(fees, rel=1e-12)
+    for row in stats:
+        logs = [
+            log
+            for log in node.logs
+            if log["args"]["oToken"].lower() == row.otoken
+            and MODES[log["args"]["mode"]] == row.mode
+        ]
+        assert row.exercises == len(logs)
+        assert row.amount == pytest.approx(sum(log["args"]["amount"] for log in logs))
+
+
+def test_exercised_events(
+    obmx, weth, bmx_exercise_helper, obmx_whale, receive_underlying, tmp_path
+):
+    to_exercise = 100e18
+    fee_address = bmx_exercise_helper.feeAddress()
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    fees_before = weth.balanceOf(fee_address)
+    weth_before = weth.balanceOf(obmx_whale)
+    tx = bmx_exercise_helper.exercise(
+        obmx, to_exercise, receive_underlying, 9500, 100, {"from": obmx_whale}
+    )
+
+    event = tx.events["Exercised"]
+    print("Exercised:", dict(event))
+    assert event["oToken"] == obmx.address
+    assert event["mode"] == (1 if receive_underlying else 0)
+    assert event["amount"] == to_exercise
+    assert event["fee"] == weth.balanceOf(fee_address) - fees_before
+    assert event["fee"] > 0
+
+    # our event carries the same slippage we quoted just before
+    if receive_underlying:
+        quote = bmx_exercise_helper.quoteExerciseToUnderlying
+    else:
+        quote = bmx_exercise_helper.quoteExerciseProfit
+    quote = quote.call(obmx, to_exercise, 9500, block_identifier=tx.block_number - 1)
+    assert event["profitSlippage"] == quote["profitSlippage"]
+    if not receive_underlying:
+        # proceeds are before leftover wBLT is swept to WETH
+        assert weth.balanceOf(obmx_whale) - weth_before >= event["proceeds"]
+
+    # and index it straight from chain
+    store = tmp_path / "store"
+    index_logs(
+        store,
+        exercised_log_fetcher(bmx_exercise_helper),
+        tx.block_number,
+        start_block=tx.block_number,
+    )
+    columns = load_store(store)
+    assert len(columns["block"]) == 1
+    assert columns["fee"][0] == event["fee"]
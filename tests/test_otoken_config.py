@@ -0,0 +1,107 @@
+import brownie
+from brownie import ZERO_ADDRESS
+
+
+def test_otoken_config(
+    obmx, bmx, w_blt, weth, bmx_exercise_helper, obmx_whale, screamsh
+):
+    # nothing cached until someone exercises, but quotes still work
+    config = bmx_exercise_helper.oTokenConfigs(obmx)
+    assert config["underlying"] == ZERO_ADDRESS
+    assert not config["approved"]
+    quote_before = bmx_exercise_helper.quoteExerciseProfit(obmx, 100e18, 9500)
+
+    # first exercise fills our cache and does approvals
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    bmx_exercise_helper.exercise(obmx, 50e18, False, 9500, 100, {"from": obmx_whale})
+
+    config = bmx_exercise_helper.oTokenConfigs(obmx)
+    print("Cached config:", config.dict())
+    assert config["underlying"] == bmx.address
+    assert config["pair"] != ZERO_ADDRESS
+    assert config["pairFee"] > 0
+    assert config["approved"]
+    assert w_blt.allowance(bmx_exercise_helper, obmx) == 2**256 - 1
+    assert weth.allowance(bmx_exercise_helper, obmx) == 2**256 - 1
+
+    # second exercise uses our cached config
+    bmx_exercise_helper.exercise(obmx, 50e18, False, 9500, 100, {"from": obmx_whale})
+
+    # only owner can refresh
+    with brownie.reverts():
+        bmx_exercise_helper.refreshOTokenConfig(obmx, {"from": obmx_whale})
+    bmx_exercise_helper.refreshOTokenConfig(obmx, {"from": screamsh})
+    assert bmx_exercise_helper.oTokenConfigs(obmx) == config
+
+    # cached quotes match live lookups
+    brownie.chain.undo(3)
+    bmx_exercise_helper.refreshOTokenConfig(obmx, {"from": screamsh})
+    assert bmx_exercise_helper.quoteExerciseProfit(obmx, 100e18, 9500) == quote_before
+
+
+def test_pair_info(bmx, w_blt, bmx_exercise_helper, obmx_whale, screamsh):
+    path = [bmx.address, w_blt.address]
+    routes = [(bmx.address, w_blt.address, False)]
+    token0, token1 = sorted(path, key=lambda token: int(token, 16))
+
+    # not cached yet, so we look up our pair live
+    assert bmx_exercise_helper.pairInfo(token0, token1, False)["pair"] == ZERO_ADDRESS
+    live = bmx_exercise_helper.getAmountsIn(100e18, path)
+    assert bmx_exercise_helper.getAmountsInForRoutes(100e18, routes) == live
+
+    # only owner can cache, and cached values give the same result
+    with brownie.reverts():
+        bmx_exercise_helper.refreshPairInfo(bmx, w_blt, False, {"from": obmx_whale})
+    bmx_exercise_helper.refreshPairInfo(bmx, w_blt, False, {"from": screamsh})
+    info = bmx_exercise_helper.pairInfo(token0, token1, False)
+    print("Cached pair:", info.dict())
+    assert info["pair"] != ZERO_ADDRESS
+    assert info["fee"] > 0
+    assert bmx_exercise_helper.getAmountsIn(100e18, path) == live
+
+
+def test_dust_thresholds(obmx, w_blt, weth, bmx_exercise_helper, obmx_whale, screamsh):
+    max_uint80 = 2**80 - 1
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+
+    # by default our leftover wBLT is swapped to underlying
+    assert not bmx_exercise_helper.dustThresholds(obmx)["custom"]
+    wblt_before = w_blt.balanceOf(obmx_whale)
+    bmx_exercise_helper.exercise(obmx, 50e18, True, 9500, 100, {"from": obmx_whale})
+    default_wblt = w_blt.balanceOf(obmx_whale) - wblt_before
+
+    # only owner can set thresholds
+    with brownie.reverts():
+        bmx_exercise_helper.setDustThresholds(
+            obmx, True, 0, max_uint80, 0, {"from": obmx_whale}
+        )
+    bmx_exercise_helper.setDustThresholds(
+        obmx, True, 0, max_uint80, 0, {"from": screamsh}
+    )
+    thresholds = bmx_exercise_helper.dustThresholds(obmx)
+    print("Custom thresholds:", thresholds.dict())
+    assert thresholds["wBLT"] == max_uint80
+    assert bmx_exercise_helper.getDustThresholds(obmx, 50e18, 1e18, 1e18, 1e18) == (
+        0,
+        max_uint80,
+        0,
+    )
+
+    # now we never pay to swap our wBLT, so it comes back as is
+    wblt_before = w_blt.balanceOf(obmx_whale)
+    bmx_exercise_helper.exercise(obmx, 50e18, True, 9500, 100, {"from": obmx_whale})
+    custom_wblt = w_blt.balanceOf(obmx_whale) - wblt_before
+    print("wBLT returned, default:", default_wblt, "custom:", custom_wblt)
+    assert custom_wblt > default_wblt
+    assert w_blt.balanceOf(bmx_exercise_helper) == 0
+    assert weth.balanceOf(bmx_exercise_helper) == 0
+
+    # and we can go back to our gas-aware defaults
+    bmx_exercise_helper.setDustThresholds(obmx, False, 0, 0, 0, {"from": screamsh})
+    assert not bmx_exercise_helper.dustThresholds(obmx)["custom"]
+
+    # our defaults never go below our original fixed cutoffs
+    weth_min, wblt_min, underlying_min = bmx_exercise_helper.getDustThresholds(
+        obmx, 50e18, 1e18, 1e18, 1e18
+    )
+    assert weth_min >= 1e12 and wblt_min >= 1e15 and underlying_min >= 1e15
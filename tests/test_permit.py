@@ -0,0 +1,155 @@
+from brownie import accounts, chain
+from eth_account import Account
+from eth_account.messages import encode_structured_data
+from exercise_helper.state import cached_contract
+
+PERMIT2 = "0x000000000022D473030F116dDEE9F6B43aC78BA3"
+
+
+def _sign(owner, domain, primary_type, types, message):
+    types = {
+        "EIP712Domain": [
+            {"name": name, "type": kind}
+            for name, kind in [
+                ("name", "string"),
+                ("version", "string"),
+                ("chainId", "uint256"),
+                ("verifyingContract", "address"),
+            ]
+            if name in domain
+        ],
+        **types,
+    }
+    signed = Account.sign_message(
+        encode_structured_data(
+            {
+                "types": types,
+                "domain": domain,
+                "primaryType": primary_type,
+                "message": message,
+            }
+        ),
+        owner.private_key,
+    )
+    return signed.signature.hex()
+
+
+def sign_permit(owner, token, spender, amount, deadline):
+    # EIP-2612, packed r, s, v
+    domain = {
+        "name": token.name(),
+        "version": "1",
+        "chainId": chain.id,
+        "verifyingContract": token.address,
+    }
+    types = {
+        "Permit": [
+            {"name": "owner", "type": "address"},
+            {"name": "spender", "type": "address"},
+            {"name": "value", "type": "uint256"},
+            {"name": "nonce", "type": "uint256"},
+            {"name": "deadline", "type": "uint256"},
+        ]
+    }
+    message = {
+        "owner": owner.address,
+        "spender": spender.address,
+        "value": amount,
+        "nonce": token.nonces(owner),
+        "deadline": deadline,
+    }
+    return _sign(owner, domain, "Permit", types, message)
+
+
+def sign_permit2(owner, token, spender, amount, nonce, deadline):
+    domain = {"name": "Permit2", "chainId": chain.id, "verifyingContract": PERMIT2}
+    types = {
+        "PermitTransferFrom": [
+            {"name": "permitted", "type": "TokenPermissions"},
+            {"name": "spender", "type": "address"},
+            {"name": "nonce", "type": "uint256"},
+            {"name": "deadline", "type": "uint256"},
+        ],
+        "TokenPermissions": [
+            {"name": "token", "type": "address"},
+            {"name": "amount", "type": "uint256"},
+        ],
+    }
+    message = {
+        "permitted": {"token": token.address, "amount": amount},
+        "spender": spender.address,
+        "nonce": nonce,
+        "deadline": deadline,
+    }
+    return _sign(owner, domain, "PermitTransferFrom", types, message)
+
+
+def test_exercise_with_permit(obmx, weth, gauge, bmx_exercise_helper, obmx_whale):
+    to_exercise = 100e18
+    owner = accounts.add()
+    obmx.transfer(owner, to_exercise * 3, {"from": obmx_whale})
+    obmx_whale.transfer(owner, 1e18)
+    deadline = chain.time() + 3600
+
+    # exercise in one transaction, no approve needed
+    signature = sign_permit(owner, obmx, bmx_exercise_helper, to_exercise, deadline)
+    tx = bmx_exercise_helper.exerciseWithPermit(
+        obmx,
+        to_exercise,
+        False,
+        9500,
+        100,
+        (False, 0, deadline, signature),
+        {"from": owner},
+    )
+    print("Exercise with permit gas:", tx.gas_used)
+    assert obmx.balanceOf(owner) == to_exercise * 2
+    assert weth.balanceOf(owner) > 0
+    assert obmx.allowance(owner, bmx_exercise_helper) == 0
+
+    # a permit someone else already submitted doesn't block us
+    signature = sign_permit(owner, obmx, bmx_exercise_helper, to_exercise, deadline)
+    v, r, s = int(signature[-2:], 16), signature[:66], "0x" + signature[66:130]
+    obmx.permit(
+        owner, bmx_exercise_helper, to_exercise, deadline, v, r, s, {"from": obmx_whale}
+    )
+    lp_before = gauge.balanceOf(owner)
+    bmx_exercise_helper.exerciseToLpWithPermit(
+        obmx,
+        to_exercise,
+        9500,
+        100,
+        100,
+        35,
+        (False, 0, deadline, signature),
+        {"from": owner},
+    )
+    assert obmx.balanceOf(owner) == to_exercise
+    assert gauge.balanceOf(owner) > lp_before
+
+
+def test_exercise_with_permit2(obmx, weth, bmx_exercise_helper, obmx_whale):
+    to_exercise = 100e18
+    owner = accounts.add()
+    obmx.transfer(owner, to_exercise, {"from": obmx_whale})
+    obmx_whale.transfer(owner, 1e18)
+    deadline = chain.time() + 3600
+
+    # one-time approval of Permit2, shared with every other app using it
+    obmx.approve(PERMIT2, 2**256 - 1, {"from": owner})
+    signature = sign_permit2(owner, obmx, bmx_exercise_helper, to_exercise, 0, deadline)
+    bmx_exercise_helper.exerciseWithPermit(
+        obmx,
+        to_exercise,
+        False,
+        9500,
+        100,
+        (True, 0, deadline, signature),
+        {"from": owner},
+    )
+    assert obmx.balanceOf(owner) == 0
+    assert weth.balanceOf(owner) > 0
+    assert obmx.balanceOf(bmx_exercise_helper) == 0
+
+    # each Permit2 nonce only works once
+    assert cached_contract(PERMIT2).nonceBitmap(owner, 0) & 1
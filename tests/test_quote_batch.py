@@ -0,0 +1,68 @@
+# quote modes, same order as wBLTExerciseQuoter.QuoteMode
+WETH, UNDERLYING, LP = 0, 1, 2
+
+
+def test_quote_batch(exercise_quoter, bmx_exercise_helper, obmx):
+    profit_slippage = 9500
+    percent_to_lp = 100
+    discount = 35
+
+    requests = []
+    for to_exercise in [10e18, 100e18, 1_000e18]:
+        requests.append((obmx, to_exercise, WETH, profit_slippage, 0, 0))
+        requests.append((obmx, to_exercise, UNDERLYING, profit_slippage, 0, 0))
+        requests.append(
+            (obmx, to_exercise, LP, profit_slippage, percent_to_lp, discount)
+        )
+
+    # these would revert on their own, but shouldn't break the batch
+    requests.append((obmx, 0, WETH, profit_slippage, 0, 0))
+    requests.append((obmx, 1_000e18, LP, profit_slippage, 2500, discount))
+
+    results = exercise_quoter.quoteBatch(requests)
+    assert len(results) == len(requests)
+
+    for request, result in zip(requests, results):
+        otoken, amount, mode, slippage, percent, lp_discount = request
+        print(amount / 1e18, mode, result)
+        if amount == 0 or percent == 2500:
+            assert not result["success"]
+            continue
+
+        if mode == WETH:
+            expected = bmx_exercise_helper.quoteExerciseProfit(otoken, amount, slippage)
+        elif mode == UNDERLYING:
+            expected = bmx_exercise_helper.quoteExerciseToUnderlying(
+                otoken, amount, slippage
+            )
+        else:
+            expected = bmx_exercise_helper.quoteExerciseLp(
+                otoken, amount, slippage, percent, lp_discount
+            )
+        assert result["success"]
+        for key, value in expected.dict().items():
+            assert result[key] == value
+
+
+def test_quote_all(bmx_exercise_helper, obmx):
+    profit_slippage = 9500
+    percent_to_lp = 100
+    discount = 35
+
+    for to_exercise in [10e18, 100e18, 1_000e18]:
+        weth_quote, underlying_quote, lp_quote = bmx_exercise_helper.quoteAll(
+            obmx, to_exercise, profit_slippage, percent_to_lp, discount
+        )
+        print("WETH:", weth_quote, "\nUnderlying:", underlying_quote)
+        print("LP:", lp_quote)
+
+        # should match our single quotes exactly
+        assert weth_quote == bmx_exercise_helper.quoteExerciseProfit(
+            obmx, to_exercise, profit_slippage
+        )
+        assert underlying_quote == bmx_exercise_helper.quoteExerciseToUnderlying(
+            obmx, to_exercise, profit_slippage
+        )
+        assert lp_quote == bmx_exercise_helper.quoteExerciseLp(
+            obmx, to_exercise, profit_slippage, percent_to_lp, discount
+        )
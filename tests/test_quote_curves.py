@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from exercise_helper import (
+    Revert,
+    quote_exercise_lp,
+    quote_exercise_profit,
+    quote_exercise_to_underlying,
+)
+from exercise_helper.vectorized import (
+    exercise_lp_curve,
+    exercise_profit_curve,
+    exercise_to_underlying_curve,
+)
+
+
+def _exact_or_none(quote, *args):
+    try:
+        return quote(*args)
+    except Revert:
+        return None
+
+
+def test_exercise_curves_match_quotes(offline_snapshot):
+    amounts = [
+        1,
+        10**15,
+        10**18,
+        100 * 10**18,
+        5_000 * 10**18,
+        200_000 * 10**18,
+    ]
+    profit_slippage = 500
+
+    for curve, quote in [
+        (exercise_profit_curve, quote_exercise_profit),
+        (exercise_to_underlying_curve, quote_exercise_to_underlying),
+    ]:
+        result = curve(offline_snapshot, amounts, profit_slippage)
+        for i, amount in enumerate(amounts):
+            exact = _exact_or_none(quote, offline_snapshot, amount, profit_slippage)
+            assert result.valid[i] == (exact is not None)
+            if exact is None:
+                continue
+            assert result.weth_needed[i] == pytest.approx(exact.weth_needed, rel=1e-9)
+            assert result.real_profit[i] == pytest.approx(exact.real_profit, rel=1e-9)
+            assert result.expected_profit[i] == pytest.approx(
+                exact.expected_profit, rel=1e-9
+            )
+            assert result.within_slippage_tolerance[i] == (
+                exact.within_slippage_tolerance
+            )
+
+
+def test_exercise_lp_curve_matches_quote(offline_snapshot):
+    to_exercise = 1_000 * 10**18
+    discount = 35
+    percents = np.arange(0, 3_000, 50)
+
+    result = exercise_lp_curve(offline_snapshot, to_exercise, percents, discount)
+    assert result.valid.any() and not result.valid.all()
+
+    for i, percent_to_lp in enumerate(percents):
+        exact = _exact_or_none(
+            quote_exercise_lp,
+            offline_snapshot,
+            to_exercise,
+            0,
+            int(percent_to_lp),
+            discount,
+        )
+        assert result.valid[i] == (exact is not None)
+        if exact is None:
+            continue
+        assert result.lp_amount_out[i] == pytest.approx(exact.lp_amount_out, rel=1e-9)
+        assert result.wblt_out[i] == pytest.approx(exact.wblt_out, rel=1e-6, abs=1e6)
+
+
+def test_exercise_curve_sweep(offline_snapshot):
+    # 100k points should be quick
+    amounts = np.linspace(1e18, 50_000e18, 100_000)
+    result = exercise_profit_curve(offline_snapshot, amounts)
+    assert result.real_profit.shape == amounts.shape
+    best = np.argmax(np.where(result.valid, result.real_profit, -np.inf))
+    print("Most profitable amount:", amounts[best] / 1e18)
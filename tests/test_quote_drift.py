@@ -0,0 +1,212 @@
+import os
+from math import ceil
+from pathlib import Path
+
+import pytest
+from brownie import accounts, chain
+from brownie.exceptions import VirtualMachineError
+
+from exercise_helper.drift import (
+    QUOTES,
+    DriftResult,
+    case_snapshot,
+    format_summary,
+    random_cases,
+    read_results,
+    summarize,
+    write_results,
+)
+from exercise_helper.mocks import apply_snapshot
+
+# total cases. 128 keeps our regular test run quick, the full sweep sets DRIFT_CASES=50000
+#  and spreads our batches with -n auto, weekly in .github/workflows/drift.yaml
+CASES = int(os.environ.get("DRIFT_CASES", 128))
+BATCH_SIZE = 32
+SEED = int(os.environ.get("DRIFT_SEED", 0))
+RESULTS = Path(os.environ.get("DRIFT_RESULTS", "reports/drift"))
+
+# allow any slippage, we're measuring how far off our quotes are, not enforcing them
+PROFIT_SLIPPAGE = 10_000
+SWAP_SLIPPAGE = 10_000
+
+# how far our quotes may overestimate what we execute, out of 10,000. on our mocks, BLT
+#  rates and the oToken's TWAP don't move within a transaction, so the WETH and
+#  underlying quotes price the exact swaps we execute, and quoteExerciseLpStateful()
+#  carries reserves through them the same way. what's left is wei-level rounding, plus
+#  for LP our dust cutoffs, which move reserves of at least 50,000e18 by under 1e18.
+#  both are far below 1 bp, and slippage_bps rounds any overestimate up to at least 1,
+#  so 1 is our tightest bound. more means a quote no longer mirrors its execution. the
+#  spread between BLT mint and redeem rates only ever pays out more than we quote, so
+#  it doesn't count here. quoteExerciseLp() ignores the price impact of its own swaps,
+#  so it isn't held to a bound, that's what quoteExerciseLpStateful() is for
+MAX_DRIFT_BPS = {"weth": 1, "underlying": 1, "lp_stateful": 1}
+
+
+def test_offline_drift_summary(offline_snapshot, tmp_path):
+    cases = random_cases(offline_snapshot, 100, seed=(1, 2), first_case=100)
+    assert cases == random_cases(offline_snapshot, 100, seed=(1, 2), first_case=100)
+    assert [case.case for case in cases] == list(range(100, 200))
+    for case in cases:
+        assert 0 <= case.percent_to_lp <= 2_000
+        assert 25 <= case.discount <= 75
+        snapshot = case_snapshot(offline_snapshot, case)
+        assert snapshot.pair.reserve_underlying == case.reserve_underlying
+        assert snapshot.pair.fee == offline_snapshot.pair.fee
+        assert snapshot.blt == offline_snapshot.blt
+
+    results = [
+        DriftResult(0, "lp", 1_000, 990),
+        DriftResult(1, "lp", 1_000, 1_010),
+        DriftResult(2, "lp", None, None, "quote: Cost exceeds profit"),
+        DriftResult(3, "lp", 1_000, None, "execution: Not enough WETH out"),
+        DriftResult(0, "weth", 1_000, 1_000),
+    ]
+    path = tmp_path / "drift" / "results.jsonl"
+    write_results(path, results)
+    assert list(read_results(path.parent)) == results
+
+    weth, lp = summarize(results)
+    print(format_summary([weth, lp]))
+    assert (weth.quote, weth.max, weth.slippage_bps) == ("weth", 0, 0)
+    assert (lp.cases, lp.quote_reverts, lp.execution_reverts) == (4, 1, 1)
+    assert lp.max == pytest.approx(0.01) and lp.min == pytest.approx(-0.01)
+    assert lp.slippage_bps == 100
+    assert lp.histogram.sum() == 2
+
+
+# our user holds plenty of oTokens, and our helper has already registered our oToken
+@pytest.fixture(scope="module")
+def drift_user(mocks, mock_exercise_helper):
+    user = accounts[1]
+    mocks.otoken.mint(user, 2**128, {"from": user})
+    mocks.otoken.approve(mock_exercise_helper, 2**256 - 1, {"from": user})
+    mock_exercise_helper.exercise(
+        mocks.otoken, 10**18, False, PROFIT_SLIPPAGE, SWAP_SLIPPAGE, {"from": user}
+    )
+    yield user
+
+
+def _quote(quote):
+    try:
+        return quote(), ""
+    except VirtualMachineError as e:
+        return None, f"quote: {e.revert_msg}"
+
+
+def _execute(token, user, execute):
+    # every execution starts from our case's snapshot
+    before = token.balanceOf(user)
+    try:
+        execute()
+        return token.balanceOf(user) - before, ""
+    except VirtualMachineError as e:
+        return None, f"execution: {e.revert_msg}"
+    finally:
+        chain.revert()
+
+
+def _run_case(mocks, helper, quoter, user, case):
+    otoken, amount = mocks.otoken, case.amount
+    lp_args = (otoken, amount, PROFIT_SLIPPAGE, case.percent_to_lp, case.lp_discount)
+    runs = [
+        (
+            mocks.weth,
+            {
+                "weth": lambda: helper.quoteExerciseProfit(
+                    otoken, amount, PROFIT_SLIPPAGE
+                )["realProfit"]
+            },
+            lambda: helper.exercise(
+                otoken, amount, False, PROFIT_SLIPPAGE, SWAP_SLIPPAGE, {"from": user}
+            ),
+        ),
+        (
+            mocks.underlying,
+            {
+                "underlying": lambda: helper.quoteExerciseToUnderlying(
+                    otoken, amount, PROFIT_SLIPPAGE
+                )["realProfit"]
+            },
+            lambda: helper.exercise(
+                otoken, amount, True, PROFIT_SLIPPAGE, SWAP_SLIPPAGE, {"from": user}
+            ),
+        ),
+        (
+            mocks.pair,
+            {
+                "lp": lambda: helper.quoteExerciseLp(*lp_args)["lpAmountOut"],
+                "lp_stateful": lambda: quoter.quoteExerciseLpStateful(*lp_args)[
+                    "lpAmountOut"
+                ],
+            },
+            lambda: helper.exerciseToLp(
+                otoken,
+                amount,
+                PROFIT_SLIPPAGE,
+                SWAP_SLIPPAGE,
+                case.percent_to_lp,
+                case.lp_discount,
+                {"from": user},
+            ),
+        ),
+    ]
+
+    results = []
+    for token, quotes, execute in runs:
+        quoted = {name: _quote(quote) for name, quote in quotes.items()}
+
+        # still execute if only one of our LP quotes reverted
+        executed, error = None, ""
+        if any(value is not None for value, _ in quoted.values()):
+            executed, error = _execute(token, user, execute)
+        for name, (value, quote_error) in quoted.items():
+            results.append(
+                DriftResult(
+                    case.case,
+                    name,
+                    value,
+                    None if value is None else executed,
+                    quote_error or error,
+                )
+            )
+    return results
+
+
+@pytest.mark.parametrize("batch", range(ceil(CASES / BATCH_SIZE)))
+def test_quote_drift(
+    mocks,
+    mock_exercise_helper,
+    mock_exercise_quoter,
+    mock_snapshot,
+    drift_user,
+    batch,
+):
+    first_case = batch * BATCH_SIZE
+    cases = random_cases(
+        mock_snapshot,
+        min(BATCH_SIZE, CASES - first_case),
+        seed=(SEED, batch),
+        first_case=first_case,
+    )
+
+    # apply_snapshot only sends what changed, so we move from case to case instead
+    #  of resetting to a common state in between
+    results = []
+    for case in cases:
+        apply_snapshot(mocks, case_snapshot(mock_snapshot, case), accounts[0])
+        chain.snapshot()
+        results += _run_case(
+            mocks, mock_exercise_helper, mock_exercise_quoter, drift_user, case
+        )
+
+    # one file per batch, so parallel workers never write to the same file
+    write_results(RESULTS / f"seed-{SEED}-batch-{batch:05d}.jsonl", results)
+    summaries = summarize(results)
+    print(format_summary(summaries))
+    assert len(results) == len(cases) * len(QUOTES)
+
+    # with no slippage limits, anything these quote must execute, and close to quoted
+    for summary in summaries:
+        if summary.quote in MAX_DRIFT_BPS:
+            assert summary.execution_reverts == 0, summary.quote
+            assert summary.slippage_bps <= MAX_DRIFT_BPS[summary.quote], summary.quote
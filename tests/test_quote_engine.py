@@ -0,0 +1,148 @@
+from dataclasses import replace
+
+import pytest
+from exercise_helper import (
+    Hop,
+    Revert,
+    get_amount_in,
+    get_amount_out,
+    get_amounts_in,
+    get_stable_amount_out,
+    quote_all,
+    quote_exercise_lp,
+    quote_exercise_profit,
+    quote_exercise_to_underlying,
+)
+
+# these tests run purely offline against our offline_snapshot fixture
+
+
+def test_offline_quotes(offline_snapshot):
+    to_exercise = 1_000 * 10**18
+    profit_slippage = 9500  # in BPS
+
+    result = quote_exercise_profit(offline_snapshot, to_exercise, profit_slippage)
+    print("WETH quote", result._asdict())
+    assert result.within_slippage_tolerance
+    assert 0 < result.real_profit < result.expected_profit * 10_000 // 500
+
+    result = quote_exercise_to_underlying(offline_snapshot, to_exercise, 0)
+    print("Underlying quote", result._asdict())
+    assert 0 < result.real_profit < to_exercise
+    assert 0 < result.profit_slippage < 1e18
+
+    assert not result.within_slippage_tolerance
+
+    # loosen our slippage and we should be fine
+    result = quote_exercise_to_underlying(
+        offline_snapshot, to_exercise, profit_slippage
+    )
+    assert result.within_slippage_tolerance
+
+    output = quote_exercise_lp(offline_snapshot, to_exercise, profit_slippage, 100, 35)
+    print("LP quote", output._asdict())
+    assert output.lp_amount_out > 0
+    assert output.wblt_out > 0
+
+    # quote_all bundles all three
+    assert quote_all(offline_snapshot, to_exercise, profit_slippage, 100, 35) == (
+        quote_exercise_profit(offline_snapshot, to_exercise, profit_slippage),
+        result,
+        output,
+    )
+
+
+def test_offline_get_amounts_in(offline_snapshot):
+    pair = offline_snapshot.pair
+    hop = (pair.reserve_underlying, pair.reserve_wblt, pair.fee)
+
+    # swapping the quoted amount in must give us at least what we asked for
+    for wblt_needed in [10**12, 10**18, 500 * 10**18, 50_000 * 10**18]:
+        amount_in = get_amounts_in(wblt_needed, [hop])[0]
+        assert get_amount_out(amount_in, *hop) >= wblt_needed
+        assert amount_in == get_amount_in(wblt_needed, *hop)
+
+    # chained hops work backwards from the end of the path
+    back_hop = (pair.reserve_wblt, pair.reserve_underlying, pair.fee)
+    amounts = get_amounts_in(10**18, [hop, back_hop])
+    assert amounts[1] == get_amount_in(10**18, *back_hop)
+    assert amounts[0] == get_amount_in(amounts[1], *hop)
+
+
+def test_offline_stable_amounts_in():
+    # USDC (6 decimals) -> DAI (18 decimals) stable pair, 0.05% fee
+    hop = Hop(2_000_000 * 10**6, 1_900_000 * 10**18, 5, True, 10**6, 10**18)
+    for dai_needed in [10**12, 10**18, 10_000 * 10**18, 1_000_000 * 10**18]:
+        amount_in = get_amounts_in(dai_needed, [hop])[0]
+        assert get_stable_amount_out(amount_in, *hop[:3], *hop[4:]) >= dai_needed
+
+        # and we shouldn't overshoot by more than rounding
+        assert get_stable_amount_out(amount_in - 3, *hop[:3], *hop[4:]) < dai_needed
+
+    # stable pairs are much flatter than volatile ones near peg
+    reserves = (2_000_000 * 10**18, 1_900_000 * 10**18, 5)
+    volatile = get_amounts_in(10_000 * 10**18, [reserves])
+    stable = get_amounts_in(10_000 * 10**18, [Hop(*reserves, True)])
+    assert 10_000 * 10**18 < stable[0] < volatile[0]
+
+
+def test_offline_quote_reverts(offline_snapshot):
+    to_exercise = 1_000 * 10**18
+
+    with pytest.raises(Revert, match="Can't exercise zero"):
+        quote_exercise_profit(offline_snapshot, 0, 0)
+
+    with pytest.raises(Revert, match="Slippage must be less than 10,000"):
+        quote_exercise_to_underlying(offline_snapshot, to_exercise, 10_001)
+
+    with pytest.raises(Revert, match="Percent must be < 10,000"):
+        quote_exercise_lp(offline_snapshot, to_exercise, 0, 10_001, 35)
+
+    with pytest.raises(Revert, match="Need more wBLT"):
+        quote_exercise_lp(offline_snapshot, to_exercise, 0, 2500, 35)
+
+    with pytest.raises(Revert, match="getAmountsIn: Path length must be >1"):
+        get_amounts_in(10**18, [])
+
+    with pytest.raises(Revert, match="_getAmountIn: _amountOut must be >0"):
+        get_amount_in(0, 10**18, 10**18, 20)
+
+    # dump the price to make it unprofitable to exercise
+    pair = offline_snapshot.pair
+    dumped = replace(
+        offline_snapshot,
+        pair=replace(pair, reserve_underlying=pair.reserve_underlying * 5),
+    )
+    with pytest.raises(Revert, match="Cost exceeds profit"):
+        quote_exercise_profit(dumped, to_exercise, 0)
+
+    with pytest.raises(Revert, match="Cost exceeds profit"):
+        quote_exercise_to_underlying(dumped, to_exercise, 0)
+
+
+# compare against our deployed helper on a fork. anything routed through BLT minting or
+#  redeeming is linearized offline, so allow a tiny bit of rounding on those values.
+def test_offline_quotes_match_helper(bmx_exercise_helper, obmx, bmx, w_blt):
+    from exercise_helper.chain import load_snapshot
+
+    snapshot = load_snapshot(bmx_exercise_helper, obmx)
+    pair = snapshot.pair
+
+    for wblt_needed in [1e18, 100e18, 1_000e18]:
+        amounts = bmx_exercise_helper.getAmountsIn(wblt_needed, [bmx, w_blt])
+        assert amounts[0] == get_amount_in(
+            int(wblt_needed), pair.reserve_underlying, pair.reserve_wblt, pair.fee
+        )
+
+    for to_exercise in [10e18, 100e18, 1_000e18]:
+        on_chain = bmx_exercise_helper.quoteExerciseProfit(obmx, to_exercise, 0)
+        offline = quote_exercise_profit(snapshot, int(to_exercise), 0)
+        print("WETH", on_chain.dict(), offline._asdict())
+        assert offline.weth_needed == pytest.approx(on_chain["wethNeeded"], rel=1e-9)
+        assert offline.real_profit == pytest.approx(on_chain["realProfit"], rel=1e-9)
+
+        on_chain = bmx_exercise_helper.quoteExerciseToUnderlying(obmx, to_exercise, 0)
+        offline = quote_exercise_to_underlying(snapshot, int(to_exercise), 0)
+        print("Underlying", on_chain.dict(), offline._asdict())
+        assert offline.real_profit == pytest.approx(on_chain["realProfit"], rel=1e-9)
+        assert offline.expected_profit == on_chain["expectedProfit"]
@@ -0,0 +1,98 @@
+import json
+import time
+from dataclasses import replace
+
+import pytest
+from exercise_helper import Revert, quote_exercise_profit, quote_exercise_to_underlying
+from exercise_helper.server import ChainEvent, QuoteServer, read_events
+
+OTOKEN = "0x3Ff7AB26F2dfD482C40bDaDfC0e88D01BFf79713"
+PAIR = "0xa7D6d1d9B3BA2a4E3e2a4F2b0E3B1B4Ec2A10B6c"
+OTHER_PAIR = "0x9C7B7A9fA0fD7c0E4dA8b8A57C9D4d8A9c1F6B2e"
+
+
+def _check_quotes(server, snapshot):
+    for amount in [
+        10**17,
+        3 * 10**18,
+        100 * 10**18,
+        1_234 * 10**18,
+        9_999 * 10**18,
+    ]:
+        for cached, exact in [
+            (server.quote_exercise_profit, quote_exercise_profit),
+            (server.quote_exercise_to_underlying, quote_exercise_to_underlying),
+        ]:
+            quote = cached(OTOKEN, amount, 500)
+            expected = exact(snapshot, amount, 500)
+            assert quote.within_slippage_tolerance == expected.within_slippage_tolerance
+            # what we pay is never interpolated
+            assert quote.weth_needed == expected.weth_needed
+            assert quote.real_profit == pytest.approx(expected.real_profit, rel=1e-3)
+            assert quote.profit_slippage == pytest.approx(
+                expected.profit_slippage, abs=10**15
+            )
+
+
+def test_offline_quote_server(offline_snapshot, tmp_path):
+    server = QuoteServer()
+    # our pair has wBLT as token0
+    server.track(OTOKEN, PAIR, False, offline_snapshot)
+    _check_quotes(server, offline_snapshot)
+    assert server.builds == 1
+
+    # off our grid or reverting, we get the exact answer
+    with pytest.raises(Revert, match="Can't exercise zero"):
+        server.quote_exercise_profit(OTOKEN, 0, 500)
+    with pytest.raises(Revert, match="Slippage must be less than 10,000"):
+        server.quote_exercise_profit(OTOKEN, 10**18, 10_001)
+    assert server.quote_exercise_profit(OTOKEN, 10**25, 500) == quote_exercise_profit(
+        offline_snapshot, 10**25, 500
+    )
+
+    start = time.perf_counter()
+    for amount in range(10**18, 10**22, 10**18):
+        server.quote_exercise_profit(OTOKEN, amount, 500)
+    print("10k cached queries:", round(time.perf_counter() - start, 3), "seconds")
+    assert server.builds == 1
+
+    # a recorded event stream, nothing here touches our oToken until block 12
+    reserve_underlying = offline_snapshot.pair.reserve_underlying
+    reserve_wblt = offline_snapshot.pair.reserve_wblt
+    events = [
+        ChainEvent(10, OTHER_PAIR, "Sync", {"reserve0": 1, "reserve1": 2}),
+        ChainEvent(11, OTOKEN, "Transfer", {"value": 10**18}),
+        ChainEvent(12, PAIR, "Sync", {"reserve0": 1, "reserve1": 2}),
+        ChainEvent(
+            12,
+            PAIR,
+            "Sync",
+            {"reserve0": reserve_wblt * 99 // 100, "reserve1": reserve_underlying},
+        ),
+        ChainEvent(13, OTHER_PAIR, "Sync", {"reserve0": 3, "reserve1": 4}),
+        ChainEvent(14, OTOKEN, "SetDiscount", {"discount": 50}),
+    ]
+    path = tmp_path / "events.jsonl"
+    path.write_text("\n".join(json.dumps(event._asdict()) for event in events))
+
+    server.replay(read_events(path))
+    # one rebuild for both of block 12's syncs, and our discount change is pending
+    assert server.builds == 2
+    snapshot = replace(
+        offline_snapshot,
+        pair=replace(offline_snapshot.pair, reserve_wblt=reserve_wblt * 99 // 100),
+        otoken=replace(offline_snapshot.otoken, discount=50),
+    )
+    assert server.snapshot(OTOKEN) == snapshot
+    _check_quotes(server, snapshot)
+    assert server.builds == 3
+
+    # BLT rates only matter if they changed
+    server.update_blt(snapshot.blt)
+    server.on_block(15)
+    assert server.builds == 3
+    blt = replace(snapshot.blt, mint_price=snapshot.blt.mint_price * 101 // 100)
+    server.update_blt(blt)
+    server.on_block(16)
+    assert server.builds == 4
+    _check_quotes(server, replace(snapshot, blt=blt))
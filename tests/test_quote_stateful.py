@@ -0,0 +1,98 @@
+from dataclasses import replace
+
+import pytest
+from brownie import accounts
+from exercise_helper import quote_exercise_lp, simulate_exercise_lp
+
+
+def test_offline_simulate_exercise_lp(offline_snapshot):
+    discount = 35
+
+    # our fixture's rounded redeem rates lose a little WETH on the way back, which
+    #  would trip our repayment check. make them consistent.
+    blt = offline_snapshot.blt
+    offline_snapshot = replace(
+        offline_snapshot,
+        blt=replace(blt, weth_per_wblt=10**36 // blt.redeem_price + 1),
+    )
+    percent_to_lp = 100
+
+    # our stateless quote overestimates more as size increases
+    last_gap = 0
+    for to_exercise in [500 * 10**18, 1_500 * 10**18, 3_000 * 10**18]:
+        quote = quote_exercise_lp(
+            offline_snapshot, to_exercise, 0, percent_to_lp, discount
+        )
+        result = simulate_exercise_lp(
+            offline_snapshot, to_exercise, 0, percent_to_lp, discount
+        )
+        print(to_exercise / 1e18, "oBMX:", quote._asdict(), result._asdict())
+        assert 0 < result.lp_amount_out
+        assert result.profit_slippage == quote.profit_slippage
+
+        # selling underlying first lowers its price, so we pair at a worse ratio
+        assert result.lp_amount_out < quote.lp_amount_out
+        gap = 1 - result.lp_amount_out / quote.lp_amount_out
+        assert gap > last_gap
+        last_gap = gap
+
+
+def test_quote_exercise_lp_stateful(
+    obmx, w_blt, gauge, bmx_exercise_helper, exercise_quoter, obmx_whale
+):
+    to_exercise = 1_500e18
+    profit_slippage = 9500
+    swap_slippage = 100
+    percent_to_lp = 100
+    discount = 35
+
+    quote = bmx_exercise_helper.quoteExerciseLp(
+        obmx, to_exercise, profit_slippage, percent_to_lp, discount
+    )
+    simulated = exercise_quoter.quoteExerciseLpStateful(
+        obmx, to_exercise, profit_slippage, percent_to_lp, discount
+    )
+    print("Stateless:", quote.dict())
+    print("Stateful:", simulated.dict())
+
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    lp_before = gauge.balanceOf(obmx_whale)
+    wblt_before = w_blt.balanceOf(obmx_whale)
+    bmx_exercise_helper.exerciseToLp(
+        obmx,
+        to_exercise,
+        profit_slippage,
+        swap_slippage,
+        percent_to_lp,
+        discount,
+        {"from": obmx_whale},
+    )
+    lp_received = gauge.balanceOf(obmx_whale) - lp_before
+    wblt_received = w_blt.balanceOf(obmx_whale) - wblt_before
+    print("LP received:", lp_received, "wBLT received:", wblt_received)
+
+    # our stateful quote should land much closer to what we actually get
+    stateful_error = abs(simulated["lpAmountOut"] - lp_received)
+    assert stateful_error < abs(quote["lpAmountOut"] - lp_received)
+    assert stateful_error <= lp_received // 10_000
+    assert simulated["wBLTOut"] == pytest.approx(wblt_received, rel=1e-3)
+
+
+def test_stateful_quote_uses_cached_fee(
+    mocks, mock_exercise_helper, mock_exercise_quoter
+):
+    user = accounts[1]
+    lp_args = (mocks.otoken, 10**18, 10_000, 100, 35)
+    mocks.otoken.mint(user, 2 * 10**18, {"from": user})
+    mocks.otoken.approve(mock_exercise_helper, 2**256 - 1, {"from": user})
+    mock_exercise_helper.exercise(
+        mocks.otoken, 10**18, False, 10_000, 10_000, {"from": user}
+    )
+    config = mock_exercise_helper.getOTokenConfig(mocks.otoken)
+    assert config == mock_exercise_helper.oTokenConfigs(mocks.otoken)
+    quote = mock_exercise_quoter.quoteExerciseLpStateful(*lp_args)
+
+    # our helper keeps exercising with its cached fee until refreshed, so we quote
+    #  with it too
+    mocks.factory.setFee(mocks.pair, config["pairFee"] * 2, {"from": accounts[0]})
+    assert mock_exercise_quoter.quoteExerciseLpStateful(*lp_args) == quote
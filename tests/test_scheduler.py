@@ -0,0 +1,151 @@
+from dataclasses import replace
+
+import pytest
+from exercise_helper import Revert, get_amount_out, quote_exercise_profit
+from exercise_helper.chain import ChainNode
+from exercise_helper.scheduler import plan_chunks, run_schedule
+from exercise_helper.snapshot import MAX_BPS
+
+
+class LocalNode:
+    """
+    Stand-in for a local node. Exercising sells underlying into the pair, and each
+    block arbitrage closes recovery_bps of the gap back to the starting reserves.
+    The oToken's TWAP is left as is, since it lags spot anyway.
+    """
+
+    def __init__(self, snapshot, recovery_bps):
+        self.state = snapshot
+        self.start = snapshot.pair
+        self.recovery_bps = recovery_bps
+        self.block = 0
+        self.exercised = []
+
+    def block_number(self):
+        return self.block
+
+    def snapshot(self):
+        return self.state
+
+    def exercise(self, amount, profit_slippage_allowed, swap_slippage_allowed):
+        quote = quote_exercise_profit(self.state, amount, profit_slippage_allowed)
+        if not quote.within_slippage_tolerance:
+            raise Revert("Profit slippage higher than allowed")
+        pair = self.state.pair
+        wblt_out = get_amount_out(
+            amount, pair.reserve_underlying, pair.reserve_wblt, pair.fee
+        )
+        self._set_reserves(
+            pair.reserve_underlying + amount - (amount * pair.fee) // MAX_BPS,
+            pair.reserve_wblt - wblt_out,
+        )
+        self.exercised.append((self.block, amount))
+
+    def mine(self, blocks):
+        for _ in range(blocks):
+            pair = self.state.pair
+            self._set_reserves(
+                pair.reserve_underlying
+                + (self.start.reserve_underlying - pair.reserve_underlying)
+                * self.recovery_bps
+                // MAX_BPS,
+                pair.reserve_wblt
+                + (self.start.reserve_wblt - pair.reserve_wblt)
+                * self.recovery_bps
+                // MAX_BPS,
+            )
+            self.block += 1
+
+    def _set_reserves(self, reserve_underlying, reserve_wblt):
+        pair = replace(
+            self.state.pair,
+            reserve_underlying=reserve_underlying,
+            reserve_wblt=reserve_wblt,
+        )
+        self.state = replace(self.state, pair=pair)
+
+
+def test_offline_scheduler(offline_snapshot):
+    # line our TWAP up with spot and make our BLT rates consistent, so only our own
+    #  selling moves profit slippage
+    pair = offline_snapshot.pair
+    snapshot = replace(
+        offline_snapshot,
+        otoken=replace(
+            offline_snapshot.otoken,
+            discount=50,
+            twap_observations=((pair.reserve_underlying, pair.reserve_wblt),) * 4,
+        ),
+        blt=replace(
+            offline_snapshot.blt,
+            weth_per_wblt=10**36 // offline_snapshot.blt.redeem_price,
+        ),
+    )
+    total = 20_000 * 10**18
+    profit_slippage = 500
+    swap_slippage = 100
+
+    chunks = plan_chunks(snapshot, total, profit_slippage)
+    print("Chunks:", [chunk / 1e18 for chunk in chunks])
+    assert sum(chunks) == total
+    assert len(chunks) > 1
+    assert max(chunks) - min(chunks) <= 1
+
+    # with a pool that recovers, everything goes through, with waits in between
+    node = LocalNode(snapshot, 5_000)
+    attempts = run_schedule(node, total, profit_slippage, swap_slippage)
+    assert sum(amount for _, amount in node.exercised) == total
+    assert [chunk.amount for chunk in attempts if chunk.submitted] == chunks
+    assert all(
+        chunk.quote.within_slippage_tolerance for chunk in attempts if chunk.submitted
+    )
+    skipped = [chunk for chunk in attempts if not chunk.submitted]
+    print("Blocks:", node.block, "Skipped attempts:", len(skipped))
+    assert len(skipped) > 0
+    blocks = [block for block, _ in node.exercised]
+    assert blocks == sorted(set(blocks))
+
+    # pool never recovers, so we give up rather than submit outside tolerance
+    node = LocalNode(snapshot, 0)
+    attempts = run_schedule(
+        node, total, profit_slippage, swap_slippage, blocks_between=2, max_wait_blocks=6
+    )
+    exercised = sum(amount for _, amount in node.exercised)
+    print("Exercised without recovery:", exercised / 1e18)
+    assert 0 < exercised < total
+    assert not attempts[-1].submitted
+    assert sum(not chunk.submitted for chunk in attempts) == 4
+
+    # nothing is within tolerance
+    with pytest.raises(Revert, match="Profit slippage higher than allowed"):
+        plan_chunks(snapshot, total, 1)
+
+
+def test_scheduler(obmx, weth, bmx_exercise_helper, obmx_whale):
+    total = 1_000 * 10**18
+    profit_slippage = 9500
+    swap_slippage = 100
+
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    obmx_before = obmx.balanceOf(obmx_whale)
+    weth_before = weth.balanceOf(obmx_whale)
+
+    # there are no arbitrageurs on our fork, so just see how far we get
+    node = ChainNode(bmx_exercise_helper, obmx, obmx_whale)
+    attempts = run_schedule(
+        node,
+        total,
+        profit_slippage,
+        swap_slippage,
+        max_wait_blocks=5,
+        max_price_impact=50,
+    )
+    submitted = [chunk for chunk in attempts if chunk.submitted]
+    print("Chunks submitted:", len(submitted), "of", len(attempts), "attempts")
+    for chunk in submitted:
+        print("Block", chunk.block, chunk.amount / 1e18, chunk.quote.profit_slippage)
+
+    assert len(submitted) > 0
+    exercised = sum(chunk.amount for chunk in submitted)
+    assert obmx_before - obmx.balanceOf(obmx_whale) == exercised
+    assert weth.balanceOf(obmx_whale) > weth_before
@@ -0,0 +1,142 @@
+def test_self_funded_exercise(
+    obmx, bmx, weth, bmx_exercise_helper, obmx_whale, receive_underlying
+):
+    to_exercise = 1_000e18
+    profit_slippage = 9500
+    swap_slippage = 100
+
+    # approve just enough WETH for two exercises so we can see it being used
+    weth_needed = bmx_exercise_helper.quoteExerciseProfit(
+        obmx, to_exercise, profit_slippage
+    )["weth_needed"]
+    weth.deposit({"from": obmx_whale, "value": weth_needed * 2})
+    weth.approve(bmx_exercise_helper, weth_needed * 2, {"from": obmx_whale})
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+
+    weth_before = weth.balanceOf(obmx_whale)
+    bmx_before = bmx.balanceOf(obmx_whale)
+    bmx_exercise_helper.exerciseSelfFunded(
+        obmx,
+        to_exercise,
+        receive_underlying,
+        profit_slippage,
+        swap_slippage,
+        {"from": obmx_whale},
+    )
+
+    # we borrowed from our caller instead of a flash loan, and paid them back
+    assert weth.allowance(obmx_whale, bmx_exercise_helper) == weth_needed
+    assert not bmx_exercise_helper.flashEntered()
+    if receive_underlying:
+        assert bmx.balanceOf(obmx_whale) > bmx_before
+        assert weth.balanceOf(obmx_whale) >= weth_before
+    else:
+        assert weth.balanceOf(obmx_whale) > weth_before
+    print("WETH profit:", (weth.balanceOf(obmx_whale) - weth_before) / 1e18)
+    print("BMX profit:", (bmx.balanceOf(obmx_whale) - bmx_before) / 1e18)
+
+    # nothing left behind in the helper
+    assert weth.balanceOf(bmx_exercise_helper) == 0
+    assert obmx.balanceOf(bmx_exercise_helper) == 0
+
+    # our default path always uses a flash loan, even with plenty of WETH approved
+    weth_before = weth.balanceOf(obmx_whale)
+    bmx_exercise_helper.exercise(
+        obmx,
+        to_exercise,
+        receive_underlying,
+        profit_slippage,
+        swap_slippage,
+        {"from": obmx_whale},
+    )
+    # none of our caller's WETH was pulled, so our allowance is untouched
+    assert weth.allowance(obmx_whale, bmx_exercise_helper) == weth_needed
+    assert weth.balanceOf(obmx_whale) >= weth_before
+
+
+def test_self_funded_exercise_wblt(
+    obmx,
+    bmx,
+    weth,
+    w_blt,
+    bmx_exercise_helper,
+    obmx_whale,
+    w_blt_whale,
+    receive_underlying,
+):
+    to_exercise = 1_000e18
+    profit_slippage = 9500
+    swap_slippage = 100
+
+    # give our caller enough wBLT to pay for their exercise
+    w_blt.transfer(obmx_whale, 1_000e18, {"from": w_blt_whale})
+    w_blt.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+    fee_before = weth.balanceOf(bmx_exercise_helper.feeAddress())
+
+    weth_before = weth.balanceOf(obmx_whale)
+    wblt_before = w_blt.balanceOf(obmx_whale)
+    bmx_before = bmx.balanceOf(obmx_whale)
+    bmx_exercise_helper.exerciseSelfFundedWithWblt(
+        obmx,
+        to_exercise,
+        receive_underlying,
+        profit_slippage,
+        swap_slippage,
+        {"from": obmx_whale},
+    )
+
+    # we borrowed wBLT from our caller instead of a flash loan, and paid them back
+    assert w_blt.balanceOf(obmx_whale) >= wblt_before
+    assert not bmx_exercise_helper.flashEntered()
+    assert weth.balanceOf(bmx_exercise_helper.feeAddress()) > fee_before
+    if receive_underlying:
+        assert bmx.balanceOf(obmx_whale) > bmx_before
+        assert weth.balanceOf(obmx_whale) >= weth_before
+    else:
+        assert weth.balanceOf(obmx_whale) > weth_before
+    print("WETH profit:", (weth.balanceOf(obmx_whale) - weth_before) / 1e18)
+    print("BMX profit:", (bmx.balanceOf(obmx_whale) - bmx_before) / 1e18)
+
+    # nothing left behind in the helper
+    assert weth.balanceOf(bmx_exercise_helper) == 0
+    assert obmx.balanceOf(bmx_exercise_helper) == 0
+    assert bmx.balanceOf(bmx_exercise_helper) == 0
+
+
+def test_self_funded_exercise_to_lp(
+    obmx, weth, w_blt, gauge, bmx_exercise_helper, obmx_whale
+):
+    to_exercise = 1_000e18
+    profit_slippage = 9500
+    swap_slippage = 100
+    percent_to_lp = 500
+    discount = 35
+
+    # approve more WETH than our exercise needs
+    weth.deposit({"from": obmx_whale, "value": 10e18})
+    weth.approve(bmx_exercise_helper, 10e18, {"from": obmx_whale})
+    obmx.approve(bmx_exercise_helper, 2**256 - 1, {"from": obmx_whale})
+
+    weth_before = weth.balanceOf(obmx_whale)
+    lp_before = gauge.balanceOf(obmx_whale)
+    bmx_exercise_helper.exerciseToLpSelfFunded(
+        obmx,
+        to_exercise,
+        profit_slippage,
+        swap_slippage,
+        percent_to_lp,
+        discount,
+        {"from": obmx_whale},
+    )
+
+    # our WETH was borrowed and returned, with any leftovers sent back to us
+    assert weth.allowance(obmx_whale, bmx_exercise_helper) < 10e18
+    assert weth.balanceOf(obmx_whale) >= weth_before
+    assert not bmx_exercise_helper.flashEntered()
+    assert gauge.balanceOf(obmx_whale) > lp_before
+
+    # nothing left behind in the helper
+    assert weth.balanceOf(bmx_exercise_helper) == 0
+    assert w_blt.balanceOf(bmx_exercise_helper) == 0
+    assert obmx.balanceOf(bmx_exercise_helper) == 0
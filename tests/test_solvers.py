@@ -0,0 +1,116 @@
+from dataclasses import replace
+
+import brownie
+import numpy as np
+import pytest
+from exercise_helper import (
+    Revert,
+    max_percent_to_lp,
+    optimal_exercise_amount,
+    quote_exercise_lp,
+    quote_exercise_profit,
+)
+from exercise_helper.vectorized import exercise_profit_curve
+
+
+def test_offline_max_percent_to_lp(offline_snapshot):
+    discount = 35
+
+    for to_exercise in [500 * 10**18, 1_000 * 10**18, 3_000 * 10**18]:
+        percent_to_lp, output = max_percent_to_lp(
+            offline_snapshot, to_exercise, discount
+        )
+        print(to_exercise / 1e18, "oBMX:", percent_to_lp, output._asdict())
+        assert 0 < percent_to_lp < 10_000
+        assert output == quote_exercise_lp(
+            offline_snapshot, to_exercise, 0, percent_to_lp, discount
+        )
+
+        # one more and we run out of wBLT
+        with pytest.raises(Revert, match="Need more wBLT"):
+            quote_exercise_lp(
+                offline_snapshot, to_exercise, 0, percent_to_lp + 1, discount
+            )
+
+
+def test_max_percent_to_lp(exercise_quoter, bmx_exercise_helper, obmx):
+    to_exercise = 1_500e18
+    discount = 35
+
+    result = exercise_quoter.quoteMaxPercentToLp(obmx, to_exercise, discount)
+    print("Max percent to LP:", result.dict())
+    percent_to_lp = result["percentToLp"]
+    assert 0 < percent_to_lp < 10_000
+
+    output = bmx_exercise_helper.quoteExerciseLp(
+        obmx, to_exercise, 0, percent_to_lp, discount
+    )
+    assert output["lpAmountOut"] == result["lpAmountOut"]
+    assert output["wBLTOut"] == result["wBLTOut"]
+
+    with brownie.reverts("Need more wBLT, decrease _percentToLp or _discount values"):
+        bmx_exercise_helper.quoteExerciseLp(
+            obmx, to_exercise, 0, percent_to_lp + 1, discount
+        )
+
+
+def test_offline_optimal_exercise_amount(offline_snapshot):
+    max_amount = 200_000 * 10**18
+
+    # a deeper TWAP pool makes exercising pricier at size, so profit peaks mid-curve
+    otoken = replace(
+        offline_snapshot.otoken,
+        twap_observations=((400_000 * 10**18, 215_000 * 10**18),) * 4,
+    )
+    snapshot = replace(offline_snapshot, otoken=otoken)
+
+    # with no slippage limit, we should land on the peak of the profit curve
+    result = optimal_exercise_amount(snapshot, max_amount, 10_000)
+    print("Optimal exercise:", result._asdict())
+    assert 0 < result.optimal_amount < max_amount
+    amounts = np.linspace(1e18, float(max_amount), 20_000)
+    curve = exercise_profit_curve(snapshot, amounts, 10_000)
+    best_profit = np.max(np.where(curve.valid, curve.real_profit, 0))
+    assert result.real_profit >= best_profit * 0.9999
+    assert result.real_profit == (
+        quote_exercise_profit(snapshot, result.optimal_amount, 0).real_profit
+    )
+
+    # small caps are just exercised in full
+    small = optimal_exercise_amount(snapshot, 100 * 10**18, 10_000)
+    assert small.optimal_amount == 100 * 10**18
+
+    # tighter slippage means a smaller size that still fits
+    tight = optimal_exercise_amount(snapshot, max_amount, 5_000)
+    print("Within 50% slippage:", tight._asdict())
+    assert 0 < tight.optimal_amount < result.optimal_amount
+    assert quote_exercise_profit(
+        snapshot, tight.optimal_amount, 9_000
+    ).within_slippage_tolerance
+
+
+def test_optimal_exercise_amount(exercise_quoter, bmx_exercise_helper, obmx):
+    max_amount = 100_000e18
+    profit_slippage = 9500
+
+    result = exercise_quoter.quoteOptimalExerciseAmount(
+        obmx, max_amount, profit_slippage
+    )
+    print("Optimal exercise:", result.dict())
+    optimal_amount = result["optimalAmount"]
+    if optimal_amount == 0:
+        return
+
+    output = bmx_exercise_helper.quoteExerciseProfit(
+        obmx, optimal_amount, profit_slippage
+    )
+    assert output["withinSlippageTolerance"]
+    assert output["realProfit"] == result["realProfit"]
+
+    # going a bit bigger or smaller shouldn't be meaningfully better
+    for size in [optimal_amount * 9 // 10, min(optimal_amount * 11 // 10, max_amount)]:
+        try:
+            other = bmx_exercise_helper.quoteExerciseProfit(obmx, size, 10_000)
+        except brownie.exceptions.VirtualMachineError:
+            continue
+        assert other["realProfit"] <= result["realProfit"] * 101 // 100
@@ -0,0 +1,135 @@
+import brownie
+import pytest
+from brownie import accounts
+from exercise_helper import Revert
+from exercise_helper.routing import SwapPath, optimal_split, path_amount_out
+
+
+def test_offline_optimal_split(offline_snapshot):
+    pair = offline_snapshot.pair
+    weth_per_wblt = offline_snapshot.blt.weth_per_wblt
+    to_sell = 20_000 * 10**18
+
+    # two identical pools should split evenly
+    deep = SwapPath(
+        [(pair.reserve_underlying, pair.reserve_wblt, pair.fee)], weth_per_wblt
+    )
+    result = optimal_split([deep, deep], to_sell)
+    print("Even split:", result._asdict())
+    assert result.shares == [5_000, 5_000]
+    assert sum(result.amounts_in) == to_sell
+    assert result.total_out > path_amount_out(deep, to_sell)
+
+    # a shallower pool, or one with higher fees, should get less
+    shallow = SwapPath(
+        [(pair.reserve_underlying // 4, pair.reserve_wblt // 4, pair.fee)],
+        weth_per_wblt,
+    )
+    pricey = SwapPath(
+        [(pair.reserve_underlying, pair.reserve_wblt, pair.fee * 5)], weth_per_wblt
+    )
+    result = optimal_split([deep, shallow, pricey], to_sell)
+    print("Uneven split:", result._asdict())
+    assert sum(result.shares) == 10_000
+    assert result.shares[0] > result.shares[1] > 0
+    assert result.shares[0] > result.shares[2]
+    for shares in [[10_000, 0, 0], [5_000, 2_500, 2_500]]:
+        other = sum(
+            path_amount_out(path, to_sell * share // 10_000)
+            for path, share in zip([deep, shallow, pricey], shares)
+        )
+        assert result.total_out >= other
+
+    # a single path takes everything
+    assert optimal_split([deep], to_sell).shares == [10_000]
+    with pytest.raises(Revert, match="Split must sell underlying for WETH"):
+        optimal_split([], to_sell)
+
+
+def test_exercise_with_split(
+    obmx, bmx, w_blt, weth, bmx_exercise_helper, exercise_flows, obmx_whale
+):
+    to_exercise = 1_000e18
+    profit_slippage = 9500
+    swap_slippage = 100
+    route = [(bmx.address, w_blt.address, False), (w_blt.address, weth.address, False)]
+    obmx.approve(exercise_flows, 2**256 - 1, {"from": obmx_whale})
+
+    # our split can't sell something other than underlying, or end up in wBLT
+    for bad_route in [route[1:], route[:1], []]:
+        with brownie.reverts("Split must sell underlying for WETH"):
+            exercise_flows.exerciseWithSplit(
+                obmx,
+                to_exercise,
+                profit_slippage,
+                swap_slippage,
+                [(route, 5_000), (bad_route, 5_000)],
+                {"from": obmx_whale},
+            )
+    with brownie.reverts("Split shares must total 10,000"):
+        exercise_flows.exerciseWithSplit(
+            obmx,
+            to_exercise,
+            profit_slippage,
+            swap_slippage,
+            [(route, 5_000), (route, 4_000)],
+            {"from": obmx_whale},
+        )
+
+    # each path is quoted against the same reserves, so paths can't share a pair
+    with brownie.reverts("Split paths can't share a pair"):
+        exercise_flows.exerciseWithSplit(
+            obmx,
+            to_exercise,
+            profit_slippage,
+            swap_slippage,
+            [(route, 6_000), (route, 4_000)],
+            {"from": obmx_whale},
+        )
+
+    # a single path sells exactly as our default route does
+    quote = bmx_exercise_helper.quoteExerciseProfit(obmx, to_exercise, profit_slippage)
+    weth_before = weth.balanceOf(obmx_whale)
+    exercise_flows.exerciseWithSplit(
+        obmx,
+        to_exercise,
+        profit_slippage,
+        swap_slippage,
+        [(route, 10_000)],
+        {"from": obmx_whale},
+    )
+    profit = weth.balanceOf(obmx_whale) - weth_before
+    print("Split WETH profit:", profit / 1e18, "quoted:", quote["realProfit"] / 1e18)
+    assert profit > 0
+    assert profit == pytest.approx(quote["realProfit"], rel=1e-3)
+
+    # nothing left behind
+    assert weth.balanceOf(exercise_flows) == 0
+    assert obmx.balanceOf(exercise_flows) == 0
+    assert bmx.balanceOf(exercise_flows) == 0
+
+
+def test_split_same_pair_rejected(mocks, mock_exercise_flows):
+    user = accounts[1]
+    to_exercise = 100 * 10**18
+    mocks.otoken.mint(user, to_exercise, {"from": user})
+    mocks.otoken.approve(mock_exercise_flows, 2**256 - 1, {"from": user})
+    direct = [
+        (mocks.underlying, mocks.wblt, False),
+        (mocks.wblt, mocks.weth, False),
+    ]
+
+    # our second path only differs in its wBLT to WETH hop, which mints and redeems BLT
+    #  rather than using a pair, so both still sell through our underlying-wBLT pair
+    stable_blt = [
+        (mocks.underlying, mocks.wblt, False),
+        (mocks.wblt, mocks.weth, True),
+    ]
+    for splits in [
+        [(direct, 5_000), (direct, 5_000)],
+        [(direct, 7_000), (stable_blt, 3_000)],
+    ]:
+        with brownie.reverts("Split paths can't share a pair"):
+            mock_exercise_flows.exerciseWithSplit(
+                mocks.otoken, to_exercise, 9_500, 100, splits, {"from": user}
+            )